@@ -1,10 +1,16 @@
 import os
+import argparse
 import requests
-import pandas as pd
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import pathlib
 
+from checkpoint import CheckpointStore
+from http_cache import ResponseCache
+from http_client import TokenBucket, make_session
+from video_store import VideoStore
+
 # === Load API Key ===
 env_path = pathlib.Path(__file__).resolve().parent.parent / ".env"
 if env_path.exists():
@@ -12,21 +18,37 @@ if env_path.exists():
 
 API_KEY = os.getenv("YOUTUBE_API_KEY") or os.getenv("api_key")
 
-if not API_KEY:
-    raise ValueError("YouTube API key not found. Add it to your .env or GitHub Secrets.")
+
+def get_api_key():
+    """Return the API key, failing only when a collection actually needs it."""
+    if not API_KEY:
+        raise ValueError("YouTube API key not found. Add it to your .env or GitHub Secrets.")
+    return API_KEY
 
 # === Output file ===
-os.makedirs("data", exist_ok=True)
 SAVE_PATH = os.path.join("data", "youtube_api_raw.csv")
 
 # === YouTube regions (to reach ~3000 total videos) ===
 REGIONS = ["US", "IN", "GB", "BR", "JP", "KR", "FR", "DE", "CA", "MX", "RU", "IT", "AU", "ES", "ID"]
 MAX_RESULTS_PER_REGION = 300
 
+# === Request settings ===
+# BASE_URL can be pointed at a local stub server (see stub_youtube_server.py)
+BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3/videos")
+MAX_WORKERS = 8            # regions fetched at the same time
+REQUESTS_PER_SECOND = 5.0  # shared across all workers, replaces the old fixed sleep
+
 
-def get_trending_videos(region="US", max_results=300):
-    """Collect trending videos from a single region."""
-    base_url = "https://www.googleapis.com/youtube/v3/videos"
+def get_trending_videos(region="US", max_results=300, session=None, limiter=None, cache=None):
+    """Collect trending videos from a single region.
+
+    `session` is reused for keep-alive connections and `limiter` (a TokenBucket)
+    spaces out page requests; both default to a one-off session at 1 request/s.
+    Pages are served from `cache` (a ResponseCache) when it holds a fresh copy.
+    """
+    api_key = get_api_key()
+    session = session or requests
+    limiter = limiter or TokenBucket(rate=1.0)
     videos = []
     next_page_token = None
 
@@ -39,10 +61,14 @@ def get_trending_videos(region="US", max_results=300):
             "regionCode": region,
             "maxResults": 50,
             "pageToken": next_page_token,
-            "key": API_KEY
+            "key": api_key
         }
 
-        response = requests.get(base_url, params=params)
+        if cache is not None:
+            response = cache.get(session, BASE_URL, params=params, limiter=limiter, timeout=30)
+        else:
+            limiter.acquire()
+            response = session.get(BASE_URL, params=params, timeout=30)
         data = response.json()
 
         if response.status_code != 200:
@@ -76,22 +102,98 @@ def get_trending_videos(region="US", max_results=300):
         if not next_page_token:
             break
 
-        time.sleep(1)  # polite delay to avoid quota spikes
-
     print(f"Collected {len(videos)} videos from {region}")
     return videos
 
 
-if __name__ == "__main__":
+def iter_trending_videos_concurrent(regions=REGIONS, max_results=MAX_RESULTS_PER_REGION,
+                                    max_workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND, cache=None):
+    """Fetch several regions at once over one pooled session, yielding (region, videos).
+
+    All workers share a single token bucket, so `rate` caps the total request
+    rate no matter how many regions are in flight. Regions are yielded as they finish.
+    """
+    session = make_session(pool_size=max_workers)
+    limiter = TokenBucket(rate=rate, capacity=max_workers)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(get_trending_videos, region, max_results, session, limiter, cache): region
+            for region in regions
+        }
+        for future in as_completed(futures):
+            region = futures[future]
+            try:
+                yield region, future.result()
+            except Exception as e:
+                print(f"Request failed for region {region}: {e}")
+                yield region, []
+
+    session.close()
+
+
+def get_trending_videos_concurrent(regions=REGIONS, max_results=MAX_RESULTS_PER_REGION,
+                                   max_workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND, cache=None):
+    """Concurrent fetch of all regions; results keep region order."""
+    results = dict(iter_trending_videos_concurrent(regions, max_results, max_workers, rate, cache))
+    return [video for region in regions for video in results.get(region, [])]
+
+
+def collect_api_data(serial=False, max_workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND,
+                     resume=True, use_cache=True):
+    """Collect every region into SAVE_PATH, resuming from the last checkpoint.
+
+    Returns the number of records written.
+    """
+    get_api_key()
+    os.makedirs(os.path.dirname(SAVE_PATH), exist_ok=True)
     print("Collecting YouTube trending data via API...\n")
+    start = time.perf_counter()
+
+    # Finished regions are streamed to data/checkpoints/ so an interrupted run resumes
+    store = CheckpointStore("api_youtube")
+    if not resume:
+        store.clear()
+    pending = [region for region in REGIONS if region not in store.completed()]
+    if store.completed():
+        print(f"Resuming: {len(store.completed())} regions already checkpointed, {len(pending)} to go.\n")
+
+    # Every region is also upserted into data/videos.sqlite, as one snapshot per run
+    videos = VideoStore()
+    captured = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
 
-    all_videos = []
-    for region in REGIONS:
-        region_videos = get_trending_videos(region, max_results=MAX_RESULTS_PER_REGION)
-        all_videos.extend(region_videos)
-        print(f"Total videos collected so far: {len(all_videos)}\n")
+    cache = ResponseCache() if use_cache else None
+    if serial:
+        fetched = ((region, get_trending_videos(region, MAX_RESULTS_PER_REGION, cache=cache)) for region in pending)
+    else:
+        fetched = iter_trending_videos_concurrent(pending, MAX_RESULTS_PER_REGION, max_workers, rate, cache)
 
-    df = pd.DataFrame(all_videos)
-    df.to_csv(SAVE_PATH, index=False, encoding="utf-8")
+    for region, region_videos in fetched:
+        # Empty regions (API errors) stay unmarked so the next run retries them
+        if region_videos:
+            store.record(region, region_videos)
+            videos.upsert(region_videos, "api", captured)
+        print(f"Total videos collected so far: {store.row_count()}\n")
 
-    print(f"API data collection complete. {len(df)} total records saved to {SAVE_PATH}")
+    print(f"Fetched {store.row_count()} videos in {time.perf_counter() - start:.1f}s")
+
+    total = store.finalize(SAVE_PATH)
+    if cache is not None:
+        print(cache.summary())
+        cache.save_stats("api_youtube")
+
+    print(f"API data collection complete. {total} total records saved to {SAVE_PATH}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect YouTube trending data via the Data API.")
+    parser.add_argument("--serial", action="store_true", help="fetch one region at a time")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="regions fetched concurrently")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="max requests per second")
+    parser.add_argument("--fresh", action="store_true", help="ignore any checkpoint from an earlier run")
+    parser.add_argument("--no-cache", action="store_true", help="always hit the API, bypassing data/http_cache")
+    args = parser.parse_args()
+
+    collect_api_data(serial=args.serial, max_workers=args.workers, rate=args.rate,
+                     resume=not args.fresh, use_cache=not args.no_cache)
@@ -0,0 +1,95 @@
+"""
+benchmark_extract.py
+Compares the old BeautifulSoup + greedy regex ytInitialData extraction with
+yt_initial_data.extract_initial_data on saved search result pages.
+
+    python src/benchmark_extract.py --html-dir path/to/saved_pages
+    python src/benchmark_extract.py            # synthesized ~1 MB pages
+
+Reports mean per-page parse time and tracemalloc peak memory for each path.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+import tracemalloc
+
+from stub_youtube_server import make_search_page
+from yt_initial_data import extract_initial_data
+
+
+def legacy_extract(html):
+    """The pre-refactor path: full DOM parse, then a greedy DOTALL regex."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup.find_all("script"):
+        if "ytInitialData" in script.text:
+            match = re.search(r"ytInitialData\s*=\s*(\{.*\})\s*;", script.text, re.DOTALL)
+            if match:
+                try:
+                    return json.loads(match.group(1))
+                except Exception:
+                    continue
+    return None
+
+
+def synthetic_pages(count=5, target_bytes=1_000_000):
+    """Search pages padded with player/config scripts to roughly real page size."""
+    pages = []
+    for i in range(count):
+        html = make_search_page(f"benchmark query {i}", count=20)
+        filler = "<script>var ytplayer = {\"config\": \"" + "x" * 50_000 + "\"};</script>"
+        head, tail = html.split("<script>var ytInitialData", 1)
+        while len(head) + len(tail) < target_bytes:
+            head += filler
+        pages.append(head + "<script>var ytInitialData" + tail + filler * 3)
+    return pages
+
+
+def measure(func, pages, repeat=3):
+    """Return (mean seconds per page, peak bytes) for running `func` over every page."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            func(html)
+    per_page = (time.perf_counter() - start) / (repeat * len(pages))
+
+    tracemalloc.start()
+    for html in pages:
+        func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_page, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ytInitialData extraction.")
+    parser.add_argument("--html-dir", help="directory of saved search result .html files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.html_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.html_dir, "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                pages.append(f.read())
+    else:
+        pages = synthetic_pages()
+
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"Benchmarking {len(pages)} pages (avg {avg_kb:,.0f} KB)\n")
+
+    paths = [("raw_decode", extract_initial_data)]
+    try:
+        import bs4  # noqa: F401
+        paths.insert(0, ("BeautifulSoup + regex", legacy_extract))
+    except ImportError:
+        print("beautifulsoup4 not installed, skipping the legacy path.\n")
+
+    for name, func in paths:
+        per_page, peak = measure(func, pages, args.repeat)
+        print(f"{name:<24} {per_page * 1000:8.2f} ms/page   peak {peak / 1024 / 1024:7.2f} MB")
@@ -0,0 +1,162 @@
+"""
+benchmark_features.py
+Times the vectorized preprocessing and feature kernels against the
+row-by-row `.apply` versions they replaced: count/duration parsers on
+synthetic columns, text and time features on the API table.
+
+    python src/benchmark_features.py            # 1,000,000 synthetic rows
+    python src/benchmark_features.py --rows 200000 --workers 4
+"""
+
+import argparse
+import re
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+import feature_engineering as fe
+import preprocessing as pp
+from storage import find_table, load_table
+
+# Source of real titles/descriptions, in order of preference
+API_TABLES = [fe.CLEAN_API, "youtube_api_ready"]
+
+
+# -------------------------------------------------------
+#  Legacy row-wise implementations (for comparison only)
+# -------------------------------------------------------
+def legacy_convert_duration(duration_str):
+    if pd.isna(duration_str):
+        return np.nan
+    s = str(duration_str).strip()
+    if s.startswith("PT"):
+        m = re.search(r"(\d+)M", s)
+        sec = re.search(r"(\d+)S", s)
+        return (int(m.group(1)) if m else 0) + (int(sec.group(1)) if sec else 0) / 60
+    if ":" in s:
+        parts = s.split(":")
+        try:
+            return int(parts[0]) + int(parts[1]) / 60
+        except:
+            return np.nan
+    return np.nan
+
+
+def legacy_clean_views(value):
+    if pd.isna(value):
+        return np.nan
+    s = str(value).lower().strip()
+    s = unicodedata.normalize("NFKD", s)
+    s = s.replace("views", "").replace(",", "").strip()
+    digits = re.findall(r"\d+", s)
+    if digits:
+        return float(digits[0])
+    return np.nan
+
+
+def legacy_to_datetime_safe(val):
+    try:
+        return pd.to_datetime(val, errors="coerce").tz_localize(None)
+    except Exception:
+        return pd.NaT
+
+
+def legacy_time_features(dates):
+    dates = dates.apply(legacy_to_datetime_safe)
+    days = (pd.Timestamp.now() - dates).dt.days
+    return days, dates.dt.year, dates.dt.month, dates.dt.weekday
+
+
+def legacy_keyword_density(text):
+    if not isinstance(text, str):
+        return 0
+    return len(re.findall(r"\b[a-zA-Z]{3,}\b", text))
+
+
+# -------------------------------------------------------
+#  Synthetic columns
+# -------------------------------------------------------
+def synthetic_durations(n, rng):
+    seconds = rng.integers(0, 4 * 3600, n)
+    h, m, s = seconds // 3600, seconds % 3600 // 60, seconds % 60
+    iso = pd.Series([f"PT{a}H{b}M{c}S" if a else f"PT{b}M{c}S" for a, b, c in zip(h, m, s)])
+    clock = pd.Series([f"{a}:{b:02d}:{c:02d}" if a else f"{b}:{c:02d}" for a, b, c in zip(h, m, s)])
+    return iso.where(rng.random(n) < 0.5, clock)
+
+
+def synthetic_view_counts(n, rng):
+    counts = rng.lognormal(10, 3, n).astype(np.int64)
+    formats = [
+        lambda c: f"{c:,} views",
+        lambda c: f"{c / 1e6:.1f}M views" if c >= 1e6 else f"{c / 1e3:.0f}K views",
+        lambda c: f"{c:,} Aufrufe".replace(",", "."),
+    ]
+    choice = rng.integers(0, len(formats), n)
+    return pd.Series([formats[k](c) for k, c in zip(choice, counts)])
+
+
+def api_columns():
+    """(table name, title/description/upload_date frame) of the first API table on disk."""
+    name = next((t for t in API_TABLES if find_table(t) is not None), None)
+    if name is None:
+        return None, None
+    return name, load_table(name, columns=["title", "description", "upload_date"])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def report(name, legacy_seconds, new_seconds):
+    print(f"{name:<28}{legacy_seconds:>12.3f}s{new_seconds:>12.3f}s{legacy_seconds / new_seconds:>10.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorized feature kernels.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=4, help="processes for the chunked description count")
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    print(f"{args.rows:,} rows\n")
+    print(f"{'feature':<28}{'.apply':>13}{'vectorized':>13}{'speedup':>10}")
+
+    durations = synthetic_durations(args.rows, rng)
+    legacy, _ = timed(lambda s: s.apply(legacy_convert_duration), durations)
+    new, _ = timed(fe.parse_duration, durations)
+    report("duration_mins", legacy, new)
+
+    views = synthetic_view_counts(args.rows, rng)
+    legacy, _ = timed(lambda s: s.apply(legacy_clean_views), views)
+    new, _ = timed(pp.normalize_counts, views)
+    report("views (normalize_counts)", legacy, new)
+
+    name, api = api_columns()
+    if api is None:
+        print("\nNo API table in data/, skipping text and time features.")
+    else:
+        print(f"\n{len(api):,} rows of {name}\n")
+        print(f"{'feature':<28}{'.apply':>13}{'vectorized':>13}{'speedup':>10}")
+        titles = api["title"].astype(str)
+        legacy = [
+            timed(lambda s: s.apply(len), titles)[0],
+            timed(lambda s: s.apply(lambda x: len(x.split())), titles)[0],
+            timed(lambda s: s.str.contains("music|official|video|remix", case=False, regex=True).astype(int), titles)[0],
+        ]
+        new, _ = timed(fe.title_features, titles)
+        report("title (3 features)", sum(legacy), new)
+
+        legacy, _ = timed(lambda s: s.apply(legacy_keyword_density), api["description"])
+        new, _ = timed(fe.keyword_counts, api["description"], 1)
+        report("desc_keyword_count", legacy, new)
+        chunk_rows = -(-len(api) // args.workers)
+        new, _ = timed(fe.keyword_counts, api["description"], args.workers, chunk_rows)
+        report(f"  ... {args.workers} processes", legacy, new)
+
+        legacy, _ = timed(legacy_time_features, api["upload_date"])
+        new, _ = timed(fe.time_features, api[["upload_date"]].copy())
+        report("upload_date (5 features)", legacy, new)
@@ -0,0 +1,50 @@
+"""
+benchmark_storage.py
+Load time and file size of each data/ artifact as CSV vs Parquet vs Feather.
+
+    python src/benchmark_storage.py
+
+Every youtube_*.csv in data/ is rewritten into a temporary directory in each
+format, then loaded in full and with only its numeric columns (what the model
+stages read).
+"""
+
+import glob
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from storage import DATA_DIR, has_pyarrow, load_table, save_table
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    formats = ["csv", "parquet", "feather"] if has_pyarrow() else ["csv"]
+    if len(formats) == 1:
+        print("pyarrow not installed, only CSV can be measured.\n")
+
+    print(f"{'artifact':<28}{'format':<9}{'size (MB)':>10}{'full load (ms)':>16}{'numeric load (ms)':>19}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for csv_path in sorted(glob.glob(os.path.join(DATA_DIR, "youtube_*.csv"))):
+            name = os.path.basename(csv_path)[:-4]
+            df = pd.read_csv(csv_path)
+            for fmt in formats:
+                fmt_dir = os.path.join(tmp, fmt)
+                path = save_table(df, name, fmt=fmt, data_dir=fmt_dir)
+                os.environ["YT_STORAGE_FORMAT"] = fmt
+                full = best_of(lambda: load_table(name, data_dir=fmt_dir))
+                numeric = best_of(lambda: load_table(name, numeric_only=True, data_dir=fmt_dir))
+                size = os.path.getsize(path) / 1024 / 1024
+                print(f"{name:<28}{fmt:<9}{size:>10.2f}{full * 1000:>16.1f}{numeric * 1000:>19.1f}")
+            print()
+    os.environ.pop("YT_STORAGE_FORMAT", None)
@@ -0,0 +1,250 @@
+"""
+channel_index.py
+Per-channel aggregates joined onto every video: how many videos the channel
+has, how many views its recent uploads get and how engaged its audience is.
+
+    index = ChannelIndex(FE_API)
+    index.update(df)        # upsert the rows, refresh only the channels they touch
+    df = index.join(df)     # add CHANNEL_FEATURES, one indexed lookup per row
+
+The index is one SQLite file per features table (data/<table>_channels.sqlite)
+with two tables:
+
+    videos    one row per video (video_id or url): channel, upload date, the
+              latest views/likes/comments seen for it, and its channel's
+              aggregates over the channel's EARLIER uploads
+    channels  one row per channel: the aggregates over all of its videos
+
+update() upserts the rows into `videos` and recomputes the aggregates of the
+channels they belong to; nothing else is read. join() looks each row up by
+key in `videos` and falls back to `channels` for videos the index has not
+seen, which is what scoring new uploads gets. Videos with a placeholder
+channel name ("Unknown Channel", ...) are left out.
+
+A video's aggregates only cover uploads before it, so neither its own views
+nor those of later videos (e.g. a held-out test split of the newest uploads)
+reach its features. They are still built from other videos' views, likes and
+comments, and feature_registry.py declares them so: the leakage guard keeps
+them out of views models.
+
+The medians cover the ROLLING_VIDEOS most recent (earlier) uploads; the mean
+and std of log views cover all of them.
+"""
+
+import argparse
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from urllib.request import pathname2url
+
+import numpy as np
+import pandas as pd
+
+import feature_engineering as fe
+from feature_store import row_keys
+from storage import DATA_DIR, load_table
+
+ROLLING_VIDEOS = 50
+UNKNOWN_CHANNELS = {"", "nan", "None", "Unknown", "Unknown Channel"}
+CHANNEL_FEATURES = [
+    "channel_video_count",
+    "channel_median_log_views",
+    "channel_mean_log_views",
+    "channel_std_log_views",
+    "channel_median_engagement",
+]
+
+_AGGREGATE_COLUMNS = ", ".join(f"{c} {'INTEGER' if c == 'channel_video_count' else 'REAL'}"
+                               for c in CHANNEL_FEATURES)
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS videos (
+    key TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    uploaded TEXT,
+    views REAL, likes REAL, comments REAL,
+    {_AGGREGATE_COLUMNS}
+);
+CREATE INDEX IF NOT EXISTS videos_channel ON videos (channel);
+CREATE TABLE IF NOT EXISTS channels (
+    channel TEXT PRIMARY KEY,
+    {_AGGREGATE_COLUMNS}
+);
+"""
+
+
+# -------------------------------------------------------
+#  Aggregates
+# -------------------------------------------------------
+def _median(values):
+    return float(np.median(values)) if len(values) else np.nan
+
+
+def channel_aggregates(videos, window=ROLLING_VIDEOS):
+    """(per-video, per-channel) aggregates of a frame of videos (key, channel, uploaded, views, likes, comments).
+
+    Both frames have CHANNEL_FEATURES columns; the per-video one is indexed by
+    key and aggregates only the channel's earlier uploads (by upload time, then
+    key; undated videos come last), the per-channel one is indexed by channel
+    and aggregates all of them.
+    """
+    views = videos["views"].clip(lower=0)
+    videos = videos.assign(log_views=np.log1p(views),
+                           engagement=(videos["likes"] + videos["comments"]) / (views + 1))
+    # Oldest first, so a video's history is everything above it in its group
+    videos = videos.sort_values(["channel", "uploaded", "key"], na_position="last")
+
+    per_video, per_channel = [], []
+    for channel, group in videos.groupby("channel", sort=False):
+        log_views = group["log_views"].reset_index(drop=True)
+        engagement = group["engagement"].reset_index(drop=True)
+        n = len(log_views)
+        per_channel.append((channel, n, _median(log_views.to_numpy()[-window:]), log_views.mean(),
+                            log_views.std(ddof=0), _median(engagement.to_numpy()[-window:])))
+
+        # Shifted by one, so row i sees rows 0..i-1 only
+        prior_views, prior_engagement = log_views.shift(1), engagement.shift(1)
+        per_video.append(pd.DataFrame({
+            "key": group["key"].to_numpy(),
+            "channel_video_count": np.arange(n),
+            "channel_median_log_views": prior_views.rolling(window, min_periods=1).median().to_numpy(),
+            "channel_mean_log_views": prior_views.expanding().mean().to_numpy(),
+            "channel_std_log_views": prior_views.expanding().std(ddof=0).to_numpy(),
+            "channel_median_engagement": prior_engagement.rolling(window, min_periods=1).median().to_numpy(),
+        }))
+
+    per_video = pd.concat(per_video, ignore_index=True) if per_video else pd.DataFrame(columns=["key"] + CHANNEL_FEATURES)
+    per_channel = pd.DataFrame(per_channel, columns=["channel"] + CHANNEL_FEATURES)
+    return per_video.set_index("key"), per_channel.set_index("channel")
+
+
+def _sql_rows(frame):
+    """Rows of `frame` (index first) with NaN as NULL."""
+    frame = frame.reset_index().astype(object)
+    return frame.where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+def video_rows(df):
+    """The index's view of a featurized or cleaned frame: key, channel, uploaded, views, likes, comments.
+
+    Videos without a real channel name are dropped; of repeated keys the last row wins.
+    """
+    rows = pd.DataFrame({"key": row_keys(df)}, index=df.index)
+    channel = df["channel"] if "channel" in df.columns else pd.Series("", index=df.index)
+    rows["channel"] = channel.astype(str).str.strip()
+    uploaded = fe.parse_upload_dates(df["upload_date"]) if "upload_date" in df.columns \
+        else pd.Series(pd.NaT, index=df.index)
+    rows["uploaded"] = uploaded.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    for col in ("views", "likes", "comments"):
+        values = df[col] if col in df.columns else pd.Series(0, index=df.index)
+        rows[col] = pd.to_numeric(values, errors="coerce").fillna(0).astype("float64")
+    rows = rows[~rows["channel"].isin(UNKNOWN_CHANNELS) & (rows["key"] != "")]
+    return rows.drop_duplicates("key", keep="last").reset_index(drop=True)
+
+
+# -------------------------------------------------------
+#  Index
+# -------------------------------------------------------
+class ChannelIndex:
+    """SQLite file of per-video and per-channel aggregates for one features table."""
+
+    def __init__(self, features_table, data_dir=DATA_DIR):
+        self.name = f"{features_table}_channels"
+        self.path = os.path.join(data_dir, self.name + ".sqlite")
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def reset(self):
+        """Delete the index file (and its WAL side files) so the next update() starts empty."""
+        for path in (self.path, self.path + "-wal", self.path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @contextmanager
+    def connect(self, readonly=False):
+        """Connection in a transaction (read-only ones never create the file)."""
+        if readonly:
+            conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")  # scorers keep reading while the index updates
+            conn.executescript(SCHEMA)
+        with closing(conn), conn:
+            yield conn
+
+    def update(self, df):
+        """Upsert the videos of `df` and recompute the aggregates of every channel they touch."""
+        rows = video_rows(df)
+        if rows.empty:
+            return 0
+        with self.connect() as conn:
+            conn.execute("CREATE TEMP TABLE incoming (key TEXT PRIMARY KEY)")
+            conn.executemany("INSERT INTO incoming VALUES (?)", ((k,) for k in rows["key"]))
+            # Channels a video moves out of change too
+            touched = {c for (c,) in conn.execute(
+                "SELECT DISTINCT v.channel FROM videos v JOIN incoming i ON v.key = i.key")}
+            touched.update(rows["channel"])
+
+            conn.executemany(
+                "INSERT INTO videos (key, channel, uploaded, views, likes, comments) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET channel = excluded.channel, uploaded = excluded.uploaded, "
+                "views = excluded.views, likes = excluded.likes, comments = excluded.comments",
+                _sql_rows(rows.set_index("key")))
+
+            conn.execute("CREATE TEMP TABLE touched (channel TEXT PRIMARY KEY)")
+            conn.executemany("INSERT INTO touched VALUES (?)", ((c,) for c in touched))
+            videos = pd.read_sql_query(
+                "SELECT v.key, v.channel, v.uploaded, v.views, v.likes, v.comments "
+                "FROM videos v JOIN touched t ON v.channel = t.channel", conn)
+            per_video, per_channel = channel_aggregates(videos)
+
+            assignments = ", ".join(f"{c} = ?" for c in CHANNEL_FEATURES)
+            conn.executemany(f"UPDATE videos SET {assignments} WHERE key = ?",
+                             ((*row[1:], row[0]) for row in _sql_rows(per_video)))
+            conn.execute("DELETE FROM channels WHERE channel IN (SELECT channel FROM touched)")
+            conn.executemany(f"INSERT INTO channels VALUES ({', '.join('?' * (len(CHANNEL_FEATURES) + 1))})",
+                             _sql_rows(per_channel))
+        print(f" Channel index {self.name}: {len(rows):,} videos upserted, {len(per_channel):,} channels refreshed")
+        return len(rows)
+
+    def join(self, df):
+        """Add CHANNEL_FEATURES to `df` (in place): the video's own row if indexed, else its channel's.
+
+        Videos of channels the index has never seen get a count of 0 and NaN aggregates.
+        """
+        values = pd.DataFrame(np.nan, index=df.index, columns=CHANNEL_FEATURES)
+        if self.exists() and len(df):
+            channel = df["channel"] if "channel" in df.columns else pd.Series("", index=df.index)
+            lookup = zip(range(len(df)), row_keys(df), channel.astype(str).str.strip())
+            picks = ", ".join(f"CASE WHEN v.key IS NULL THEN c.{col} ELSE v.{col} END" for col in CHANNEL_FEATURES)
+            with self.connect(readonly=True) as conn:
+                conn.execute("CREATE TEMP TABLE lookup (pos INTEGER PRIMARY KEY, key TEXT, channel TEXT)")
+                conn.executemany("INSERT INTO lookup VALUES (?, ?, ?)", lookup)
+                found = conn.execute(
+                    f"SELECT {picks} FROM lookup l LEFT JOIN videos v ON v.key = l.key "
+                    "LEFT JOIN channels c ON c.channel = l.channel ORDER BY l.pos").fetchall()
+            values = pd.DataFrame(found, index=df.index, columns=CHANNEL_FEATURES, dtype="float64")
+        for col in CHANNEL_FEATURES:
+            df[col] = values[col].to_numpy()
+        df["channel_video_count"] = df["channel_video_count"].fillna(0).astype("int64")
+        return df
+
+    def add_features(self, df):
+        """update(df), then join(df): each row's aggregates cover the channel's earlier uploads."""
+        self.update(df)
+        return self.join(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh a channel index from a stored table.")
+    parser.add_argument("dataset", choices=["scraped", "api"])
+    parser.add_argument("--table", help="table to index (default: the dataset's features table)")
+    args = parser.parse_args()
+    features = fe.FE_SCRAPED if args.dataset == "scraped" else fe.FE_API
+    table = args.table or features
+    ChannelIndex(features).update(load_table(table, text=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pandas as pd
+
+# -------------------------------
+# Append-only checkpoint store for the collectors
+# -------------------------------
+CHECKPOINT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "checkpoints")
+
+
+class CheckpointStore:
+    """Streams collected rows to disk and remembers which units of work are done.
+
+    Two files live under data/checkpoints/:
+      <name>.rows.csv        every row collected so far, appended batch by batch
+      <name>.progress.jsonl  one line per finished key (keyword, region, ...)
+
+    Each progress line records the size of the rows file after its batch was
+    written, so a batch that crashed halfway is truncated away on the next open
+    and its key is simply fetched again.
+    """
+
+    def __init__(self, name, checkpoint_dir=CHECKPOINT_DIR):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.rows_path = os.path.join(checkpoint_dir, f"{name}.rows.csv")
+        self.progress_path = os.path.join(checkpoint_dir, f"{name}.progress.jsonl")
+        self.done = {}
+        self.columns = None
+        self.offset = 0
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn final line from a crash
+                    self.done[entry["key"]] = entry["rows"]
+                    self.offset = entry["offset"]
+                    self.columns = entry.get("columns") or self.columns
+
+        # Drop any rows written after the last committed batch
+        if os.path.exists(self.rows_path) and os.path.getsize(self.rows_path) > self.offset:
+            with open(self.rows_path, "r+b") as f:
+                f.truncate(self.offset)
+
+    def completed(self):
+        return set(self.done)
+
+    def row_count(self):
+        return sum(self.done.values())
+
+    def record(self, key, rows):
+        """Append one batch of row dicts and mark `key` as done."""
+        if rows:
+            df = pd.DataFrame(rows)
+            if self.columns is None:
+                self.columns = list(df.columns)
+            df = df.reindex(columns=self.columns)
+            df.to_csv(self.rows_path, mode="a", header=self.offset == 0, index=False, encoding="utf-8")
+            self.offset = os.path.getsize(self.rows_path)
+
+        with open(self.progress_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "rows": len(rows), "offset": self.offset, "columns": self.columns}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done[key] = len(rows)
+
+    def finalize(self, save_path, dedupe_col=None, chunksize=50_000):
+        """Copy the streamed rows to `save_path` chunk by chunk, then clear the checkpoint."""
+        seen = set()
+        total = 0
+        first = True
+        if os.path.exists(self.rows_path) and self.offset > 0:
+            for chunk in pd.read_csv(self.rows_path, chunksize=chunksize):
+                if dedupe_col:
+                    chunk = chunk.drop_duplicates(subset=dedupe_col)
+                    chunk = chunk[~chunk[dedupe_col].isin(seen)]
+                    seen.update(chunk[dedupe_col])
+                chunk.to_csv(save_path, mode="w" if first else "a", header=first, index=False, encoding="utf-8")
+                first = False
+                total += len(chunk)
+        if first:
+            pd.DataFrame(columns=self.columns).to_csv(save_path, index=False, encoding="utf-8")
+        self.clear()
+        return total
+
+    def clear(self):
+        for path in (self.rows_path, self.progress_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.done = {}
+        self.columns = None
+        self.offset = 0
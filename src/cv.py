@@ -0,0 +1,179 @@
+"""
+cv.py
+Cross-validation for the training stages (model_scraped.py / model_api.py --cv K).
+
+    folds = fold_indices(X, y, k=5)                               # cached under models/folds/
+    results = cross_validate(model_scraped.build_models(), X, y, folds, preprocess=True)
+    print(summarize(results))
+
+Fold indices are computed once per (data, k, mode) and stored, so every
+model and every later experiment on the same data is scored on identical
+folds. Two modes:
+
+    kfold  shuffled K-fold
+    time   expanding window over upload time: each fold is tested on videos
+           uploaded after everything it was trained on
+
+With select=True each training fold is pruned by
+feature_registry.select_features, as the registered models' training split
+is, so CV scores the same kind of model the registry holds.
+
+(model, fold) fits run in a process pool. Each model's n_jobs is set to
+CPUs / workers, so concurrent Random Forest and XGBoost fits share the
+cores instead of each starting one thread per core.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold, TimeSeriesSplit
+
+from feature_registry import select_features
+from preprocess_artifact import MODELS_DIR, fit_artifact, transform
+
+CV_FOLDS = 5
+CV_MODES = ["kfold", "time"]
+FOLDS_DIR = os.path.join(MODELS_DIR, "folds")
+
+
+# -------------------------------------------------------
+#  Folds
+# -------------------------------------------------------
+def time_order(df):
+    """Upload time of every row (older = smaller), for time-based folds."""
+    if "days_since_upload" in df.columns:
+        order = -pd.to_numeric(df["days_since_upload"], errors="coerce")
+    elif "upload_date" in df.columns:
+        order = pd.to_datetime(df["upload_date"], utc=True, format="mixed", errors="coerce").astype("int64")
+        order = order.where(df["upload_date"].notna())
+    else:
+        order = pd.Series(np.nan, index=df.index)
+    if order.isna().all():
+        raise ValueError("Time-based CV needs upload dates (days_since_upload or upload_date)")
+    return order.to_numpy(dtype="float64")
+
+
+def make_folds(n, k=CV_FOLDS, mode="kfold", order=None, seed=42):
+    """[(train positions, test positions)] for `n` rows."""
+    if mode == "kfold":
+        return list(KFold(n_splits=k, shuffle=True, random_state=seed).split(np.arange(n)))
+    if mode == "time":
+        # Undated rows sort first, so they only ever train
+        by_time = np.argsort(np.nan_to_num(order, nan=-np.inf), kind="stable")
+        return [(by_time[train], by_time[test]) for train, test in TimeSeriesSplit(n_splits=k).split(by_time)]
+    raise ValueError(f"Unknown CV mode '{mode}' (expected one of {CV_MODES})")
+
+
+def fold_indices(X, y, k=CV_FOLDS, mode="kfold", order=None, seed=42, folds_dir=FOLDS_DIR):
+    """make_folds, cached on disk per (rows, target, k, mode, seed)."""
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(X.index).to_numpy().tobytes())
+    h.update(f"{len(X)}|{k}|{mode}|{seed}".encode())
+    if order is not None:
+        h.update(np.asarray(order, dtype="float64").tobytes())
+    path = os.path.join(folds_dir, f"{mode}{k}_{h.hexdigest()[:16]}.npz")
+
+    if os.path.exists(path):
+        with np.load(path) as stored:
+            return [(stored[f"train_{i}"], stored[f"test_{i}"]) for i in range(k)]
+    folds = make_folds(len(X), k, mode, order, seed)
+    os.makedirs(folds_dir, exist_ok=True)
+    arrays = {f"{part}_{i}": idx for i, fold in enumerate(folds) for part, idx in zip(("train", "test"), fold)}
+    np.savez(path + ".tmp.npz", **arrays)
+    os.replace(path + ".tmp.npz", path)
+    return folds
+
+
+# -------------------------------------------------------
+#  Fitting (runs in worker processes)
+# -------------------------------------------------------
+_DATA = {}
+
+
+def _init_worker(X, y):
+    _DATA["X"], _DATA["y"] = X, y
+
+
+def _fit_fold(task):
+    name, model, fold, train, test, preprocess, select, threads = task
+    X, y = _DATA["X"], _DATA["y"]
+    X_train, X_test = X.iloc[train], X.iloc[test]
+    y_train, y_test = y.iloc[train], y.iloc[test]
+    if select:
+        # Columns decided on the training fold only
+        keep = select_features(X_train, y_train, n_jobs=threads)
+        X_train, X_test = X_train[keep], X_test[keep]
+    if preprocess:
+        # Fill/scale fitted on the training fold only
+        artifact = fit_artifact(X_train)
+        X_train, X_test = transform(artifact, X_train), transform(artifact, X_test)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    preds_log = np.nan_to_num(model.predict(X_test), nan=0.0, posinf=0.0, neginf=0.0)
+
+    preds, y_true = np.expm1(preds_log), np.expm1(y_test)
+    return {
+        "model": name, "fold": fold, "train_rows": len(train), "test_rows": len(test),
+        "rmse": float(np.sqrt(mean_squared_error(y_true, preds))), "r2": float(r2_score(y_true, preds)),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def cross_validate(models, X, y, folds, workers=None, preprocess=False, select=False):
+    """Fit every {name: estimator} on every fold; one row per (model, fold) with RMSE/R² in views."""
+    cpus = os.cpu_count() or 1
+    tasks = len(models) * len(folds)
+    workers = min(workers or cpus, tasks)
+    threads = max(1, cpus // workers)
+    y = pd.Series(np.asarray(y), index=X.index)
+
+    jobs = []
+    for name, model in models.items():
+        model = clone(model)
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=threads)
+        jobs += [(name, model, i, train, test, preprocess, select, threads) for i, (train, test) in enumerate(folds)]
+
+    print(f" Cross-validating {len(models)} model(s) x {len(folds)} folds "
+          f"({workers} worker(s) x {threads} thread(s) each)...")
+    if workers <= 1:
+        _init_worker(X, y)
+        rows = [_fit_fold(job) for job in jobs]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(X, y)) as pool:
+            rows = list(pool.map(_fit_fold, jobs))
+    return pd.DataFrame(rows)
+
+
+def summarize(results):
+    """Mean/std of RMSE and R² plus mean fit time per model."""
+    summary = results.groupby("model", sort=False).agg(
+        rmse_mean=("rmse", "mean"), rmse_std=("rmse", "std"),
+        r2_mean=("r2", "mean"), r2_std=("r2", "std"),
+        fit_seconds=("fit_seconds", "mean"), folds=("fold", "count"),
+    )
+    return summary
+
+
+def report(results):
+    """Print per-fold rows and the per-model summary; returns {model: summary dict}."""
+    for row in results.itertuples():
+        print(f"  {row.model:<24} fold {row.fold}: RMSE {row.rmse:,.0f}, R² {row.r2:.3f}, "
+              f"fit {row.fit_seconds:.2f}s ({row.train_rows} train / {row.test_rows} test)")
+    summary = summarize(results)
+    for name, s in summary.iterrows():
+        print(f" {name}  CV RMSE: {s.rmse_mean:,.0f} ± {s.rmse_std:,.0f}, R²: {s.r2_mean:.3f} ± {s.r2_std:.3f} "
+              f"({int(s.folds)} folds, {s.fit_seconds:.2f}s/fit)")
+    return {name: {k: float(v) for k, v in s.items()} for name, s in summary.iterrows()}
@@ -1,59 +1,110 @@
-import os
+import argparse
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 
-# === Load feature-engineered datasets ===
-SCRAPED_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_features.csv")
-API_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_api_features.csv")
+from preprocess_artifact import load_artifact, save_artifact
+from schema import fill_missing
+from storage import load_table, save_table
 
-df_scraped = pd.read_csv(SCRAPED_PATH)
-df_api = pd.read_csv(API_PATH)
+# === Tables (see storage.py) ===
+FE_SCRAPED = "youtube_scraped_features"
+FE_API = "youtube_api_features"
+FINAL_SCRAPED = "youtube_scraped_ready"
+FINAL_API = "youtube_api_ready"
 
-# === Function to clean and normalize ===
-def preprocess_and_normalize(df, dataset_name):
-    print(f"Cleaning and normalizing {dataset_name} dataset...")
+# === Fitted normalization parameters (see preprocess_artifact.py) ===
+NORMALIZATION_SCRAPED = "normalization_scraped"
+NORMALIZATION_API = "normalization_api"
 
-    df = df.drop_duplicates(subset=["title", "channel"], keep="first").reset_index(drop=True)
+# === Columns ===
+NUMERIC_COLS = ["views", "likes", "comments", "duration_mins", "days_since_upload", "engagement_rate"]
+TEXT_COLS = ["title", "description", "channel"]
+LOG_COLS = ["views", "likes", "comments"]
+SCALE_COLS = ["log_views", "duration_mins", "days_since_upload", "engagement_rate"]
 
-    # Numeric columns
-    numeric_cols = ["views", "likes", "comments", "duration_mins", "days_since_upload", "engagement_rate"]
-    for col in numeric_cols:
+# === Building blocks (shared with the chunked mode in streaming.py) ===
+def drop_duplicate_videos(df):
+    return df.drop_duplicates(subset=["title", "channel"], keep="first").reset_index(drop=True)
+
+def fill_and_log(df, fill, log_columns=LOG_COLS):
+    """Median-fill numeric columns, fill text columns, add log_ columns (in place)."""
+    for col in NUMERIC_COLS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
-            df.loc[:, col] = df[col].fillna(df[col].median())
+            df.loc[:, col] = df[col].fillna(fill.get(col, np.nan))
 
-    # Text fields
-    for col in ["title", "description", "channel"]:
+    for col in TEXT_COLS:
         if col in df.columns:
-            df.loc[:, col] = df[col].fillna("Unknown")
+            df[col] = fill_missing(df[col], "Unknown")
 
-    # Log-transform large numeric features
-    for col in ["views", "likes", "comments"]:
+    for col in log_columns:
         if col in df.columns:
             df[f"log_{col}"] = np.log1p(df[col])
+    return df
 
-    # Standardize numeric features
-    scale_cols = [c for c in ["log_views", "duration_mins", "days_since_upload", "engagement_rate"] if c in df.columns]
-    if scale_cols:
-        scaler = StandardScaler()
-        df[[f"{c}_scaled" for c in scale_cols]] = scaler.fit_transform(df[scale_cols])
+def fit_normalization(df):
+    """Fill values and scaler parameters for a deduplicated feature frame.
+
+    Returns {"fill": {col: median}, "log": [col], "scale": {col: {"mean", "std"}}};
+    std is the population std (as StandardScaler), with 1.0 for constant columns.
+    """
+    fill = {col: float(pd.to_numeric(df[col], errors="coerce").median())
+            for col in NUMERIC_COLS if col in df.columns}
+    filled = fill_and_log(df[[c for c in NUMERIC_COLS if c in df.columns]].copy(), fill)
+    scale = {}
+    for col in SCALE_COLS:
+        if col in filled.columns:
+            values = filled[col].to_numpy(dtype="float64")
+            std = float(np.nanstd(values))
+            scale[col] = {"mean": float(np.nanmean(values)), "std": std if std > 0 else 1.0}
+    return {"fill": fill, "log": [c for c in LOG_COLS if c in df.columns], "scale": scale}
+
+def apply_normalization(df, params):
+    """Fill, add log_<col> and <col>_scaled columns with already fitted params (in place)."""
+    df = fill_and_log(df, params["fill"], params.get("log", LOG_COLS))
+    for col, stats in params["scale"].items():
+        if col in df.columns:
+            df[f"{col}_scaled"] = (df[col] - stats["mean"]) / stats["std"]
 
     df.replace([np.inf, -np.inf], 0, inplace=True)
-    df.fillna(0, inplace=True)
+    return fill_missing(df, 0)
+
+# === Function to clean and normalize ===
+def preprocess_and_normalize(df, dataset_name, params=None, save_as=None):
+    """Dedupe, fit and apply normalization; with fitted `params`, dedupe and only apply them.
+
+    `save_as` persists freshly fitted params as an artifact for later
+    transform-only runs.
+    """
+    print(f"Cleaning and normalizing {dataset_name} dataset...")
+
+    df = drop_duplicate_videos(df)
+    if params is None:
+        params = fit_normalization(df)
+        if save_as:
+            save_artifact(params, save_as)
+    df = apply_normalization(df, params)
 
     print(f"{dataset_name} preprocessing complete. Rows: {len(df)}, Columns: {len(df.columns)}")
     return df
 
-# === Apply to both datasets ===
-df_scraped = preprocess_and_normalize(df_scraped, "Scraped")
-df_api = preprocess_and_normalize(df_api, "API")
+def main():
+    parser = argparse.ArgumentParser(description="Clean and normalize the feature tables.")
+    parser.add_argument("--transform-only", action="store_true",
+                        help="reuse the saved normalization artifacts instead of refitting")
+    args = parser.parse_args()
+
+    results = {}
+    for label, source, artifact in [("Scraped", FE_SCRAPED, NORMALIZATION_SCRAPED), ("API", FE_API, NORMALIZATION_API)]:
+        params = load_artifact(artifact) if args.transform_only else None
+        results[label] = preprocess_and_normalize(load_table(source), label, params=params, save_as=artifact)
+
+    # === Save cleaned outputs ===
+    save_table(results["Scraped"], FINAL_SCRAPED)
+    save_table(results["API"], FINAL_API)
 
-# === Save cleaned outputs ===
-FINAL_SCRAPED = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_ready.csv")
-FINAL_API = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_api_ready.csv")
+    print("Final cleaned and normalized datasets saved to /data/")
 
-df_scraped.to_csv(FINAL_SCRAPED, index=False)
-df_api.to_csv(FINAL_API, index=False)
 
-print("Final cleaned and normalized datasets saved to /data/")
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,180 @@
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import numpy as np
 import pandas as pd
 from datetime import datetime
 
-# === Paths ===
-SCRAPED_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_clean.csv")
-API_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_api_clean.csv")
+from storage import load_table, save_table
 
-df_scraped = pd.read_csv(SCRAPED_PATH)
-df_api = pd.read_csv(API_PATH)
+# === Tables (see storage.py) ===
+CLEAN_SCRAPED = "youtube_scraped_clean"
+CLEAN_API = "youtube_api_clean"
+FE_SCRAPED = "youtube_scraped_features"
+FE_API = "youtube_api_features"
+
+# === Text kernels ===
+KEYWORD_PATTERN = re.compile(r"\b[a-zA-Z]{3,}\b")
+MUSIC_PATTERN = "music|official|video|remix"
+# Descriptions are the only long text column; above TEXT_CHUNK_ROWS distinct
+# texts they can be counted in TEXT_WORKERS processes (1 = in-process, the default).
+TEXT_WORKERS = int(os.getenv("YT_TEXT_WORKERS", "1"))
+TEXT_CHUNK_ROWS = 20_000
+
+# === Time features ===
+# days_since_upload is measured against this instant (any pandas-parsable
+# timestamp, naive = UTC) so reruns give identical features; unset means
+# today's midnight UTC.
+REFERENCE_TIME = os.getenv("YT_REFERENCE_TIME")
 
 # -------------------------------------------------------
 #  Utility functions
 # -------------------------------------------------------
+# ISO-8601 durations from the API (PT1H2M3S, P1DT2H, P0D) or clock
+# strings from scraped pages (1:02:03, 3:59)
+DURATION_PATTERN = re.compile(
+    r"^\s*(?:"
+    r"P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?"
+    r"|(?:(?P<clock_hours>\d+):)?(?P<clock_minutes>\d+):(?P<clock_seconds>\d{2})"
+    r")\s*$"
+)
+
+def parse_duration(durations):
+    """Vectorized duration parser: Series of duration strings -> float minutes (NaN for garbage).
+
+    Durations repeat a lot, so each distinct string is parsed once with a
+    single `str.extract` and the result is broadcast back to every row.
+    """
+    durations = pd.Series(durations)
+    codes, uniques = pd.factorize(durations.astype("string").str.upper())
+    if len(uniques) == 0:
+        return pd.Series(np.nan, index=durations.index, dtype="float64")
+
+    parts = pd.Series(uniques).str.extract(DURATION_PATTERN).astype("float64")
+    matched = parts.notna().any(axis=1)
+    parts = parts.fillna(0.0)
+    minutes = (
+        parts["days"] * 1440
+        + (parts["hours"] + parts["clock_hours"]) * 60
+        + parts["minutes"] + parts["clock_minutes"]
+        + (parts["seconds"] + parts["clock_seconds"]) / 60
+    ).where(matched).to_numpy()
+
+    # factorize marks missing values with code -1
+    result = np.where(codes >= 0, minutes[codes], np.nan)
+    return pd.Series(result, index=durations.index, dtype="float64")
+
 def convert_duration(duration_str):
-    """Convert PT#M#S or MM:SS to float minutes."""
-    if pd.isna(duration_str):
-        return np.nan
-    s = str(duration_str).strip()
-    if s.startswith("PT"):
-        m = re.search(r"(\d+)M", s)
-        sec = re.search(r"(\d+)S", s)
-        return (int(m.group(1)) if m else 0) + (int(sec.group(1)) if sec else 0) / 60
-    if ":" in s:
-        parts = s.split(":")
-        try:
-            return int(parts[0]) + int(parts[1]) / 60
-        except:
-            return np.nan
-    return np.nan
-
-def to_datetime_safe(val):
-    try:
-        return pd.to_datetime(val, errors="coerce").tz_localize(None)
-    except Exception:
-        return pd.NaT
+    """Convert a single duration (PT#H#M#S, P#DT..., H:MM:SS or MM:SS) to float minutes."""
+    return parse_duration(pd.Series([duration_str])).iloc[0]
+
+def parse_upload_dates(values):
+    """Vectorized date parser: naive or offset ISO strings -> naive UTC timestamps (NaT for garbage).
+
+    Naive values are taken as UTC. Whatever the ISO parser rejects is
+    retried once with per-element format inference.
+    """
+    values = pd.Series(values)
+    parsed = pd.to_datetime(values, utc=True, format="ISO8601", errors="coerce")
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], utc=True, format="mixed", errors="coerce")
+    return parsed.dt.tz_convert(None)
+
+def reference_time():
+    """The pinned 'now' for days_since_upload as a naive UTC timestamp."""
+    if REFERENCE_TIME:
+        return pd.to_datetime(REFERENCE_TIME, utc=True).tz_convert(None)
+    return pd.Timestamp.now(tz="UTC").normalize().tz_convert(None)
 
 def keyword_density(text):
+    """Number of 3+ letter ASCII words in one text (0 for missing)."""
     if not isinstance(text, str):
         return 0
-    return len(re.findall(r"\b[a-zA-Z]{3,}\b", text))
+    return len(KEYWORD_PATTERN.findall(text))
+
+def _count_keywords(texts):
+    findall = KEYWORD_PATTERN.findall
+    return [len(findall(t)) if isinstance(t, str) else 0 for t in texts]
+
+def keyword_counts(texts, workers=None, chunk_rows=TEXT_CHUNK_ROWS):
+    """Vectorized keyword_density over a Series of texts.
+
+    Each distinct text is counted once. With workers > 1 and more than
+    `chunk_rows` distinct texts, chunks are counted in a process pool
+    (spawned, so it is safe to call from the pipeline's worker threads).
+    """
+    texts = pd.Series(texts, dtype=object)
+    codes, uniques = pd.factorize(texts)
+    uniques = list(uniques)
+    workers = TEXT_WORKERS if workers is None else workers
+
+    if workers <= 1 or len(uniques) <= chunk_rows:
+        counts = _count_keywords(uniques)
+    else:
+        chunks = [uniques[i:i + chunk_rows] for i in range(0, len(uniques), chunk_rows)]
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            counts = [n for chunk in pool.map(_count_keywords, chunks) for n in chunk]
+
+    # factorize marks missing values with code -1
+    counts = np.asarray(counts + [0], dtype="int64")
+    return pd.Series(counts[codes], index=texts.index)
+
+def title_features(titles):
+    """(title_length, word_count_title, has_music_keyword) for a Series of titles.
+
+    Runs on pyarrow compute kernels when pyarrow is installed, .str otherwise.
+    """
+    titles = pd.Series(titles).astype(str)
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return (
+            titles.str.len(),
+            titles.str.split().str.len(),
+            titles.str.contains(MUSIC_PATTERN, case=False).astype(int),
+        )
+
+    arr = pa.array(titles, type=pa.string())
+    # str.split() semantics: no empty tokens, so blank titles have 0 words
+    trimmed = pc.utf8_trim_whitespace(arr)
+    words = pc.if_else(pc.equal(trimmed, ""), 0, pc.list_value_length(pc.utf8_split_whitespace(trimmed)))
+    columns = (
+        pc.utf8_length(arr),
+        words,
+        pc.cast(pc.match_substring_regex(arr, MUSIC_PATTERN, ignore_case=True), pa.int64()),
+    )
+    return tuple(pd.Series(c.to_numpy(), index=titles.index, dtype="int64") for c in columns)
 
 # -------------------------------------------------------
 #  Feature functions
 # -------------------------------------------------------
 def basic_text_features(df):
-    df["title_length"] = df["title"].astype(str).apply(len)
-    df["word_count_title"] = df["title"].astype(str).apply(lambda x: len(x.split()))
-    df["has_music_keyword"] = df["title"].str.contains("music|official|video|remix", case=False, regex=True).astype(int)
+    df["title_length"], df["word_count_title"], df["has_music_keyword"] = title_features(df["title"])
     if "description" in df.columns:
-        df["desc_keyword_count"] = df["description"].apply(keyword_density)
+        df["desc_keyword_count"] = keyword_counts(df["description"])
     return df
 
-def time_features(df):
+def time_features(df, reference=None):
     if "upload_date" in df.columns:
-        df["upload_date"] = df["upload_date"].apply(to_datetime_safe)
-        now = pd.Timestamp.now()
-        df["days_since_upload"] = (now - df["upload_date"]).dt.days
-        df["upload_year"] = df["upload_date"].dt.year
-        df["upload_month"] = df["upload_date"].dt.month
-        df["upload_weekday"] = df["upload_date"].dt.weekday
+        uploaded = parse_upload_dates(df["upload_date"])
+        reference = reference_time() if reference is None else reference
+        df["upload_date"] = uploaded
+        df["days_since_upload"] = (reference - uploaded).dt.days
+        df["upload_year"] = uploaded.dt.year
+        df["upload_month"] = uploaded.dt.month
+        df["upload_weekday"] = uploaded.dt.weekday
+        df["upload_hour"] = uploaded.dt.hour
+    return df
+
+def refresh_time_features(df, reference=None):
+    """Recompute the reference-relative features of an already featurized frame."""
+    df = time_features(df, reference)
+    if "days_since_upload" in df.columns:
+        df["log_days_since_upload"] = np.log1p(df["days_since_upload"])
     return df
 
 def engagement_features(df):
@@ -80,26 +194,52 @@ def log_and_ratio_features(df):
             df[f"log_{col}"] = np.log1p(df[col])
     return df
 
+def tag_features(df):
+    if "tags" in df.columns:
+        df["tag_count"] = df["tags"].astype(str).apply(lambda x: len(x.split("|")) if "|" in x else len(x.split(",")))
+    return df
+
 # -------------------------------------------------------
-#  Apply to both datasets
+#  Stage function
 # -------------------------------------------------------
-for name, df in [("Scraped", df_scraped), ("API", df_api)]:
-    print(f"Processing {name} dataset...")
+def engineer_features(df, reference=None):
+    """Return a copy of a cleaned frame with every engineered feature added.
+
+    `reference` pins days_since_upload (default: reference_time()).
+    """
+    df = df.copy()
     if "duration" in df.columns:
-        df["duration_mins"] = df["duration"].apply(convert_duration)
+        df["duration_mins"] = parse_duration(df["duration"])
     df = basic_text_features(df)
-    df = time_features(df)
+    df = time_features(df, reference)
     df = engagement_features(df)
     df = log_and_ratio_features(df)
-    if "tags" in df.columns:
-        df["tag_count"] = df["tags"].astype(str).apply(lambda x: len(x.split("|")) if "|" in x else len(x.split(",")))
+    df = tag_features(df)
+    return df
+
+
+def main():
+    df_scraped = load_table(CLEAN_SCRAPED)
+    df_api = load_table(CLEAN_API)
+
+    # Only new or changed videos are featurized, the rest come from the feature store;
+    # channel aggregates are joined from the channel index after it takes in the rows
+    from channel_index import ChannelIndex
+    from feature_store import FeatureStore
+
+    results = {}
+    for name, df, table in [("Scraped", df_scraped, FE_SCRAPED), ("API", df_api, FE_API)]:
+        print(f"Processing {name} dataset...")
+        results[name] = ChannelIndex(table).add_features(FeatureStore(table).featurize(df))
+
+    print(" Feature engineering complete.")
+
+    # === Save engineered datasets ===
+    save_table(results["Scraped"], FE_SCRAPED)
+    save_table(results["API"], FE_API)
 
-print(" Feature engineering complete.")
+    print("Feature-engineered datasets saved to /data/")
 
-# === Save engineered datasets ===
-FE_SCRAPED = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_features.csv")
-FE_API = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_api_features.csv")
-df_scraped.to_csv(FE_SCRAPED, index=False)
-df_api.to_csv(FE_API, index=False)
 
-print("Feature-engineered datasets saved to /data/")
+if __name__ == "__main__":
+    main()
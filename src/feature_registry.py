@@ -0,0 +1,163 @@
+"""
+feature_registry.py
+Which columns may be model features: declared lineage plus a leakage guard.
+
+Every numeric column a model can see is declared in FEATURES with the source
+columns it is computed from (or matched by one of FEATURE_PATTERNS, e.g.
+data_cleaning's "<col>_scaled"). A column whose lineage reaches the target is
+never a feature, so neither log_views nor likes_to_views nor
+log_views_scaled can leak views into a views model. Undeclared columns are
+left out too (with a warning) until they are declared here.
+
+    X = model_features(df)                       # numeric, declared, not target-derived
+    keep = select_features(X_train, y_train)     # drop columns a quick model finds useless
+"""
+
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+
+TARGET = "views"
+
+# Feature -> the columns it is computed from (a raw column lists itself)
+FEATURES = {
+    # Collected / cleaned columns (preprocessing.py)
+    "views": ["views"],
+    "likes": ["likes"],
+    "comments": ["comments"],
+    "category_id": ["category_id"],
+    # feature_engineering.py
+    "duration_mins": ["duration"],
+    "title_length": ["title"],
+    "word_count_title": ["title"],
+    "has_music_keyword": ["title"],
+    "desc_keyword_count": ["description"],
+    "days_since_upload": ["upload_date"],
+    "upload_year": ["upload_date"],
+    "upload_month": ["upload_date"],
+    "upload_weekday": ["upload_date"],
+    "upload_hour": ["upload_date"],
+    "engagement_rate": ["likes", "comments", "views"],
+    "likes_to_views": ["likes", "views"],
+    "comments_to_views": ["comments", "views"],
+    "likes_to_comments": ["likes", "comments"],
+    "tag_count": ["tags"],
+    # channel_index.py: aggregates over the channel's earlier uploads
+    "channel_video_count": ["channel", "upload_date"],
+    "channel_median_log_views": ["channel", "upload_date", "views"],
+    "channel_mean_log_views": ["channel", "upload_date", "views"],
+    "channel_std_log_views": ["channel", "upload_date", "views"],
+    "channel_median_engagement": ["channel", "upload_date", "likes", "comments", "views"],
+}
+
+# Families of derived columns: pattern -> function of the match giving the sources
+FEATURE_PATTERNS = [
+    (re.compile(r"^log_(.+)$"), lambda m: [m.group(1)]),       # log1p of a column
+    (re.compile(r"^(.+)_scaled$"), lambda m: [m.group(1)]),    # data_cleaning.py standardization
+]
+
+# Selection pass
+SELECTION_ROWS = 50_000   # rows the quick model is fitted on at most
+MIN_GAIN_SHARE = 0.005    # of the quick model's total split gain
+
+
+# -------------------------------------------------------
+#  Lineage
+# -------------------------------------------------------
+def direct_sources(column):
+    """Columns `column` is computed from, or None if it is not declared."""
+    if column in FEATURES:
+        return FEATURES[column]
+    for pattern, sources in FEATURE_PATTERNS:
+        match = pattern.match(column)
+        if match:
+            return sources(match)
+    return None
+
+
+def lineage(column, _seen=None):
+    """Every column `column` is ultimately computed from (itself included), or None if undeclared."""
+    seen = _seen if _seen is not None else set()
+    if column in seen:
+        return set()
+    seen.add(column)
+    sources = direct_sources(column)
+    if sources is None:
+        return None
+    result = {column}
+    for source in sources:
+        if source != column:
+            upstream = lineage(source, seen)
+            result |= upstream if upstream is not None else {source}
+    return result
+
+
+def is_leaky(column, target=TARGET):
+    sources = lineage(column)
+    return sources is not None and target in sources
+
+
+def model_features(df, target=TARGET):
+    """Numeric columns of `df` that are declared here and not derived from `target`."""
+    numeric = df.select_dtypes(include=[np.number]).columns
+    leaky = [c for c in numeric if c != target and is_leaky(c, target)]
+    undeclared = [c for c in numeric if lineage(c) is None]
+    if leaky:
+        print(f" Leakage guard: excluding {len(leaky)} target-derived column(s): {', '.join(leaky)}")
+    if undeclared:
+        print(f" Leakage guard: excluding {len(undeclared)} undeclared column(s) "
+              f"(declare them in feature_registry.py): {', '.join(undeclared)}")
+    return df[[c for c in numeric if c != target and c not in leaky and c not in undeclared]]
+
+
+# -------------------------------------------------------
+#  Selection
+# -------------------------------------------------------
+def select_features(X, y, min_gain_share=MIN_GAIN_SHARE, max_rows=SELECTION_ROWS, seed=42, n_jobs=-1):
+    """Columns of X worth training on.
+
+    Constant columns go first. A small XGBoost is then fitted on (a sample
+    of) three quarters of the rows; a column is kept if it carries at least
+    `min_gain_share` of the model's split gain and shuffling it on the
+    remaining quarter makes the model worse. `n_jobs` is the quick model's
+    thread count (callers already running in parallel pass their share).
+    """
+    start = time.perf_counter()
+    varying = [c for c in X.columns if X[c].nunique(dropna=True) > 1]
+    if len(varying) <= 1:
+        return varying
+
+    rng = np.random.default_rng(seed)
+    y = pd.Series(np.asarray(y, dtype="float64"), index=X.index)
+    rows = rng.choice(len(X), size=min(len(X), max_rows), replace=False)
+    X_sample = X.iloc[rows][varying].astype("float64")
+    X_fit, X_check, y_fit, y_check = train_test_split(X_sample, y.iloc[rows], test_size=0.25, random_state=seed)
+
+    model = XGBRegressor(n_estimators=100, max_depth=4, learning_rate=0.2, tree_method="hist",
+                         random_state=seed, n_jobs=n_jobs)
+    model.fit(X_fit, y_fit)
+    gain = model.get_booster().get_score(importance_type="total_gain")
+    total = sum(gain.values()) or 1.0
+
+    def rmse(frame):
+        return float(np.sqrt(np.mean((model.predict(frame) - y_check.to_numpy()) ** 2)))
+
+    base = rmse(X_check)
+    keep = []
+    for col in varying:
+        share = gain.get(col, 0.0) / total
+        shuffled = X_check.copy()
+        shuffled[col] = rng.permutation(shuffled[col].to_numpy())
+        if share >= min_gain_share and rmse(shuffled) > base:
+            keep.append(col)
+    if not keep:
+        keep = [max(varying, key=lambda c: gain.get(c, 0.0))]
+
+    dropped = [c for c in X.columns if c not in keep]
+    print(f" Feature selection: kept {len(keep)} of {X.shape[1]} in {time.perf_counter() - start:.1f}s"
+          + (f" (dropped: {', '.join(dropped)})" if dropped else ""))
+    return keep
@@ -0,0 +1,107 @@
+"""
+feature_store.py
+Incremental feature engineering: only new or changed videos are featurized.
+
+Each features table has a companion store table ("<features table>_store")
+holding the engineered columns of the last run's rows (text columns that pass
+through unchanged, like titles and descriptions, are not duplicated there)
+plus three bookkeeping columns:
+
+    _key          video_id (API) or url (scraped)
+    _source_hash  hash of every cleaned source field of the row
+    _code_hash    hash of feature_engineering.py when the row was computed
+
+A row whose (_key, _source_hash) pair is already in the store is copied from
+it; everything else goes through engineer_features. Time-relative features
+(days_since_upload and its log) are recomputed for copied rows from their
+stored upload_date, so they stay correct against today's reference time.
+Editing feature_engineering.py invalidates the whole store.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import feature_engineering as fe
+from schema import is_category
+from storage import DATA_DIR, find_table, load_table, save_table
+
+KEY_COLUMNS = ["video_id", "url"]
+KEY_COL, HASH_COL, CODE_COL = "_key", "_source_hash", "_code_hash"
+
+
+def code_hash():
+    with open(fe.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def row_keys(df):
+    """video_id or url of every row (empty strings if the frame has neither)."""
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            return df[col].astype(str).to_numpy()
+    return np.full(len(df), "", dtype=object)
+
+
+def source_hashes(df):
+    """One 64-bit hash per row over all of its source fields (order-sensitive)."""
+    hashes = pd.util.hash_pandas_object(df[sorted(df.columns)], index=False)
+    return hashes.to_numpy().view("int64")  # signed, so CSV stores round-trip
+
+
+class FeatureStore:
+    """Caches engineer_features output per row across runs."""
+
+    def __init__(self, features_table, data_dir=DATA_DIR):
+        self.name = f"{features_table}_store"
+        self.data_dir = data_dir
+
+    def load(self):
+        """The stored rows, or None if there is no store or it predates the feature code."""
+        if find_table(self.name, self.data_dir) is None:
+            return None
+        store = load_table(self.name, data_dir=self.data_dir)
+        if store.empty or store[CODE_COL].iloc[0] != code_hash():
+            print(f" Feature store {self.name}: feature code changed, recomputing everything")
+            return None
+        store[KEY_COL] = store[KEY_COL].astype(str)
+        return store
+
+    def featurize(self, df):
+        """engineer_features(df), reusing stored rows for unchanged videos, then update the store."""
+        keys, hashes = row_keys(df), source_hashes(df)
+        hit = np.zeros(len(df), dtype=bool)
+        cached = None
+
+        store = self.load()
+        if store is not None:
+            store = store.drop_duplicates([KEY_COL, HASH_COL]).set_index([KEY_COL, HASH_COL])
+            positions = store.index.get_indexer(pd.MultiIndex.from_arrays([keys, hashes]))
+            hit = positions >= 0
+            cached = store.iloc[positions[hit]].drop(columns=[CODE_COL]).reset_index(drop=True)
+            passthrough = df.loc[hit, ~df.columns.isin(cached.columns)].reset_index(drop=True)
+            cached = pd.concat([passthrough, cached], axis=1)
+            # engineer_features order: source columns first, then new features
+            cached = cached[list(df.columns) + [c for c in cached.columns if c not in df.columns]]
+            cached = fe.refresh_time_features(cached)
+            cached.index = np.flatnonzero(hit)
+
+        parts = [cached] if hit.any() else []
+        if not hit.all():
+            fresh = fe.engineer_features(df[~hit].reset_index(drop=True))
+            fresh.index = np.flatnonzero(~hit)
+            parts.append(fresh)
+        columns = parts[-1].columns
+        result = pd.concat([p[columns] for p in parts]).sort_index() if len(parts) > 1 else parts[0]
+        result.index = df.index
+
+        # Unchanged text columns are rebuilt from the input on the next run
+        passthrough = [c for c in df.columns if c in result.columns
+                   and (result[c].dtype == object or is_category(result[c]))]
+        stored = result.drop(columns=passthrough).reset_index(drop=True)
+        stored[KEY_COL], stored[HASH_COL], stored[CODE_COL] = keys, hashes, code_hash()
+        save_table(stored, self.name, data_dir=self.data_dir)
+
+        print(f" Feature store {self.name}: {int(hit.sum())} rows reused, {int((~hit).sum())} featurized")
+        return result
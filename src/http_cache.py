@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+# -------------------------------
+# On-disk HTTP response cache for the collectors
+# -------------------------------
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "http_cache")
+STATS_PATH = os.path.join(CACHE_DIR, "last_run_stats.json")
+DEFAULT_TTL = float(os.getenv("YT_CACHE_TTL", 6 * 3600))                 # seconds
+DEFAULT_MAX_BYTES = int(os.getenv("YT_CACHE_MAX_MB", 500)) * 1024 * 1024
+
+# Never part of the cache key, so rotating the API key keeps the cache valid
+SECRET_PARAMS = {"key", "api_key"}
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response when a body is served from disk."""
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.encoding = "utf-8"
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache:
+    """Content-addressed response cache with a TTL and size-based LRU eviction.
+
+    Entries are keyed by sha256(url + sorted params, minus secrets). Expired
+    entries that carry an ETag or Last-Modified are revalidated with a
+    conditional request; a 304 refreshes the entry without re-downloading it.
+    The size of the stored bodies is tracked as they are written, so the
+    directory is only scanned once up front and when it is over budget.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    # ---- keys and files ----
+    def key(self, url, params=None):
+        clean = sorted((k, str(v)) for k, v in (params or {}).items()
+                       if v is not None and k not in SECRET_PARAMS)
+        return hashlib.sha256(f"{url}?{urlencode(clean)}".encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.body"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read(self, key):
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, encoding="utf-8") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def _entries(self):
+        """(mtime, size, key) of every stored body."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".body"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name[:-5]))
+        return entries
+
+    def _write(self, key, meta, body=None):
+        """Store an entry; returns how many bytes the stored bodies grew by."""
+        body_path, meta_path = self._paths(key)
+        grown = 0
+        for path, content in ((body_path, body), (meta_path, json.dumps(meta))):
+            if content is None:
+                continue
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(content)
+            if path == body_path:
+                grown = os.path.getsize(tmp) - (os.path.getsize(path) if os.path.exists(path) else 0)
+            os.replace(tmp, path)
+        return grown
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    # ---- public API ----
+    def get(self, session, url, params=None, limiter=None, refresh=False, **kwargs):
+        """GET through the cache. `limiter` is only acquired when the network is used."""
+        key = self.key(url, params)
+        meta, body = (None, None) if refresh else self._read(key)
+
+        if meta is not None and time.time() - meta["stored_at"] < self.ttl:
+            self._count("hits")
+            os.utime(self._paths(key)[0])  # mark as recently used for LRU
+            return CachedResponse(meta["status"], body, meta.get("headers", {}))
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        if limiter is not None:
+            limiter.acquire()
+        response = session.get(url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            self._count("revalidated")
+            meta["stored_at"] = time.time()
+            self._write(key, meta)
+            os.utime(self._paths(key)[0])
+            return CachedResponse(meta["status"], body, meta.get("headers", {}))
+
+        self._count("misses")
+        if response.status_code == 200:
+            response.encoding = response.encoding or "utf-8"
+            grown = self._write(key, {
+                "url": url,
+                "status": response.status_code,
+                "stored_at": time.time(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+            }, response.text)
+            self._count("stored")
+            with self.lock:
+                self.total_bytes += grown
+                over = self.total_bytes > self.max_bytes
+            if over:
+                self.evict()
+        response.from_cache = False
+        return response
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        with self.lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for path in self._paths(key):
+                    if os.path.exists(path):
+                        os.remove(path)
+                total -= size
+                self.stats["evicted"] += 1
+            self.total_bytes = total
+
+    def summary(self):
+        s = self.stats
+        return (f"HTTP cache: {s['hits']} hits, {s['revalidated']} revalidated, "
+                f"{s['misses']} misses, {s['evicted']} evicted")
+
+    def save_stats(self, name):
+        """Record this collector's counters so run_all.py can report them."""
+        all_stats = load_run_stats()
+        all_stats[name] = {**self.stats, "saved_at": time.time()}
+        with open(STATS_PATH, "w", encoding="utf-8") as f:
+            json.dump(all_stats, f, indent=2)
+
+
+def load_run_stats(since=None):
+    """Collector name -> counters of its last cached run (only runs saved at or after `since`, if given)."""
+    if not os.path.exists(STATS_PATH):
+        return {}
+    try:
+        with open(STATS_PATH, encoding="utf-8") as f:
+            stats = json.load(f)
+    except ValueError:
+        return {}
+    if since is not None:
+        stats = {name: s for name, s in stats.items() if s.get("saved_at", 0) >= since}
+    return stats
@@ -0,0 +1,107 @@
+"""
+load_test.py
+Throughput and tail latency of serve.py at increasing concurrency.
+
+    python src/serve.py &
+    python src/load_test.py --model api_xgboost --concurrency 1,4,16,64 --requests 2000
+
+Each client thread keeps one HTTP connection open and sends `--batch` raw
+videos per request (sampled from the model's raw table in data/) as fast as
+it gets answers. For every concurrency level it prints requests/s, videos/s,
+p50/p95/p99 latency and the average micro-batch size the server formed
+(from GET /health). Start the server with --max-batch 1 to compare against
+unbatched scoring.
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+import requests
+
+from storage import load_table
+
+URL = "http://127.0.0.1:8000"
+RAW_TABLES = {"scraped": "youtube_scraped_raw", "api": "youtube_api_raw"}
+
+
+def sample_videos(table, limit=10_000):
+    """Raw video dicts to send, as JSON-ready records."""
+    df = load_table(table).head(limit)
+    return json.loads(df.to_json(orient="records"))
+
+
+def health(url):
+    return requests.get(f"{url}/health", timeout=10).json()["models"]
+
+
+def run_level(url, model, videos, concurrency, total_requests, batch):
+    """Send `total_requests` requests from `concurrency` threads; returns (latencies in s, errors, seconds)."""
+    latencies, errors = [], []
+    counter = iter(range(total_requests))
+    lock = threading.Lock()
+
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = (i * batch) % len(videos)
+            payload = {"model": model, "videos": videos[start:start + batch] or videos[:batch]}
+            t0 = time.perf_counter()
+            try:
+                response = session.post(f"{url}/predict", json=payload, timeout=60)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - t0
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies), len(errors), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the prediction service.")
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--model", default="scraped_xgboost", help="model to request (must be loaded by serve.py)")
+    parser.add_argument("--table", help="raw table to sample videos from (default: by model source)")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per concurrency level")
+    parser.add_argument("--batch", type=int, default=1, help="videos per request")
+    args = parser.parse_args()
+
+    table = args.table or RAW_TABLES[args.model.split("_")[0]]
+    videos = sample_videos(table)
+    print(f"Load test: {args.model} at {args.url}, {args.requests} requests of {args.batch} video(s) per level "
+          f"(sampled from {table})")
+
+    # Warm-up so the first level doesn't pay for lazy imports/JIT in the server
+    run_level(args.url, args.model, videos, 1, 5, args.batch)
+
+    print(f"{'clients':>8} {'req/s':>9} {'videos/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'batch':>7} {'errors':>7}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        before = health(args.url)[args.model]
+        latencies, errors, seconds = run_level(args.url, args.model, videos, concurrency, args.requests, args.batch)
+        after = health(args.url)[args.model]
+        batches = after["batches"] - before["batches"]
+        avg_batch = (after["rows"] - before["rows"]) / batches if batches else 0.0
+        ms = latencies * 1000 if len(latencies) else np.zeros(1)
+        print(f"{concurrency:>8} {len(latencies) / seconds:>9,.0f} {len(latencies) * args.batch / seconds:>10,.0f} "
+              f"{np.percentile(ms, 50):>8.1f} {np.percentile(ms, 95):>8.1f} {np.percentile(ms, 99):>8.1f} "
+              f"{ms.max():>8.1f} {avg_batch:>7.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 # YOUTUBE POPULARITY PREDICTION (API DATASET MODEL)
 # ===============================================================
 
-import os
+import argparse
+
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -10,55 +11,64 @@ from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 
+import cv
+from feature_registry import model_features, select_features
+from model_registry import ModelRegistry, fingerprint
+from storage import load_table
+
 # ---------------------------------------------------------------
-# 1. Load the cleaned dataset
+# 1. Cleaned dataset table (see storage.py)
 # ---------------------------------------------------------------
-DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_api_clean.csv")
-df_api = pd.read_csv(DATA_PATH)
-
-print(f"Loaded dataset: {df_api.shape[0]} rows, {df_api.shape[1]} columns")
+DATA_TABLE = "youtube_api_clean"
+# Display name -> model registry name (models/<name>/...)
+REGISTRY_NAMES = {"Random Forest (API)": "api_random_forest", "XGBoost (API)": "api_xgboost"}
 
 # ---------------------------------------------------------------
 # 2. Prepare numeric features & clean target
 # ---------------------------------------------------------------
 def prepare_features(df, target_col="views"):
-    df_num = df.select_dtypes(include=["number"]).copy()
+    # Declared, non-target-derived numeric columns only (see feature_registry.py)
+    X = model_features(df, target_col)
 
     # Convert target column to numeric
-    if target_col not in df_num.columns and target_col in df.columns:
-        df_num[target_col] = pd.to_numeric(df[target_col], errors="coerce")
+    y = pd.to_numeric(df[target_col], errors="coerce")
+    y = y.replace([np.inf, -np.inf, np.nan], np.nan).dropna()
+    return X.loc[y.index], y
 
-    y = df_num[target_col].replace([np.inf, -np.inf, np.nan], np.nan).dropna()
-    X = df_num.loc[y.index].drop(columns=[target_col])
-    return X, y
+def split_data(df_api):
+    """Honest numeric features, log1p(views) and the 80/20 train/test split every API model is scored on."""
+    X_api, y_api = prepare_features(df_api, "views")
+    print(f"Numeric features: {X_api.shape[1]} | Target samples: {len(y_api)}")
 
-X_api, y_api = prepare_features(df_api, "views")
-print(f"Numeric features: {X_api.shape[1]} | Target samples: {len(y_api)}")
+    # Clean & log-transform target variable
+    y_api_clean = y_api.replace([np.inf, -np.inf], np.nan).dropna()
+    valid_idx = y_api_clean.index
+    X_api_clean = X_api.loc[valid_idx]
+    y_api_log = np.log1p(y_api_clean)
 
-# ---------------------------------------------------------------
-# 3. Clean & log-transform target variable
-# ---------------------------------------------------------------
-y_api_clean = y_api.replace([np.inf, -np.inf], np.nan).dropna()
-valid_idx = y_api_clean.index
-X_api_clean = X_api.loc[valid_idx]
-y_api_log = np.log1p(y_api_clean)
+    # Train/Test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_api_clean, y_api_log, test_size=0.2, random_state=42
+    )
 
-# Train/Test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X_api_clean, y_api_log, test_size=0.2, random_state=42
-)
+    # Prune columns that don't help (decided on the training split only)
+    keep = select_features(X_train, y_train)
+    X_train, X_test = X_train[keep], X_test[keep]
 
-print(f"Clean target range: min={y_api_clean.min():.0f}, max={y_api_clean.max():.0f}")
-print(f"Train/Test split  {X_train.shape}, {X_test.shape}")
+    print(f"Clean target range: min={y_api_clean.min():.0f}, max={y_api_clean.max():.0f}")
+    print(f"Train/Test split  {X_train.shape}, {X_test.shape}")
+    return X_train, X_test, y_train, y_test
 
 # ---------------------------------------------------------------
-# 4. Define models
+# 3. Define models
 # ---------------------------------------------------------------
-rf = RandomForestRegressor(random_state=42, n_estimators=200, max_depth=10)
-xgb = XGBRegressor(random_state=42, n_estimators=300, learning_rate=0.1, max_depth=6)
+def build_models():
+    rf = RandomForestRegressor(random_state=42, n_estimators=200, max_depth=10)
+    xgb = XGBRegressor(random_state=42, n_estimators=300, learning_rate=0.1, max_depth=6)
+    return {"Random Forest (API)": rf, "XGBoost (API)": xgb}
 
 # ---------------------------------------------------------------
-# 5. Train & evaluate function
+# 4. Train & evaluate function
 # ---------------------------------------------------------------
 def train_and_evaluate(model, X_train, X_test, y_train, y_test, name):
     model.fit(X_train, y_train)
@@ -75,8 +85,80 @@ def train_and_evaluate(model, X_train, X_test, y_train, y_test, name):
     return preds, rmse, r2
 
 # ---------------------------------------------------------------
-# 6. Train models
+# 5. Stage function
 # ---------------------------------------------------------------
-print("Training models...")
-train_and_evaluate(rf, X_train, X_test, y_train, y_test, "Random Forest (API)")
-train_and_evaluate(xgb, X_train, X_test, y_train, y_test, "XGBoost (API)")
+def train_models(df_api):
+    """Train both models on a cleaned API frame.
+
+    Models whose training data and hyperparameters match a version in the
+    model registry are loaded instead of retrained; new ones are registered.
+    Returns {model name: {"model", "rmse", "r2", "version"}}.
+    """
+    X_train, X_test, y_train, y_test = split_data(df_api)
+
+    print("Training models...")
+    registry = ModelRegistry()
+    results = {}
+    for name, model in build_models().items():
+        registry_name, fp = REGISTRY_NAMES[name], fingerprint(X_train, y_train, model)
+        version = registry.find(registry_name, fp)
+        if version:
+            model, meta, _ = registry.load(registry_name, version)
+            registry.set_current(registry_name, version)
+            rmse, r2 = meta["metrics"]["rmse"], meta["metrics"]["r2"]
+            print(f"{name}: unchanged, reusing {registry_name}/{version} RMSE={rmse:.2f}, R²={r2:.3f}")
+        else:
+            preds, rmse, r2 = train_and_evaluate(model, X_train, X_test, y_train, y_test, name)
+            predictions = pd.DataFrame({"y_true": np.asarray(y_test), "y_pred": np.log1p(preds)})
+            version = registry.save(registry_name, model, fp, X_train.columns, {"rmse": rmse, "r2": r2},
+                                    predictions=predictions,
+                                    extra={"train_rows": len(X_train), "test_rows": len(X_test)})
+        results[name] = {"model": model, "rmse": rmse, "r2": r2, "version": version}
+    return results
+
+
+def cross_validate_models(df_api, k=cv.CV_FOLDS, mode="kfold", workers=None, registry=None):
+    """K-fold or time-based CV of build_models() on the whole frame, with
+    select_features applied inside every training fold as in split_data.
+
+    Time-based folds need the upload_date column. Per-model mean/std metrics
+    are added to the current registered version's meta.json (run it right
+    after train_models). Returns the per-fold frame.
+    """
+    X_api, y_api = prepare_features(df_api, "views")
+    y_api = y_api.replace([np.inf, -np.inf], np.nan).dropna()
+    X_api = X_api.loc[y_api.index]
+    y_api_log = np.log1p(y_api)
+
+    order = cv.time_order(df_api.loc[X_api.index]) if mode == "time" else None
+    folds = cv.fold_indices(X_api, y_api_log, k, mode, order)
+    results = cv.cross_validate(build_models(), X_api, y_api_log, folds, workers, select=True)
+    summary = cv.report(results)
+
+    registry = registry or ModelRegistry()
+    for name, stats in summary.items():
+        registry_name = REGISTRY_NAMES[name]
+        if registry.versions(registry_name):
+            registry.update_meta(registry_name, registry.current(registry_name), cv={"mode": mode, **stats})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the API-data view models.")
+    parser.add_argument("--cv", type=int, metavar="K", help="also cross-validate with K folds")
+    parser.add_argument("--cv-mode", choices=cv.CV_MODES, default="kfold")
+    parser.add_argument("--workers", type=int, help="processes for the CV fits (default: CPUs)")
+    args = parser.parse_args()
+
+    # Only numeric columns are used, so descriptions and titles are never loaded
+    df_api = load_table(DATA_TABLE, numeric_only=True)
+    print(f"Loaded dataset: {df_api.shape[0]} rows, {df_api.shape[1]} columns")
+    train_models(df_api)
+    if args.cv:
+        if args.cv_mode == "time":
+            df_api["upload_date"] = load_table(DATA_TABLE, columns=["upload_date"])["upload_date"].to_numpy()
+        cross_validate_models(df_api, args.cv, args.cv_mode, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+model_registry.py
+Versioned local registry for trained models.
+
+    models/<name>/current.json              version the training stage last produced or reused
+    models/<name>/<version>/model.joblib    the fitted estimator
+    models/<name>/<version>/meta.json       fingerprint, hyperparameters, features, metrics
+    models/<name>/<version>/preprocess.json fill/scale artifact the model expects (if any)
+    models/<name>/<version>/predictions.*   test-set targets and predictions (log1p views)
+
+Training stages fingerprint their training data + hyperparameters; if a
+version with the same fingerprint exists it is loaded instead of retrained.
+Visualization and scoring load models from here rather than training their
+own.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import pandas as pd
+
+from preprocess_artifact import MODELS_DIR, from_jsonable, to_jsonable
+from storage import load_table, save_table
+
+
+def fingerprint(X, y, model, artifact=None):
+    """Hash of the training matrix, target, hyperparameters and preprocessing."""
+    h = hashlib.sha256()
+    X = pd.DataFrame(X)
+    h.update(json.dumps([str(c) for c in X.columns]).encode())
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(pd.Series(y), index=False).to_numpy().tobytes())
+    h.update(type(model).__name__.encode())
+    h.update(json.dumps(model.get_params(), sort_keys=True, default=str).encode())
+    if artifact is not None:
+        h.update(json.dumps(to_jsonable(artifact), sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+class ModelRegistry:
+    """Saves, finds and loads model versions under models/."""
+
+    def __init__(self, root=MODELS_DIR):
+        self.root = root
+
+    def _dir(self, name, version=None):
+        return os.path.join(self.root, name, version) if version else os.path.join(self.root, name)
+
+    def versions(self, name):
+        if not os.path.isdir(self._dir(name)):
+            return []
+        return sorted(v for v in os.listdir(self._dir(name))
+                      if os.path.exists(os.path.join(self._dir(name, v), "meta.json")))
+
+    def meta(self, name, version=None):
+        version = version or self.current(name)
+        with open(os.path.join(self._dir(name, version), "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def current(self, name):
+        """Version last produced or reused by training (falls back to the newest)."""
+        path = os.path.join(self._dir(name), "current.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["version"]
+        versions = self.versions(name)
+        if not versions:
+            raise FileNotFoundError(f"No registered versions of model '{name}' in {os.path.abspath(self.root)}")
+        return versions[-1]
+
+    def set_current(self, name, version):
+        path = os.path.join(self._dir(name), "current.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": version}, f)
+        os.replace(path + ".tmp", path)
+
+    def find(self, name, fp):
+        """Version of `name` trained with fingerprint `fp`, or None."""
+        for version in reversed(self.versions(name)):
+            if self.meta(name, version).get("fingerprint") == fp:
+                return version
+        return None
+
+    def save(self, name, model, fp, features, metrics, predictions=None, artifact=None, extra=None):
+        """Register a freshly trained model as the next version and make it current."""
+        versions = self.versions(name)
+        version = f"v{int(versions[-1][1:]) + 1:04d}" if versions else "v0001"
+        path = self._dir(name, version)
+        os.makedirs(path, exist_ok=True)
+
+        joblib.dump(model, os.path.join(path, "model.joblib"))
+        if artifact is not None:
+            with open(os.path.join(path, "preprocess.json"), "w", encoding="utf-8") as f:
+                json.dump(to_jsonable(artifact), f, indent=2)
+        if predictions is not None:
+            save_table(predictions, "predictions", data_dir=path)
+
+        meta = {
+            "name": name,
+            "version": version,
+            "fingerprint": fp,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model_class": type(model).__name__,
+            "params": json.loads(json.dumps(model.get_params(), default=str)),
+            "features": [str(c) for c in features],
+            "metrics": metrics,
+            "has_artifact": artifact is not None,
+            **(extra or {}),
+        }
+        # meta.json last: a version only counts once it is complete
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        self.set_current(name, version)
+        return version
+
+    def update_meta(self, name, version, **fields):
+        """Add or replace fields of a version's meta.json (e.g. cross-validation results)."""
+        meta = self.meta(name, version)
+        meta.update(fields)
+        path = os.path.join(self._dir(name, version), "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def load(self, name, version=None):
+        """(model, meta, artifact or None) of a version (default: current)."""
+        version = version or self.current(name)
+        path = self._dir(name, version)
+        meta = self.meta(name, version)
+        model = joblib.load(os.path.join(path, "model.joblib"))
+        artifact = None
+        if meta.get("has_artifact"):
+            with open(os.path.join(path, "preprocess.json"), encoding="utf-8") as f:
+                artifact = from_jsonable(json.load(f))
+        return model, meta, artifact
+
+    def predictions(self, name, version=None):
+        return load_table("predictions", data_dir=self._dir(name, version or self.current(name)))
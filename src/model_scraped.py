@@ -1,73 +1,83 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
-from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score
 
-# -------------------------------------------------------
-#  Load enhanced dataset
-# -------------------------------------------------------
-path = "data/youtube_scraped_features.csv"
-df = pd.read_csv(path)
-print(f" Loaded feature dataset: {df.shape[0]} rows, {df.shape[1]} columns")
+import cv
+from feature_registry import model_features, select_features
+from model_registry import ModelRegistry, fingerprint
+from preprocess_artifact import fit_artifact, save_artifact, transform
+from storage import load_table
+
+DATA_TABLE = "youtube_scraped_features"
+ARTIFACT = "model_scraped"  # models/model_scraped.preprocess.json
+# Display name -> model registry name (models/<name>/...)
+REGISTRY_NAMES = {"Random Forest (Tuned)": "scraped_random_forest", "XGBoost (Tuned)": "scraped_xgboost"}
 
 # -------------------------------------------------------
 #  Clean + select useful features
 # -------------------------------------------------------
-df = df.dropna(subset=["views"])
-df = df[df["views"] > 0]
+def prepare_data(df):
+    """Drop empty/outlier targets and split into numeric X and log1p(views)."""
+    df = df.dropna(subset=["views"])
+    df = df[df["views"] > 0]
 
-# Cap extreme outliers (top 1%)
-upper_cap = df["views"].quantile(0.99)
-df = df[df["views"] <= upper_cap]
+    # Cap extreme outliers (top 1%)
+    upper_cap = df["views"].quantile(0.99)
+    df = df[df["views"] <= upper_cap]
 
-# Select numeric features only
-X = df.select_dtypes(include=[np.number]).drop(columns=["views"], errors="ignore")
-y = df["views"]
+    # Declared numeric features not derived from views (see feature_registry.py)
+    X = model_features(df, "views")
+    y = df["views"]
 
-# Log transform target
-y_log = np.log1p(y)
+    # Log transform target
+    y_log = np.log1p(y)
+    return df, X, y_log
 
-print(f"Final numeric features: {X.shape[1]} | Samples: {len(y)}")
+def split_data(df):
+    """prepare_data + the 80/20 train/test split every scraped model is scored on, pruned by select_features."""
+    df, X, y_log = prepare_data(df)
+    print(f"Final numeric features: {X.shape[1]} | Samples: {len(y_log)}")
+    X_train, X_test, y_train, y_test = train_test_split(X, y_log, test_size=0.2, random_state=42)
 
-# -------------------------------------------------------
-#  Train/Test split + scale
-# -------------------------------------------------------
-X_train, X_test, y_train, y_test = train_test_split(X, y_log, test_size=0.2, random_state=42)
-scaler = StandardScaler()
-X_train = scaler.fit_transform(X_train)
-X_test = scaler.transform(X_test)
+    # Prune columns that don't help (decided on the training split only)
+    keep = select_features(X_train, y_train)
+    return X_train[keep], X_test[keep], y_train, y_test
 
 # -------------------------------------------------------
 #  Define tuned models
 # -------------------------------------------------------
-rf = RandomForestRegressor(
-    n_estimators=400,
-    max_depth=18,
-    min_samples_split=4,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1
-)
-
-xgb = XGBRegressor(
-    n_estimators=800,
-    learning_rate=0.05,
-    max_depth=8,
-    subsample=0.9,
-    colsample_bytree=0.8,
-    reg_alpha=0.2,
-    reg_lambda=0.8,
-    random_state=42,
-    n_jobs=-1
-)
+def build_models():
+    rf = RandomForestRegressor(
+        n_estimators=400,
+        max_depth=18,
+        min_samples_split=4,
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=-1
+    )
+
+    xgb = XGBRegressor(
+        n_estimators=800,
+        learning_rate=0.05,
+        max_depth=8,
+        subsample=0.9,
+        colsample_bytree=0.8,
+        reg_alpha=0.2,
+        reg_lambda=0.8,
+        random_state=42,
+        n_jobs=-1
+    )
+    return {"Random Forest (Tuned)": rf, "XGBoost (Tuned)": xgb}
 
 # -------------------------------------------------------
 #  Train & evaluate
 # -------------------------------------------------------
-def evaluate(model, name):
+def evaluate(model, name, X_train, X_test, y_train, y_test):
     model.fit(X_train, y_train)
     preds_log = model.predict(X_test)
     preds = np.expm1(preds_log)
@@ -75,8 +85,81 @@ def evaluate(model, name):
     rmse = np.sqrt(mean_squared_error(y_true, preds))
     r2 = r2_score(y_true, preds)
     print(f" {name}  RMSE: {rmse:,.0f}, R²: {r2:.3f}")
-    return rmse, r2
+    return rmse, r2, preds_log
+
+def train_models(df):
+    """Train both tuned models on a feature-engineered scraped frame.
+
+    The fill/scale artifact fitted on the training split is saved to
+    models/ so scoring reuses it. Every model goes to the model registry;
+    one whose training data and hyperparameters match a registered version
+    is loaded instead of retrained. Returns {model name: {"model", "rmse",
+    "r2", "artifact", "version"}}.
+    """
+    # Train/Test split + fill/scale (fitted on the training split only)
+    X_train, X_test, y_train, y_test = split_data(df)
+    artifact = fit_artifact(X_train)
+    save_artifact(artifact, ARTIFACT)
+    fingerprints = {name: fingerprint(X_train, y_train, model, artifact) for name, model in build_models().items()}
+    X_train_raw = X_train
+    X_train = transform(artifact, X_train)
+    X_test = transform(artifact, X_test)
+
+    print("\n Training tuned models on enhanced scraped data...\n")
+    registry = ModelRegistry()
+    results = {}
+    for name, model in build_models().items():
+        registry_name, fp = REGISTRY_NAMES[name], fingerprints[name]
+        version = registry.find(registry_name, fp)
+        if version:
+            model, meta, _ = registry.load(registry_name, version)
+            registry.set_current(registry_name, version)
+            rmse, r2 = meta["metrics"]["rmse"], meta["metrics"]["r2"]
+            print(f" {name}  unchanged, reusing {registry_name}/{version}  RMSE: {rmse:,.0f}, R²: {r2:.3f}")
+        else:
+            rmse, r2, preds_log = evaluate(model, name, X_train, X_test, y_train, y_test)
+            predictions = pd.DataFrame({"y_true": np.asarray(y_test), "y_pred": preds_log})
+            version = registry.save(registry_name, model, fp, X_train_raw.columns, {"rmse": rmse, "r2": r2},
+                                    predictions=predictions, artifact=artifact,
+                                    extra={"train_rows": len(X_train), "test_rows": len(X_test)})
+        results[name] = {"model": model, "rmse": rmse, "r2": r2, "artifact": artifact, "version": version}
+    return results
+
+
+def cross_validate_models(df, k=cv.CV_FOLDS, mode="kfold", workers=None, registry=None):
+    """K-fold or time-based CV of build_models() on the whole frame, with
+    select_features applied inside every training fold as in split_data.
+
+    Per-model mean/std metrics are added to the current registered version's
+    meta.json (run it right after train_models). Returns the per-fold frame.
+    """
+    df, X, y_log = prepare_data(df)
+    order = cv.time_order(df) if mode == "time" else None
+    folds = cv.fold_indices(X, y_log, k, mode, order)
+    results = cv.cross_validate(build_models(), X, y_log, folds, workers, preprocess=True, select=True)
+    summary = cv.report(results)
+
+    registry = registry or ModelRegistry()
+    for name, stats in summary.items():
+        registry_name = REGISTRY_NAMES[name]
+        if registry.versions(registry_name):
+            registry.update_meta(registry_name, registry.current(registry_name), cv={"mode": mode, **stats})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the scraped-data view models.")
+    parser.add_argument("--cv", type=int, metavar="K", help="also cross-validate with K folds")
+    parser.add_argument("--cv-mode", choices=cv.CV_MODES, default="kfold")
+    parser.add_argument("--workers", type=int, help="processes for the CV fits (default: CPUs)")
+    args = parser.parse_args()
+
+    df = load_table(DATA_TABLE, numeric_only=True)
+    print(f" Loaded feature dataset: {df.shape[0]} rows, {df.shape[1]} columns")
+    train_models(df)
+    if args.cv:
+        cross_validate_models(df, args.cv, args.cv_mode, args.workers)
+
 
-print("\n Training tuned models on enhanced scraped data...\n")
-evaluate(rf, "Random Forest (Tuned)")
-evaluate(xgb, "XGBoost (Tuned)")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# -------------------------------
+# In-process DAG pipeline runner
+# -------------------------------
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATE_PATH = os.path.join(ROOT, "data", ".pipeline_state.json")
+
+
+class Stage:
+    """One pipeline step.
+
+    `func` receives a dict of upstream results keyed by stage name and returns
+    its own result (anything, usually DataFrames). `inputs`/`outputs` are files
+    relative to the project root; a stage whose code and input files hash the
+    same as last time, and whose outputs still exist, is skipped.
+    `optional` stages (the collectors) may fail without blocking dependents.
+    """
+
+    def __init__(self, name, func, deps=(), inputs=(), outputs=(), code=(),
+                 always_run=False, optional=False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.always_run = always_run
+        self.optional = optional
+
+
+def file_digest(path, h):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+
+
+def stage_fingerprint(stage):
+    """sha256 over the stage's source files and input files."""
+    h = hashlib.sha256(stage.name.encode("utf-8"))
+    for rel in stage.code + stage.inputs:
+        path = os.path.join(ROOT, rel)
+        h.update(rel.encode("utf-8"))
+        if os.path.exists(path):
+            file_digest(path, h)
+        else:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+# -------------------------------
+# Memory sampling
+# -------------------------------
+def current_rss():
+    """Resident set size in bytes, or None if it cannot be read on this platform."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RSSSampler(threading.Thread):
+    """Samples process RSS in the background so each stage can report its peak."""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            rss = current_rss()
+            if rss is not None:
+                self.samples.append((time.perf_counter(), rss))
+            time.sleep(self.interval)
+
+    def peak_between(self, start, end):
+        values = [rss for t, rss in self.samples if start <= t <= end]
+        return max(values) if values else current_rss()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# -------------------------------
+# Output prefixing for parallel stages
+# -------------------------------
+class StagePrefixWriter:
+    """Stand-in for sys.stdout that tags each line with the stage that printed it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def set_stage(self, name):
+        self.local.name = name
+        self.local.buffer = ""
+
+    def write(self, text):
+        name = getattr(self.local, "name", None)
+        if name is None:
+            return self.stream.write(text)
+        self.local.buffer += text
+        *lines, self.local.buffer = self.local.buffer.split("\n")
+        with self.lock:
+            for line in lines:
+                self.stream.write(f"[{name}] {line}\n")
+        return len(text)
+
+    def flush(self):
+        name = getattr(self.local, "name", None)
+        if name is not None and self.local.buffer:
+            with self.lock:
+                self.stream.write(f"[{name}] {self.local.buffer}\n")
+            self.local.buffer = ""
+        self.stream.flush()
+
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+
+# -------------------------------
+# Runner
+# -------------------------------
+def load_state():
+    if os.path.exists(STATE_PATH):
+        try:
+            with open(STATE_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            pass
+    return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    with open(STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def run_pipeline(stages, max_workers=2, force=False, release=False):
+    """Run `stages` in dependency order, independent stages in parallel threads.
+
+    Returns (results, report) where report is a list of per-stage dicts with
+    status, wall time and peak RSS. With `release`, a stage's result is dropped
+    as soon as every stage depending on it has finished, so intermediate
+    DataFrames don't all stay in memory until the end (results then only
+    holds the stages nothing depends on).
+    """
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        for dep in s.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{s.name}' depends on unknown stage '{dep}'")
+
+    dependents = {s.name: [t.name for t in stages if s.name in t.deps] for s in stages}
+    state = load_state()
+    results, status, report = {}, {}, []
+    sampler = RSSSampler()
+    sampler.start()
+
+    writer = StagePrefixWriter(sys.stdout)
+    sys.stdout = writer
+
+    def execute(stage):
+        writer.set_stage(stage.name)
+        start = time.perf_counter()
+        fingerprint = stage_fingerprint(stage)
+        outputs_exist = all(os.path.exists(os.path.join(ROOT, p)) for p in stage.outputs)
+        try:
+            if (not force and not stage.always_run and stage.outputs and outputs_exist
+                    and state.get(stage.name) == fingerprint):
+                print("inputs unchanged, skipping")
+                return stage.name, "skipped", None, start, time.perf_counter()
+            upstream = {d: results.get(d) for d in stage.deps}
+            result = stage.func(upstream)
+            state[stage.name] = fingerprint
+            return stage.name, "ok", result, start, time.perf_counter()
+        except BaseException as e:  # scripts may call sys.exit
+            traceback.print_exc(file=sys.stdout)
+            print(f"failed: {e!r}")
+            return stage.name, "failed", None, start, time.perf_counter()
+        finally:
+            writer.flush()
+            writer.set_stage(None)
+
+    pending = list(stages)
+    running = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for stage in list(pending):
+                        if any(status.get(d) is None for d in stage.deps):
+                            continue
+                        pending.remove(stage)
+                        progressed = True
+                        blocked = [d for d in stage.deps
+                                   if status[d] in ("failed", "blocked") and not by_name[d].optional]
+                        if blocked:
+                            status[stage.name] = "blocked"
+                            report.append({"stage": stage.name, "status": "blocked", "seconds": 0.0, "peak_rss": None})
+                            print(f"=== {stage.name}: blocked by failed stage(s) {', '.join(blocked)} ===")
+                            continue
+                        print(f"\n=== {stage.name} ===")
+                        running[pool.submit(execute, stage)] = stage
+
+                if not running:
+                    if pending:
+                        raise ValueError(f"Dependency cycle among stages: {[s.name for s in pending]}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    name, st, result, start, end = future.result()
+                    status[name] = st
+                    results[name] = result
+                    report.append({"stage": name, "status": st, "seconds": end - start,
+                                   "peak_rss": sampler.peak_between(start, end)})
+                    if release:
+                        for dep in by_name[name].deps:
+                            if all(status.get(d) is not None for d in dependents[dep]):
+                                results.pop(dep, None)
+    finally:
+        sys.stdout = writer.stream
+        sampler.stop()
+        save_state(state)
+
+    return results, report
+
+
+def print_report(report):
+    print("\nStage summary:")
+    print(f"  {'stage':<28}{'status':<10}{'wall (s)':>10}{'peak RSS (MB)':>16}")
+    for row in report:
+        rss = f"{row['peak_rss'] / 1024 / 1024:,.0f}" if row["peak_rss"] else "n/a"
+        print(f"  {row['stage']:<28}{row['status']:<10}{row['seconds']:>10.1f}{rss:>16}")
+    total = sum(row["seconds"] for row in report)
+    print(f"  Sum of stage times: {total:.1f}s")
@@ -0,0 +1,193 @@
+"""
+predict.py
+Score new videos with a registered model (see model_registry.py).
+
+    python src/predict.py new_videos.csv --model scraped_xgboost --output predictions.csv
+    python src/predict.py dump.parquet --model api_xgboost --version v0003 --output preds.parquet
+    python src/predict.py videos.jsonl --model scraped_random_forest --output - --batch-size 20000
+
+The input is raw video metadata in the collectors' format (CSV, Parquet or
+JSON lines). It is read in batches; each batch is cleaned, featurized
+(channel aggregates come from the channel index, see channel_index.py),
+preprocessed with the model's saved artifact and scored, and its
+predictions are appended to the output before the next batch is read, so
+memory stays bounded however large the input is. Rows/s and p50/p99 batch
+latency are printed at the end.
+
+From Python:
+
+    scorer = Scorer("scraped_xgboost")
+    scorer.score(df)        # DataFrame with predicted_views per row
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import feature_engineering
+import preprocessing
+from channel_index import ChannelIndex
+from model_registry import ModelRegistry
+from preprocess_artifact import transform
+
+BATCH_SIZE = 50_000
+KEY_COLUMNS = ["video_id", "url"]  # copied to the output when present
+CLEANERS = {"scraped": preprocessing.preprocess_scraped, "api": preprocessing.preprocess_api}
+FEATURE_TABLES = {"scraped": feature_engineering.FE_SCRAPED, "api": feature_engineering.FE_API}
+
+
+# -------------------------------------------------------
+#  Scoring
+# -------------------------------------------------------
+class Scorer:
+    """A registered model plus everything needed to score raw rows with it."""
+
+    def __init__(self, name, version=None, registry=None):
+        registry = registry or ModelRegistry()
+        self.model, self.meta, self.artifact = registry.load(name, version)
+        self.name, self.version = name, self.meta["version"]
+        self.features = self.meta["features"]
+        source = self.meta.get("source") or name.split("_")[0]
+        if source not in CLEANERS:
+            raise ValueError(f"Don't know which cleaner model '{name}' expects (source '{source}')")
+        self.clean = CLEANERS[source]
+        # Read-only: scoring looks channels up but never adds the scored videos to history
+        self.channels = ChannelIndex(FEATURE_TABLES[source])
+        # One reference time for the whole run so every batch is featurized alike
+        self.reference = feature_engineering.reference_time()
+
+    def matrix(self, df):
+        """Model input matrix for a frame of raw rows."""
+        features = self.channels.join(feature_engineering.engineer_features(self.clean(df), self.reference))
+        if "text" in self.meta:
+            # Text models are pipelines that hash the text columns themselves (see text_features.py)
+            return features
+        if self.artifact is not None:
+            return transform(self.artifact, features)
+        # Models trained without an artifact saw a named frame; keep the names
+        X = features.reindex(columns=self.features)
+        return X.apply(pd.to_numeric, errors="coerce").astype("float64")
+
+    def score(self, df):
+        """predicted_views (and its log1p) for every row of `df`, plus its key column."""
+        preds_log = np.asarray(self.model.predict(self.matrix(df)), dtype="float64")
+        preds_log = np.nan_to_num(preds_log, nan=0.0, posinf=0.0, neginf=0.0)
+        out = pd.DataFrame(index=df.index)
+        for col in KEY_COLUMNS:
+            if col in df.columns:
+                out[col] = df[col].to_numpy()
+        out["predicted_log_views"] = preds_log
+        out["predicted_views"] = np.expm1(preds_log)
+        return out
+
+
+# -------------------------------------------------------
+#  Batched input / streaming output
+# -------------------------------------------------------
+def input_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    return "csv"
+
+
+def iter_batches(path, batch_size=BATCH_SIZE, columns=None):
+    """DataFrames of at most `batch_size` rows (and only `columns`, if given) from a CSV, Parquet or JSONL file."""
+    fmt = input_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == "jsonl":
+        with pd.read_json(path, lines=True, chunksize=batch_size, dtype=False) as reader:
+            for chunk in reader:
+                yield chunk if columns is None else chunk.reindex(columns=columns)
+    else:
+        with pd.read_csv(path, chunksize=batch_size, usecols=columns) as reader:
+            yield from reader
+
+
+class PredictionWriter:
+    """Appends prediction batches to a CSV, Parquet or JSONL file ('-' = CSV on stdout)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fmt = "csv" if path == "-" else input_format(path)
+        self.parquet = None
+        self.rows = 0
+
+    def write(self, df):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.path, table.schema)
+            self.parquet.write_table(table.cast(self.parquet.schema))
+        elif self.fmt == "jsonl":
+            with open(self.path, "a" if self.rows else "w", encoding="utf-8") as f:
+                df.to_json(f, orient="records", lines=True, force_ascii=False)
+        elif self.path == "-":
+            df.to_csv(sys.stdout, header=self.rows == 0, index=False)
+        else:
+            df.to_csv(self.path, mode="a" if self.rows else "w", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.parquet is not None:
+            self.parquet.close()
+
+
+def predict_file(input_path, output_path, name, version=None, batch_size=BATCH_SIZE):
+    """Score `input_path` batch by batch into `output_path`; returns the run statistics."""
+    scorer = Scorer(name, version)
+    writer = PredictionWriter(output_path)
+    latencies = []
+    start = time.perf_counter()
+    try:
+        for batch in iter_batches(input_path, batch_size):
+            batch_start = time.perf_counter()
+            preds = scorer.score(batch)
+            latencies.append(time.perf_counter() - batch_start)
+            writer.write(preds)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    stats = {
+        "model": f"{scorer.name}/{scorer.version}",
+        "rows": writer.rows,
+        "batches": len(latencies),
+        "seconds": elapsed,
+        "rows_per_s": writer.rows / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+    }
+    # Keep stdout clean for the predictions when writing them there
+    print(f"Scored {stats['rows']:,} rows with {stats['model']} in {elapsed:.1f}s "
+          f"({stats['rows_per_s']:,.0f} rows/s) | {stats['batches']} batches of <= {batch_size:,}: "
+          f"p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms",
+          file=sys.stderr if output_path == "-" else sys.stdout)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict views for new videos with a registered model.")
+    parser.add_argument("input", help="raw video metadata (.csv, .parquet or .jsonl)")
+    parser.add_argument("--model", default="scraped_xgboost", help="registered model name (models/<name>)")
+    parser.add_argument("--version", help="model version (default: the current one)")
+    parser.add_argument("--output", default="-", help="predictions file (.csv, .parquet, .jsonl) or - for stdout")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    predict_file(args.input, args.output, args.model, args.version, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
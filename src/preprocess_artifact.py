@@ -0,0 +1,105 @@
+"""
+preprocess_artifact.py
+Fitted preprocessing saved as JSON, so scoring never refits anything.
+
+An artifact is a plain dict, applied in this order:
+
+    columns  feature column order (columns missing from the input are created empty)
+    fill     {column: value} for missing entries (the training medians)
+    log      columns replaced by log1p(value)
+    scale    {column: {"mean", "std"}}, population std as StandardScaler
+
+    artifact = fit_artifact(X_train)
+    save_artifact(artifact, "model_scraped")     # models/model_scraped.preprocess.json
+    X = transform(load_artifact("model_scraped"), new_rows)
+
+data_cleaning.py stores its normalization parameters in the same format
+(see data_cleaning.apply_normalization for how it applies them).
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
+
+
+def fit_artifact(X, log_columns=()):
+    """Fill values and scaler parameters for the numeric frame X, in X's column order."""
+    X = X.apply(pd.to_numeric, errors="coerce").astype("float64")
+    fill = X.median().to_dict()
+    values = X.fillna(fill)
+    for col in log_columns:
+        values[col] = np.log1p(values[col])
+
+    means = values.mean()
+    stds = values.std(ddof=0)
+    scale = {col: {"mean": float(means[col]), "std": float(stds[col]) if stds[col] > 0 else 1.0}
+             for col in X.columns}
+    return {
+        "columns": list(X.columns),
+        "fill": {col: float(v) for col, v in fill.items()},
+        "log": list(log_columns),
+        "scale": scale,
+    }
+
+
+def transform(artifact, df):
+    """Apply a fitted artifact to `df`; returns a float64 array in artifact column order."""
+    columns = artifact["columns"]
+    X = df.reindex(columns=columns)
+    X = X.apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+
+    fill = np.array([artifact["fill"].get(c, np.nan) for c in columns], dtype="float64")
+    missing = np.isnan(X)
+    X[missing] = np.broadcast_to(fill, X.shape)[missing]
+
+    for col in artifact["log"]:
+        i = columns.index(col)
+        X[:, i] = np.log1p(X[:, i])
+
+    mean = np.array([artifact["scale"].get(c, {}).get("mean", 0.0) for c in columns], dtype="float64")
+    std = np.array([artifact["scale"].get(c, {}).get("std", 1.0) for c in columns], dtype="float64")
+    return (X - mean) / std
+
+
+def artifact_path(name, models_dir=MODELS_DIR):
+    return os.path.join(models_dir, f"{name}.preprocess.json")
+
+
+def to_jsonable(value):
+    """NaN is not valid JSON; store it as null."""
+    if isinstance(value, dict):
+        return {k: to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def from_jsonable(value):
+    if isinstance(value, dict):
+        return {k: from_jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [from_jsonable(v) for v in value]
+    return float("nan") if value is None else value
+
+
+def save_artifact(artifact, name, models_dir=MODELS_DIR):
+    """Write `artifact` as models/<name>.preprocess.json; returns the path."""
+    os.makedirs(models_dir, exist_ok=True)
+    path = artifact_path(name, models_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(to_jsonable(artifact), f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_artifact(name, models_dir=MODELS_DIR):
+    with open(artifact_path(name, models_dir), encoding="utf-8") as f:
+        return from_jsonable(json.load(f))
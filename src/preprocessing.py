@@ -1,68 +1,172 @@
-import os
+import argparse
+
 import pandas as pd
 import numpy as np
-import re
-import unicodedata
-
-# === Load raw CSVs ===
-SCRAPED_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_raw.csv")
-API_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_api_raw.csv")
 
-if not os.path.exists(SCRAPED_PATH) or not os.path.exists(API_PATH):
-    raise FileNotFoundError("Raw CSV files not found. Make sure both data/youtube_scraped_raw.csv and data/youtube_api_raw.csv exist.")
+from schema import fill_missing
+from storage import find_table, load_table, save_table
 
-df_scraped = pd.read_csv(SCRAPED_PATH)
-df_api = pd.read_csv(API_PATH)
+# === Tables (see storage.py) ===
+SCRAPED_RAW = "youtube_scraped_raw"
+API_RAW = "youtube_api_raw"
+CLEAN_SCRAPED = "youtube_scraped_clean"
+CLEAN_API = "youtube_api_clean"
 
-# === Clean column names ===
-df_scraped.columns = df_scraped.columns.str.strip().str.lower()
-df_api.columns = df_api.columns.str.strip().str.lower()
+# === Fill missing non-numeric fields ===
+FILL_DEFAULTS = {
+    "title": "Unknown Title",
+    "channel": "Unknown Channel",
+    "category": "Unknown",
+    "upload_date": pd.NaT,
+    "duration": "PT0S",
+    "tags": ""
+}
 
 # ----------------------------------------------------------
 #  Helper: clean YouTube-style numbers
 # ----------------------------------------------------------
+# Suffix words/abbreviations -> multiplier (English, German, Spanish/Portuguese, French)
+COUNT_SUFFIXES = {
+    "thousand": 1e3, "tsd": 1e3, "mil": 1e3, "k": 1e3,
+    "million": 1e6, "mio": 1e6, "mn": 1e6, "m": 1e6,
+    "billion": 1e9, "mrd": 1e9, "bn": 1e9, "md": 1e9, "b": 1e9,
+}
+SUFFIX_ALTERNATION = "|".join(sorted(COUNT_SUFFIXES, key=len, reverse=True))
+# `num` is the first digit run (with any separators, including the no-break
+# spaces French/Swiss counts group with), `suffix` a multiplier word right after
+# it, and `after` the next character: a letter there means the "suffix" is really
+# the start of a word ("5 mal"). Letters are checked outside the regex because a
+# Unicode letter class is several times slower on RE2.
+COUNT_PATTERN = (
+    r"(?P<num>\d+(?:[.,'’\s" "\u00a0\u202f" r"]\d+)*)\s*"
+    r"(?P<suffix>" + SUFFIX_ALTERNATION + r")?(?P<after>.)?"
+)
+
+def _parse_counts_arrow(strings):
+    """normalize_counts kernel on pyarrow compute (RE2, no per-row Python)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    parts = pc.extract_regex(pc.utf8_lower(pa.array(strings, type=pa.string())), COUNT_PATTERN)
+    num, suffix, after = (pc.struct_field(parts, name) for name in ("num", "suffix", "after"))
+    has_suffix = pc.and_(pc.not_equal(suffix, ""), pc.invert(pc.utf8_is_alpha(after)))
+
+    frac = pc.struct_field(pc.extract_regex(num, r"[.,](?P<frac>\d+)$"), "frac")
+    is_decimal = pc.and_(pc.is_valid(frac), pc.or_(has_suffix, pc.not_equal(pc.utf8_length(frac), 3)))
+    is_decimal = pc.fill_null(is_decimal, False)
+
+    whole = pc.if_else(is_decimal, pc.replace_substring_regex(num, r"[.,]\d+$", ""), num)
+    value = pc.cast(pc.replace_substring_regex(whole, r"\D", ""), pa.float64())
+    frac_value = pc.cast(pc.binary_join_element_wise("0.", pc.if_else(is_decimal, frac, "0"), ""), pa.float64())
+    value = pc.add(value, frac_value)
+
+    multiplier = pd.Series(pc.if_else(has_suffix, suffix, "").to_pandas()).map(COUNT_SUFFIXES).fillna(1.0)
+    return value.to_numpy(zero_copy_only=False).astype("float64") * multiplier.to_numpy(dtype="float64")
+
+def _parse_counts_pandas(strings):
+    """normalize_counts kernel on pandas .str methods (used when pyarrow is missing)."""
+    parts = pd.Series(strings, dtype=object).str.lower().str.extract(COUNT_PATTERN)
+    num = parts["num"]
+    has_suffix = parts["suffix"].notna() & ~parts["after"].fillna("").str.isalpha()
+
+    frac = num.str.extract(r"[.,](\d+)$")[0]
+    is_decimal = frac.notna() & (has_suffix | (frac.str.len() != 3))
+
+    whole = num.where(~is_decimal, num.str.replace(r"[.,]\d+$", "", regex=True))
+    value = pd.to_numeric(whole.str.replace(r"\D", "", regex=True), errors="coerce").astype("float64")
+    value += pd.to_numeric("0." + frac.where(is_decimal, "0"), errors="coerce").fillna(0.0).astype("float64")
+
+    multiplier = parts["suffix"].where(has_suffix).map(COUNT_SUFFIXES).fillna(1.0)
+    return (value * multiplier).to_numpy(dtype="float64", na_value=np.nan)
+
+def normalize_counts(values):
+    """Vectorized count parser: '76,924,840 views', '1.2M views', '1.234.567 Aufrufe' → floats.
+
+    A separator followed by exactly three digits groups thousands; otherwise,
+    or whenever a K/M/B-style suffix (also Mio/Mrd/Tsd/mil) follows, the last
+    separator is the decimal point. Anything without digits becomes NaN.
+    Each distinct string is parsed once and broadcast back to its rows.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_numeric(values, errors="coerce").astype("float64")
+
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return pd.Series(np.nan, index=values.index, dtype="float64")
+
+    strings = [str(u) for u in uniques]
+    try:
+        parsed = _parse_counts_arrow(strings)
+    except ImportError:
+        parsed = _parse_counts_pandas(strings)
+
+    # factorize marks missing values with code -1
+    result = np.where(codes >= 0, parsed[codes], np.nan)
+    return pd.Series(result, index=values.index, dtype="float64")
+
 def clean_views(value):
-    """Convert '76,924,840 views' → 76924840"""
-    if pd.isna(value):
-        return np.nan
-    s = str(value).lower().strip()
-    s = unicodedata.normalize("NFKD", s)
-    s = s.replace("views", "").replace(",", "").strip()
-    digits = re.findall(r"\d+", s)
-    if digits:
-        return float(digits[0])
-    return np.nan
+    """Convert a single '76,924,840 views' → 76924840.0"""
+    return normalize_counts(pd.Series([value], dtype=object)).iloc[0]
+
+def clean_column_names(df):
+    df.columns = df.columns.str.strip().str.lower()
+    return df
 
 # ----------------------------------------------------------
-#  Apply cleaning to scraped dataset
+#  Stage functions
 # ----------------------------------------------------------
-for col in ["views", "likes", "comments"]:
-    if col in df_scraped.columns:
-        df_scraped[col] = df_scraped[col].apply(clean_views).fillna(0)
+def preprocess_scraped(df):
+    """Clean a raw scraped frame: text counts like '1,234 views' become numbers."""
+    df = clean_column_names(df.copy())
+    for col in ["views", "likes", "comments"]:
+        if col in df.columns:
+            df[col] = normalize_counts(df[col]).fillna(0)
+    return fill_missing(df, FILL_DEFAULTS)
 
-# For API dataset (already numeric), we can safely convert:
-for col in ["views", "likes", "comments"]:
-    if col in df_api.columns:
-        df_api[col] = pd.to_numeric(df_api[col], errors="coerce").fillna(0)
+def preprocess_api(df):
+    """Clean a raw API frame (counts are already numeric strings)."""
+    df = clean_column_names(df.copy())
+    for col in ["views", "likes", "comments"]:
+        if col in df.columns:
+            df[col] = normalize_counts(df[col]).fillna(0)
+    return fill_missing(df, FILL_DEFAULTS)
 
-# === Fill missing non-numeric fields ===
-fill_defaults = {
-    "title": "Unknown Title",
-    "channel": "Unknown Channel",
-    "category": "Unknown",
-    "upload_date": pd.NaT,
-    "duration": "PT0S",
-    "tags": ""
-}
-df_scraped = df_scraped.fillna(fill_defaults)
-df_api = df_api.fillna(fill_defaults)
 
-# === Save cleaned versions ===
-CLEAN_SCRAPED = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_clean.csv")
-CLEAN_API = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_api_clean.csv")
+def load_raw(table, source, **query):
+    """Raw rows of `source`: the slice of the video store `query` selects (see video_store.py),
+    or the raw table when the store has none of this source's videos."""
+    from video_store import VideoStore
+
+    store = VideoStore()
+    if store.count(source):
+        df = store.query(source, **query)
+        print(f" {source}: {len(df):,} videos from the video store")
+        return df
+    if find_table(table) is None:
+        raise FileNotFoundError(f"No {source} videos in the video store and no raw table '{table}' in data/.")
+    return load_table(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean the raw scraped and API videos.")
+    parser.add_argument("--region", action="append", help="only videos trending in this region (repeatable)")
+    parser.add_argument("--channel", action="append", help="only this channel's videos (repeatable)")
+    parser.add_argument("--since", help="earliest upload date")
+    parser.add_argument("--until", help="latest upload date")
+    args = parser.parse_args()
+    query = {"regions": args.region, "channels": args.channel, "since": args.since, "until": args.until}
+
+    df_scraped = preprocess_scraped(load_raw(SCRAPED_RAW, "scraped", **query))
+    df_api = preprocess_api(load_raw(API_RAW, "api", **query))
+
+    # === Save cleaned versions ===
+    save_table(df_scraped, CLEAN_SCRAPED)
+    save_table(df_api, CLEAN_API)
+
+    print(" Preprocessing complete. Cleaned tables saved to /data/")
+    print(df_scraped[["views"]].head())
 
-df_scraped.to_csv(CLEAN_SCRAPED, index=False)
-df_api.to_csv(CLEAN_API, index=False)
 
-print(" Preprocessing complete. Cleaned CSVs saved to /data/")
-print(df_scraped[["views"]].head())
+if __name__ == "__main__":
+    main()
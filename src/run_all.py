@@ -11,6 +11,14 @@ This script runs the complete workflow:
 5. Train and evaluate models
 6. Generate visualizations
 
+All steps run inside this one process as a dependency graph (see pipeline.py).
+The scraped and API datasets each flow through their own lane, DataFrames are
+handed from stage to stage in memory (the CSVs in data/ are still written for
+inspection), independent stages run in parallel, and a stage whose code and
+input files are unchanged since the last run is skipped. Use --force to rerun
+everything. Within the feature stages only new or changed videos are
+featurized (see feature_store.py).
+
 Before running:
 - Ensure you have Python 3.10+ and required libraries installed (see requirements.txt)
 - Ensure the `.env` file exists at the project root with:
@@ -18,55 +26,199 @@ Before running:
 - The 'data' directory will be created automatically if not present.
 """
 
+import argparse
 import os
-import subprocess
-import sys
+import time
 
-def run_step(description, command):
-    print(f"\n=== {description} ===")
-    result = subprocess.run([sys.executable, command], capture_output=True, text=True)
-    print(result.stdout)
-    if result.stderr:
-        print("Errors/Warnings:\n", result.stderr)
+os.environ.setdefault("MPLBACKEND", "Agg")  # stages may plot from worker threads
+
+import pandas as pd
+
+import api_youtube
+import data_cleaning
+import feature_engineering
+import model_api
+import model_scraped
+import preprocessing
+import schema
+import scrape_youtube
+import video_store
+import visualization
+from channel_index import ChannelIndex
+from feature_store import FeatureStore
+from http_cache import load_run_stats
+from pipeline import ROOT, Stage, print_report, run_pipeline
+from preprocess_artifact import MODELS_DIR, artifact_path
+from storage import find_table, load_table, save_table, table_path
+
+
+# Table -> (MB with pandas' default dtypes, MB compacted) of every frame a stage produced
+FRAME_MEMORY = {}
+
+
+def upstream_frame(upstream, stage_name, table, numeric_only=False, text=True):
+    """The DataFrame an upstream stage returned, or its stored table if that stage was skipped.
+
+    text=False leaves out descriptions and tags (from disk they are never read).
+    """
+    result = upstream.get(stage_name)
+    if isinstance(result, pd.DataFrame):
+        return result if text else schema.without_text(result)
+    return load_table(table, numeric_only=numeric_only, text=text)
+
+
+def frame_stage(func, source_stage, source_table, save_as=None, export_csv=False, load=None):
+    """Wrap a DataFrame -> DataFrame stage function for the pipeline.
+
+    The input is `load()` if given, else the upstream stage's frame. The
+    result is handed downstream (and saved) with compact dtypes.
+    """
+    def run(upstream):
+        df = func(load() if load else upstream_frame(upstream, source_stage, source_table))
+        df = schema.compact(df)
+        before = schema.default_memory_mb(df)
+        FRAME_MEMORY[save_as] = (before, schema.memory_mb(df))
+        print(f"Frame memory: {before:,.1f} MB -> {FRAME_MEMORY[save_as][1]:,.1f} MB with compact dtypes")
+        if save_as:
+            save_table(df, save_as, export_csv=export_csv)
+        return df
+    return run
+
+
+def print_memory_report():
+    if not FRAME_MEMORY:
+        return
+    print("\nFrame memory by table (default dtypes -> compact dtypes):")
+    for table, (before, after) in FRAME_MEMORY.items():
+        print(f"  {table:<28}{before:>10,.1f} MB ->{after:>8,.1f} MB ({before / after if after else 0:.1f}x)")
 
-def main():
-    print("Starting full YouTube Popularity Prediction pipeline...\n")
 
-    # Step 1: Scrape data (web scraping)
-    if os.path.exists("src/scrape_youtube.py"):
-        run_step("Step 1: Scraping YouTube Data", "src/scrape_youtube.py")
-    else:
-        print("Skipping scraping (src/scrape_youtube.py not found).")
+def table_file(table):
+    """Project-relative path a stage writes `table` to (save_table's default format), for change detection."""
+    return os.path.relpath(table_path(table), ROOT)
 
-    # Step 2: Collect data via API
-    print("\nReminder: Ensure your YouTube API key is set in .env before running this step.")
-    if os.path.exists("src/api_youtube.py"):
-        run_step("Step 2: Collecting YouTube API Data", "src/api_youtube.py")
-    else:
-        print("Skipping API collection (src/api_youtube.py not found).")
 
-    # Step 3: Preprocess and clean
-    run_step("Step 3: Preprocessing Raw Data", "src/preprocessing.py")
+def raw_file(table):
+    """Project-relative path of a collector's raw table, in whichever format it exists (CSV)."""
+    return os.path.relpath(find_table(table) or table_path(table, "csv"), ROOT)
 
-    # Step 4: Feature Engineering
-    run_step("Step 4: Feature Engineering", "src/feature_engineering.py")
 
-    # Step 5: Train and evaluate models (Scraped and API)
-    run_step("Step 5A: Model Training (Scraped Data)", "src/model_scraped.py")
-    run_step("Step 5B: Model Training (API Data)", "src/model_api.py")
+def artifact_file(name):
+    """Project-relative path of a preprocessing artifact."""
+    return os.path.relpath(artifact_path(name), ROOT)
 
-    # Step 6: Visualization
-    run_step("Step 6: Generating Visualizations", "src/visualization.py")
+
+def current_model_file(name):
+    """Project-relative path of a registered model's current-version pointer."""
+    return os.path.relpath(os.path.join(MODELS_DIR, name, "current.json"), ROOT)
+
+
+def build_stages(collect=True, export_csv=False):
+    stages = []
+    if collect:
+        stages += [
+            Stage("collect_scraped", lambda upstream: scrape_youtube.scrape_youtube_data(),
+                  outputs=[raw_file(preprocessing.SCRAPED_RAW)], always_run=True, optional=True),
+            Stage("collect_api", lambda upstream: api_youtube.collect_api_data(),
+                  outputs=[raw_file(preprocessing.API_RAW)], always_run=True, optional=True),
+        ]
+    has = {s.name for s in stages}
+
+    lanes = [
+        ("scraped", preprocessing.preprocess_scraped, preprocessing.SCRAPED_RAW, preprocessing.CLEAN_SCRAPED,
+         feature_engineering.FE_SCRAPED, data_cleaning.FINAL_SCRAPED, data_cleaning.NORMALIZATION_SCRAPED, "Scraped"),
+        ("api", preprocessing.preprocess_api, preprocessing.API_RAW, preprocessing.CLEAN_API,
+         feature_engineering.FE_API, data_cleaning.FINAL_API, data_cleaning.NORMALIZATION_API, "API"),
+    ]
+    for lane, clean_func, raw, clean, features, ready, artifact, label in lanes:
+        collector = f"collect_{lane}"
+        stages += [
+            # Raw rows come from the video store once the collectors have filled it (see preprocessing.load_raw)
+            Stage(f"preprocess_{lane}",
+                  frame_stage(clean_func, collector, raw, clean, export_csv,
+                              load=lambda raw=raw, lane=lane: preprocessing.load_raw(raw, lane)),
+                  deps=[collector] if collector in has else [],
+                  code=["src/preprocessing.py", "src/video_store.py"],
+                  inputs=[raw_file(raw), os.path.relpath(video_store.STORE_PATH, ROOT)],
+                  outputs=[table_file(clean)]),
+            Stage(f"features_{lane}",
+                  frame_stage(lambda df, features=features:
+                              ChannelIndex(features).add_features(FeatureStore(features).featurize(df)),
+                              f"preprocess_{lane}", clean, features, export_csv),
+                  deps=[f"preprocess_{lane}"],
+                  code=["src/feature_engineering.py", "src/feature_store.py", "src/channel_index.py"],
+                  inputs=[table_file(clean)],
+                  outputs=[table_file(features), os.path.relpath(ChannelIndex(features).path, ROOT)]),
+            Stage(f"normalize_{lane}",
+                  frame_stage(lambda df, label=label, artifact=artifact:
+                              data_cleaning.preprocess_and_normalize(df, label, save_as=artifact),
+                              f"features_{lane}", features, ready, export_csv),
+                  deps=[f"features_{lane}"],
+                  code=["src/data_cleaning.py"], inputs=[table_file(features)],
+                  outputs=[table_file(ready), artifact_file(artifact)]),
+        ]
+
+    # Model stages only ever load numeric columns from disk
+    stages += [
+        Stage("model_scraped",
+              lambda upstream: model_scraped.train_models(
+                  upstream_frame(upstream, "features_scraped", feature_engineering.FE_SCRAPED, numeric_only=True)),
+              deps=["features_scraped"], code=["src/model_scraped.py", "src/feature_registry.py", "src/model_registry.py"],
+              inputs=[table_file(feature_engineering.FE_SCRAPED)],
+              outputs=[artifact_file(model_scraped.ARTIFACT)]),
+        Stage("model_api",
+              lambda upstream: model_api.train_models(
+                  upstream_frame(upstream, "preprocess_api", preprocessing.CLEAN_API, numeric_only=True)),
+              deps=["preprocess_api"], code=["src/model_api.py", "src/feature_registry.py", "src/model_registry.py"],
+              inputs=[table_file(preprocessing.CLEAN_API)],
+              outputs=[current_model_file(name) for name in model_api.REGISTRY_NAMES.values()]),
+        Stage("visualization",
+              lambda upstream: visualization.make_plots(
+                  upstream_frame(upstream, "features_scraped", feature_engineering.FE_SCRAPED, numeric_only=True)),
+              deps=["features_scraped", "model_scraped"], code=["src/visualization.py"],
+              inputs=[table_file(feature_engineering.FE_SCRAPED),
+                      current_model_file(visualization.RF_NAME), current_model_file(visualization.XGB_NAME)],
+              outputs=["data/model_comparison.png", "data/feature_importance.png",
+                       "data/views_vs_duration.png"]),
+    ]
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full YouTube popularity pipeline.")
+    parser.add_argument("--force", action="store_true", help="rerun stages even if inputs are unchanged")
+    parser.add_argument("--skip-collect", action="store_true", help="reuse the raw CSVs already in data/")
+    parser.add_argument("--workers", type=int, default=2, help="stages run in parallel")
+    parser.add_argument("--export-csv", action="store_true", help="also write CSV copies of every intermediate table")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    os.makedirs("data", exist_ok=True)
+
+    print("Starting full YouTube Popularity Prediction pipeline...\n")
+    if not args.skip_collect:
+        print("Reminder: Ensure your YouTube API key is set in .env before running the API collection step.")
+
+    start, started_at = time.perf_counter(), time.time()
+    _, report = run_pipeline(build_stages(collect=not args.skip_collect, export_csv=args.export_csv),
+                             max_workers=args.workers, force=args.force, release=True)
 
     print("\nPipeline execution complete. All processed data and visualizations are in the /data folder.")
     print("Final outputs:")
-    print("  - youtube_scraped_clean.csv")
-    print("  - youtube_api_clean.csv")
-    print("  - youtube_scraped_features.csv")
-    print("  - youtube_api_features.csv")
-    print("  - youtube_scraped_ready.csv")
-    print("  - youtube_api_ready.csv")
+    for table in [preprocessing.CLEAN_SCRAPED, preprocessing.CLEAN_API,
+                  feature_engineering.FE_SCRAPED, feature_engineering.FE_API,
+                  data_cleaning.FINAL_SCRAPED, data_cleaning.FINAL_API]:
+        print(f"  - {os.path.basename(table_file(table))}")
     print("  - model_comparison.png, feature_importance.png, views_vs_duration.png")
 
+    print_report(report)
+    print_memory_report()
+    print(f"  Pipeline wall time: {time.perf_counter() - start:.1f}s")
+
+    # HTTP cache counters written by the collectors in steps 1 and 2 of this run
+    for name, stats in load_run_stats(since=started_at).items():
+        print(f"HTTP cache ({name}): {stats['hits']} hits, {stats['revalidated']} revalidated, "
+              f"{stats['misses']} misses, {stats['evicted']} evicted")
+
 if __name__ == "__main__":
     main()
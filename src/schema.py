@@ -0,0 +1,131 @@
+"""
+schema.py
+Compact in-memory dtypes for the video tables.
+
+storage.load_table applies compact() to every table it loads, and run_all
+applies it to the frames stages hand each other, so stages work on:
+
+    integer columns          int32 when every value is below 2**30 (so the sum
+                             of two columns still fits), else int64
+    repeated string columns  category: each distinct value stored once plus
+                             small integer codes (region, channel, duration,
+                             and the titles/tags/descriptions of trending
+                             videos that appear on many days)
+    everything else          unchanged; floats stay float64 (float32 would
+                             change the log and ratio features computed from
+                             them) and mostly-unique strings (ids, urls) stay
+                             Python objects
+
+Values never change, only how they are stored. Stages that do not read the
+heavy free-text columns (HEAVY_TEXT_COLUMNS) can leave them out of a load
+entirely with load_table(..., text=False).
+
+Category columns reject fill values that are not one of their categories, so
+fill possibly compacted frames with fill_missing() instead of fillna().
+"""
+
+import pandas as pd
+from pandas.api.types import infer_dtype, is_bool_dtype, is_integer_dtype
+
+HEAVY_TEXT_COLUMNS = ["description", "tags"]
+CATEGORY_MAX_RATIO = 0.5  # distinct values / rows, at most, for a string column to become category
+INT32_LIMIT = 2 ** 30
+
+
+def is_category(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def compact_column(series):
+    """`series` in its compact dtype (the same object if it is already compact)."""
+    dtype = series.dtype
+    if is_integer_dtype(dtype) and not is_bool_dtype(dtype) and dtype.itemsize > 4:
+        if series.empty or (series.min() > -INT32_LIMIT and series.max() < INT32_LIMIT):
+            return series.astype("int32")
+    elif dtype == object and len(series) > 1:
+        # Only all-string columns: categories of mixed objects would not round-trip through storage
+        if infer_dtype(series, skipna=True) == "string" and \
+                series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+            return series.astype("category")
+    return series
+
+
+def compact(df):
+    """A copy of `df` with compact dtypes (columns that are already compact are shared, not copied)."""
+    out = df.copy(deep=False)
+    for col in out.columns:
+        series = compact_column(out[col])
+        if series is not out[col]:
+            out[col] = series
+    return out
+
+
+def without_text(df):
+    """`df` without HEAVY_TEXT_COLUMNS (a shallow projection, nothing is copied)."""
+    return df.drop(columns=[c for c in HEAVY_TEXT_COLUMNS if c in df.columns])
+
+
+def fill_missing(obj, value):
+    """Series/DataFrame.fillna(value) that also fills category columns.
+
+    `value` may be a scalar or, for frames, a {column: value} dict.
+    """
+    if isinstance(obj, pd.Series):
+        if is_category(obj):
+            # pandas validates the fill value even when nothing is missing
+            if pd.isna(value) or not obj.isna().any():
+                return obj
+            if value not in obj.cat.categories:
+                obj = obj.cat.add_categories([value])
+        return obj.fillna(value)
+
+    fills = value if isinstance(value, dict) else {col: value for col in obj.columns}
+    categorical = [col for col in fills if col in obj.columns and is_category(obj[col])]
+    if not categorical:
+        return obj.fillna(value)
+    obj = obj.copy(deep=False)
+    for col in categorical:
+        obj[col] = fill_missing(obj[col], fills[col])
+    return obj.fillna({col: fill for col, fill in fills.items() if col not in categorical})
+
+
+def memory_mb(df):
+    """Deep memory use of a frame in MB (strings included)."""
+    return float(df.memory_usage(deep=True).sum()) / 2 ** 20
+
+
+def default_memory_mb(df):
+    """memory_mb of `df` as pandas would hold it by default (object strings, int64)."""
+    total = 0
+    for col in df.columns:
+        series = df[col]
+        if is_category(series):
+            series = series.astype(object)
+        elif is_integer_dtype(series.dtype) and not is_bool_dtype(series.dtype):
+            series = series.astype("int64")
+        total += series.memory_usage(deep=True, index=False)
+    return float(total + df.index.memory_usage(deep=True)) / 2 ** 20
+
+
+def main():
+    """Memory of every pipeline table in data/ with default and compact dtypes."""
+    from storage import find_table, load_table
+    import data_cleaning
+    import feature_engineering
+    import preprocessing
+
+    tables = [preprocessing.SCRAPED_RAW, preprocessing.API_RAW, preprocessing.CLEAN_SCRAPED, preprocessing.CLEAN_API,
+              feature_engineering.FE_SCRAPED, feature_engineering.FE_API,
+              data_cleaning.FINAL_SCRAPED, data_cleaning.FINAL_API]
+    print(f"  {'table':<28}{'rows':>9}{'default (MB)':>14}{'compact (MB)':>14}{'no text (MB)':>14}")
+    for table in tables:
+        if find_table(table) is None:
+            continue
+        df = load_table(table, compact=False)
+        before, after = default_memory_mb(df), memory_mb(compact(df))
+        lean = memory_mb(load_table(table, text=False))
+        print(f"  {table:<28}{len(df):>9,}{before:>14,.1f}{after:>14,.1f}{lean:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
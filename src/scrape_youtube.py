@@ -1,12 +1,16 @@
 import os
-import re
-import json
+import sys
 import time
 import random
-import requests
-import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-from bs4 import BeautifulSoup
+
+from checkpoint import CheckpointStore
+from http_cache import ResponseCache
+from http_client import HostLimiter, make_session
+from video_store import VideoStore
+from yt_initial_data import extract_initial_data, parse_search_results
 
 # -------------------------------
 # Configuration
@@ -104,106 +108,155 @@ KEYWORDS = [
 SAVE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_raw.csv")
 MAX_VIDEOS = 3000
 
-# Ensure /data directory exists
-os.makedirs(os.path.dirname(SAVE_PATH), exist_ok=True)
+# Search endpoint; point at a local stub server (see stub_youtube_server.py) to scrape offline
+SEARCH_URL = os.getenv("YOUTUBE_SEARCH_URL", "https://www.youtube.com/results")
+MAX_WORKERS = 8          # keywords in flight at once
+MAX_PER_HOST = 4         # concurrent connections to any one host
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 2.0       # seconds; doubled on each failed attempt, with jitter
 
 
 # -------------------------------
 # Helper: Extract videos from HTML
 # -------------------------------
 def extract_videos_from_html(html):
-    soup = BeautifulSoup(html, "html.parser")
-    scripts = soup.find_all("script")
-
-    json_data = None
-    for script in scripts:
-        if "ytInitialData" in script.text:
-            match = re.search(r"ytInitialData\s*=\s*(\{.*\})\s*;", script.text, re.DOTALL)
-            if match:
-                try:
-                    json_data = json.loads(match.group(1))
-                    break
-                except Exception:
-                    continue
-
+    json_data = extract_initial_data(html)
     if not json_data:
         print("No ytInitialData found in page.")
         return []
 
-    videos = []
     try:
-        sections = json_data["contents"]["twoColumnSearchResultsRenderer"]["primaryContents"]["sectionListRenderer"]["contents"]
-        for section in sections:
-            contents = section.get("itemSectionRenderer", {}).get("contents", [])
-            for item in contents:
-                video = item.get("videoRenderer")
-                if not video:
-                    continue
-
-                vid = video.get("videoId")
-                title = video.get("title", {}).get("runs", [{}])[0].get("text", "")
-                channel = video.get("ownerText", {}).get("runs", [{}])[0].get("text", "")
-                views = video.get("viewCountText", {}).get("simpleText", "N/A")
-                duration = video.get("lengthText", {}).get("simpleText", "N/A")
-
-                videos.append({
-                    "url": f"https://www.youtube.com/watch?v={vid}",
-                    "title": title,
-                    "channel": channel,
-                    "views": views,
-                    "duration": duration
-                })
-
+        return parse_search_results(json_data)
     except Exception as e:
         print("Error parsing YouTube data:", e)
-
-    return videos
+        return []
 
 
 # -------------------------------
-# Main Scraper Function
+# Worker: fetch one keyword
 # -------------------------------
-def scrape_youtube_data():
-    all_videos = []
-    print("Starting YouTube scraping process...")
+def backoff_delay(attempt):
+    """Jittered exponential backoff, only used after a failed attempt."""
+    return BACKOFF_BASE * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
 
-    for keyword in tqdm(KEYWORDS, desc="Scraping YouTube search results"):
-        attempt = 1
-        while attempt <= 2:
-            search_url = f"https://www.youtube.com/results?search_query={keyword.replace(' ', '+')}"
-            try:
-                response = requests.get(search_url, headers=HEADERS, timeout=10)
-                response.encoding = "utf-8"
-            except Exception as e:
-                print(f"Request failed for keyword '{keyword}': {e}")
-                break
 
-            videos = extract_videos_from_html(response.text)
-            print(f"{keyword}: {len(videos)} videos found (attempt {attempt})")
+def scrape_keyword(session, keyword, host_limiter, stop_event, cache=None):
+    """Fetch one search page, retrying with backoff on errors or thin results.
 
-            if len(videos) >= 10 or attempt == 2:
-                all_videos.extend(videos)
-                break
+    The first attempt may be served from `cache`; retries always go to the
+    network. Returns (videos, pages_fetched).
+    """
+    search_url = SEARCH_URL
+    params = {"search_query": keyword}
+    videos = []
+    pages = 0
 
-            attempt += 1
-            time.sleep(random.uniform(3, 6))
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if stop_event.is_set():
+            break
+        try:
+            with host_limiter.slot(search_url):
+                if cache is not None:
+                    response = cache.get(session, search_url, params=params, refresh=attempt > 1, timeout=10)
+                else:
+                    response = session.get(search_url, params=params, timeout=10)
+            response.encoding = "utf-8"
+            pages += 1
+            response.raise_for_status()
+            videos = extract_videos_from_html(response.text)
+        except Exception as e:
+            print(f"Request failed for keyword '{keyword}' (attempt {attempt}): {e}")
+            videos = []
 
-        if len(all_videos) >= MAX_VIDEOS:
+        if len(videos) >= 10 or attempt == MAX_ATTEMPTS:
             break
+        time.sleep(backoff_delay(attempt))
+
+    return videos, pages
+
 
-        time.sleep(random.uniform(2, 4))
+# -------------------------------
+# Main Scraper Function
+# -------------------------------
+def scrape_youtube_data(max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST, resume=True, use_cache=True):
+    """Scrape search results for every keyword, resuming from the last checkpoint.
+
+    Each finished keyword's videos are appended to data/checkpoints/ straight
+    away, so a crash loses at most the keywords still in flight and a re-run
+    skips keywords that already returned results.
+    """
+    os.makedirs(os.path.dirname(SAVE_PATH), exist_ok=True)
+    store = CheckpointStore("scrape_youtube")
+    if not resume:
+        store.clear()
+
+    pending_keywords = [k for k in dict.fromkeys(KEYWORDS) if k not in store.completed()]
+    collected = store.row_count()
+    new_videos = 0
+    pages = 0
+    print("Starting YouTube scraping process...")
+    if collected:
+        print(f"Resuming: {len(store.completed())} keywords and {collected} videos already checkpointed.")
+
+    # Every keyword's videos are also upserted into data/videos.sqlite, as one snapshot per run
+    video_store = VideoStore()
+    captured = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+    session = make_session(pool_size=max_workers, headers=HEADERS)
+    cache = ResponseCache() if use_cache else None
+    host_limiter = HostLimiter(per_host=max_per_host)
+    stop_event = threading.Event()
+    start = time.perf_counter()
+
+    if collected >= MAX_VIDEOS:
+        pending_keywords = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(scrape_keyword, session, keyword, host_limiter, stop_event, cache): keyword
+            for keyword in pending_keywords
+        }
+        progress = tqdm(total=len(futures), desc="Scraping YouTube search results")
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            keyword = futures[future]
+            videos, fetched = future.result()
+            pages += fetched
+            progress.update(1)
+            print(f"{keyword}: {len(videos)} videos found")
+
+            # Keywords that came back empty are left unmarked so the next run retries them
+            if videos:
+                store.record(keyword, videos)
+                video_store.upsert(videos, "scraped", captured)
+                collected += len(videos)
+                new_videos += len(videos)
+
+            # Stop handing out keywords once we have enough videos
+            if collected >= MAX_VIDEOS and not stop_event.is_set():
+                stop_event.set()
+                for pending in futures:
+                    pending.cancel()
+        progress.close()
+
+    session.close()
+    elapsed = time.perf_counter() - start
 
     # Save to CSV
-    df = pd.DataFrame(all_videos)
-    df.drop_duplicates(subset="url", inplace=True)
-    df.to_csv(SAVE_PATH, index=False, encoding="utf-8")
+    saved = store.finalize(SAVE_PATH, dedupe_col="url")
 
-    print(f"\nScraping completed.")
-    print(f"Saved {len(df)} videos to {SAVE_PATH}")
+    print(f"\nScraping completed in {elapsed:.1f}s.")
+    if elapsed > 0:
+        print(f"Throughput: {pages / elapsed:.2f} pages/s, {new_videos / elapsed:.1f} videos/s")
+    print(f"Saved {saved} videos to {SAVE_PATH}")
+    if cache is not None:
+        print(cache.summary())
+        cache.save_stats("scrape_youtube")
 
 
 # -------------------------------
 # Run script
 # -------------------------------
 if __name__ == "__main__":
-    scrape_youtube_data()
+    scrape_youtube_data(resume="--fresh" not in sys.argv, use_cache="--no-cache" not in sys.argv)
@@ -1,9 +1,7 @@
-import requests, json, re, time, random, pandas as pd
+import os, requests, time, random, pandas as pd
 from tqdm import tqdm
 
-os.makedirs("data", exist_ok=True)
-SAVE_PATH = os.path.join("data", "youtube_scraped_raw.csv")
-MAX_VIDEOS = 3000
+from yt_initial_data import extract_initial_data, parse_search_results
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -25,57 +23,16 @@ MAX_VIDEOS = 3000
 
 def extract_videos_from_json(html):
     """Extract video metadata from YouTube search HTML."""
-    import json, re
-
-    match = re.search(r"var ytInitialData\s*=\s*(\{.*?\});</script>", html, re.S)
-    if not match:
-        match = re.search(r"ytInitialData\"[:=]\s*(\{.*?\})\s*;</script>", html, re.S)
-    if not match:
+    data = extract_initial_data(html)
+    if not data:
         print("No ytInitialData found.")
         return []
 
     try:
-        json_text = match.group(1)
-        data = json.loads(json_text)
-    except Exception as e:
-        print(f"JSON parsing error: {e}")
-        return []
-
-    videos = []
-    try:
-        sections = (
-            data.get("contents", {})
-                .get("twoColumnSearchResultsRenderer", {})
-                .get("primaryContents", {})
-                .get("sectionListRenderer", {})
-                .get("contents", [])
-        )
-
-        for section in sections:
-            contents = section.get("itemSectionRenderer", {}).get("contents", [])
-            for item in contents:
-                video = item.get("videoRenderer")
-                if not video:
-                    continue
-
-                vid = video.get("videoId")
-                if not vid:
-                    continue
-
-                title = video.get("title", {}).get("runs", [{}])[0].get("text", "")
-                channel = video.get("ownerText", {}).get("runs", [{}])[0].get("text", "")
-                views = video.get("viewCountText", {}).get("simpleText", "N/A")
-                duration = video.get("lengthText", {}).get("simpleText", "N/A")
-
-                videos.append({
-                    "url": f"https://www.youtube.com/watch?v={vid}",
-                    "title": title,
-                    "channel": channel,
-                    "views": views,
-                    "duration": duration
-                })
+        videos = parse_search_results(data)
     except Exception as e:
         print(f"JSON traversal error: {e}")
+        videos = []
 
     print(f"Extracted {len(videos)} videos from page.")
     return videos
@@ -98,6 +55,7 @@ def scrape_youtube_data():
 
     df = pd.DataFrame(all_videos)
     df.drop_duplicates(subset="url", inplace=True)
+    os.makedirs(os.path.dirname(SAVE_PATH), exist_ok=True)
     df.to_csv(SAVE_PATH, index=False)
     print(f" Saved {len(df)} videos to {SAVE_PATH}")
 
@@ -0,0 +1,201 @@
+"""
+serve.py
+Local HTTP prediction service for registered models (see model_registry.py).
+
+    python src/serve.py                                   # scraped_xgboost + api_xgboost on :8000
+    python src/serve.py --model api_random_forest --port 8080 --max-batch 2048
+
+    POST /predict[?model=<name>]   one raw video (JSON object), a list of them,
+                                   or {"model": <name>, "videos": [...]}
+        -> {"model": "<name>/<version>", "predictions": [{video_id|url, predicted_views, predicted_log_views}, ...]}
+    GET  /health                   loaded models, batches and rows scored so far
+
+Videos are raw metadata as the collectors write it; they go through the same
+cleaning and feature functions as training (predict.Scorer). Models stay
+loaded for the life of the process.
+
+Requests are not scored one by one: each model has a single scoring thread
+that takes every request queued while it was busy (plus any arriving within
+--max-wait-ms) and scores them as one vectorized batch, up to --max-batch
+rows. An idle server therefore answers a lone request immediately, and a
+busy one amortizes the per-batch pandas/model overhead over many requests.
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from predict import Scorer
+
+HOST, PORT = "127.0.0.1", 8000
+DEFAULT_MODELS = ["scraped_xgboost", "api_xgboost"]
+MAX_BATCH_ROWS = 4096   # rows scored in one predict call at most
+MAX_WAIT_MS = 2.0       # how long a batch waits for more requests after the first
+REQUEST_TIMEOUT = 30    # seconds a request waits for its predictions
+
+
+# -------------------------------------------------------
+#  Micro-batching
+# -------------------------------------------------------
+class MicroBatcher:
+    """Coalesces concurrent score requests for one model into batched predict calls."""
+
+    def __init__(self, scorer, max_batch=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.batches, self.rows = 0, 0
+        threading.Thread(target=self._run, name=f"batcher-{scorer.name}", daemon=True).start()
+
+    def submit(self, records):
+        """Future resolving to the list of prediction dicts for `records`."""
+        future = Future()
+        self.queue.put((records, future))
+        return future
+
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            rows = len(items[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_batch:
+                # Past the deadline, still take whatever is already waiting
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                items.append(item)
+                rows += len(item[0])
+            self._score(items)
+
+    def _score(self, items):
+        records = [record for batch, _ in items for record in batch]
+        try:
+            preds = self.scorer.score(pd.DataFrame.from_records(records))
+        except Exception as e:
+            # One malformed request must not fail the others batched with it
+            if len(items) > 1:
+                for item in items:
+                    self._score([item])
+            else:
+                items[0][1].set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(records)
+        results = records_of(preds)
+        offset = 0
+        for batch, future in items:
+            future.set_result(results[offset:offset + len(batch)])
+            offset += len(batch)
+
+
+def records_of(preds):
+    """Prediction frame -> JSON-ready dicts (NaN becomes null)."""
+    return json.loads(preds.to_json(orient="records"))
+
+
+# -------------------------------------------------------
+#  HTTP
+# -------------------------------------------------------
+class PredictionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so load tests don't measure TCP setup
+    disable_nagle_algorithm = True  # headers and body are separate writes; don't wait on delayed ACKs
+    server_version = "YouTubeViewsPredictor"
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            return self.reply(404, {"error": "not found"})
+        models = {name: {"version": b.scorer.version, "batches": b.batches, "rows": b.rows}
+                  for name, b in self.server.batchers.items()}
+        self.reply(200, {"status": "ok", "models": models})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/predict":
+            return self.reply(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except ValueError as e:
+            return self.reply(400, {"error": f"invalid JSON: {e}"})
+
+        name = parse_qs(url.query).get("model", [None])[0]
+        if isinstance(payload, dict) and "videos" in payload:
+            name = name or payload.get("model")
+            payload = payload["videos"]
+        records = [payload] if isinstance(payload, dict) else payload
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            return self.reply(400, {"error": "expected a video object, a list of them, or {\"videos\": [...]}"})
+
+        batcher = self.server.batchers.get(name or self.server.default_model)
+        if batcher is None:
+            return self.reply(404, {"error": f"model '{name}' is not loaded",
+                                    "models": sorted(self.server.batchers)})
+        if not records:
+            return self.reply(200, {"model": f"{batcher.scorer.name}/{batcher.scorer.version}", "predictions": []})
+        try:
+            predictions = batcher.submit(records).result(timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            return self.reply(422, {"error": f"could not score videos: {e}"})
+        self.reply(200, {"model": f"{batcher.scorer.name}/{batcher.scorer.version}", "predictions": predictions})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate the service's own latency
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the default backlog of 5 refuses connections under load
+
+
+def make_server(models=DEFAULT_MODELS, host=HOST, port=PORT, max_batch=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS):
+    server = PredictionServer((host, port), PredictionHandler)
+    server.batchers = {}
+    for name in models:
+        scorer = Scorer(name)
+        server.batchers[name] = MicroBatcher(scorer, max_batch, max_wait_ms)
+        print(f" Loaded {name}/{scorer.version} ({len(scorer.features)} features)")
+    server.default_model = models[0]
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve view predictions from registered models over HTTP.")
+    parser.add_argument("--model", action="append", help="registered model to load (repeatable; first is the default)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_ROWS, help="rows per predict call at most")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="how long a batch waits for more requests after the first")
+    args = parser.parse_args()
+
+    server = make_server(args.model or DEFAULT_MODELS, args.host, args.port, args.max_batch, args.max_wait_ms)
+    print(f"Serving predictions on http://{args.host}:{args.port}/predict (default model: {server.default_model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+storage.py
+Pluggable storage for the pipeline artifacts in data/.
+
+Tables are addressed by name (e.g. "youtube_api_clean") rather than path.
+Intermediates are written as Parquet by default (Feather or CSV via
+YT_STORAGE_FORMAT), and loads can project just the columns a stage needs:
+
+    load_table("youtube_api_features", numeric_only=True)   # never reads descriptions
+    load_table("youtube_api_clean", text=False)              # all but descriptions/tags
+
+Loaded frames get compact dtypes (int32, category; see schema.py).
+
+Raw collector output stays CSV; load_table falls back to whichever format
+exists, so older CSV-only data/ folders keep working. To get a CSV copy of
+any table for reading by hand:
+
+    python src/storage.py export youtube_api_ready
+"""
+
+import os
+import sys
+
+import pandas as pd
+from pandas.api.types import infer_dtype, is_numeric_dtype, is_bool_dtype
+
+import schema
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+CSV_SAMPLE_ROWS = 1_000  # rows read to guess which CSV columns are numeric
+
+
+def has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def default_format():
+    fmt = os.getenv("YT_STORAGE_FORMAT")
+    if fmt:
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Unknown YT_STORAGE_FORMAT '{fmt}', expected one of {list(EXTENSIONS)}")
+        return fmt
+    return "parquet" if has_pyarrow() else "csv"
+
+
+def table_path(name, fmt=None, data_dir=DATA_DIR):
+    return os.path.join(data_dir, name + EXTENSIONS[fmt or default_format()])
+
+
+def find_table(name, data_dir=DATA_DIR):
+    """Path of `name` in the configured format, else its most recent copy in any format."""
+    preferred = table_path(name, default_format(), data_dir)
+    if os.path.exists(preferred):
+        return preferred
+    existing = [table_path(name, fmt, data_dir) for fmt in EXTENSIONS]
+    existing = [p for p in existing if os.path.exists(p)]
+    if not existing:
+        return None
+    return max(existing, key=os.path.getmtime)
+
+
+def stable_schema(df):
+    """Make object columns single-typed so columnar writers accept them.
+
+    Mixed object columns (numbers and strings, e.g. tags read back from CSV)
+    are stored as strings; missing values stay missing.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and infer_dtype(df[col], skipna=True) not in ("string", "empty"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def save_table(df, name, fmt=None, data_dir=DATA_DIR, export_csv=False):
+    """Write `df` as table `name`; returns the path written."""
+    fmt = fmt or default_format()
+    os.makedirs(data_dir, exist_ok=True)
+    path = table_path(name, fmt, data_dir)
+    if fmt == "parquet":
+        stable_schema(df).to_parquet(path, index=False)
+    elif fmt == "feather":
+        stable_schema(df).reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    if export_csv and fmt != "csv":
+        df.to_csv(table_path(name, "csv", data_dir), index=False)
+    return path
+
+
+def numeric_columns(path):
+    """Numeric column names of a columnar file, read from its schema only."""
+    import pyarrow as pa
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path)
+    else:
+        import pyarrow.feather as feather
+        schema = feather.read_table(path, memory_map=True).schema
+    return [f.name for f in schema
+            if pa.types.is_integer(f.type) or pa.types.is_floating(f.type) or pa.types.is_boolean(f.type)]
+
+
+def load_table(name, columns=None, numeric_only=False, text=True, compact=True, data_dir=DATA_DIR):
+    """Load table `name`, optionally reading only `columns` or only numeric columns.
+
+    text=False skips the heavy free-text columns (schema.HEAVY_TEXT_COLUMNS);
+    compact=False keeps pandas' default dtypes (see schema.py).
+    """
+    path = find_table(name, data_dir)
+    if path is None:
+        raise FileNotFoundError(f"No stored table named '{name}' in {os.path.abspath(data_dir)}")
+    if not text:
+        columns = [c for c in (columns or table_columns(name, data_dir)) if c not in schema.HEAVY_TEXT_COLUMNS]
+
+    if path.endswith(".csv"):
+        usecols = None
+        if columns is not None:
+            header = pd.read_csv(path, nrows=0).columns
+            usecols = [c for c in columns if c in header]
+        if numeric_only:
+            # CSV has no schema: guess numeric columns from a sample, then read only those
+            sample = pd.read_csv(path, usecols=usecols, nrows=CSV_SAMPLE_ROWS)
+            usecols = [c for c in sample.columns if is_numeric_dtype(sample[c]) or is_bool_dtype(sample[c])]
+        df = pd.read_csv(path, usecols=usecols)
+        if numeric_only:
+            # A column can turn out non-numeric past the sample
+            df = df[[c for c in df.columns if is_numeric_dtype(df[c]) or is_bool_dtype(df[c])]]
+    else:
+        if numeric_only:
+            numeric = numeric_columns(path)
+            columns = [c for c in (columns or numeric) if c in numeric]
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path, columns=columns)
+        else:
+            df = pd.read_feather(path, columns=columns)
+    return schema.compact(df) if compact else df
+
+
+def table_columns(name, data_dir=DATA_DIR):
+    """Column names of a stored table without loading its rows."""
+    path = find_table(name, data_dir)
+    if path is None:
+        raise FileNotFoundError(f"No stored table named '{name}' in {os.path.abspath(data_dir)}")
+    if path.endswith(".csv"):
+        return list(pd.read_csv(path, nrows=0).columns)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    import pyarrow.feather as feather
+    return list(feather.read_table(path, memory_map=True).schema.names)
+
+
+def export_csv(name, data_dir=DATA_DIR):
+    """Write a CSV copy of a stored table next to it; returns the CSV path."""
+    path = table_path(name, "csv", data_dir)
+    load_table(name, data_dir=data_dir).to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "export":
+        print("Usage: python src/storage.py export <table name> [<table name> ...]")
+        sys.exit(1)
+    for table in sys.argv[2:]:
+        print(f"Exported {table} -> {export_csv(table)}")
@@ -0,0 +1,295 @@
+"""
+streaming.py
+Chunked clean -> featurize -> normalize for raw dumps larger than memory.
+
+    python src/streaming.py api data/trending_history.csv
+    python src/streaming.py scraped data/youtube_scraped_raw.csv --chunksize 50000 --output youtube_scraped_ready
+
+Produces the table preprocessing.py + feature_engineering.py +
+data_cleaning.py would (up to the fill medians, see below), but never holds
+more than one chunk of rows:
+
+  pass 1  read the raw CSV chunk by chunk, clean and featurize each chunk
+          (every chunk also goes into a channel index of its own,
+          data/<output>_channels.sqlite, apart from the features stage's and
+          rebuilt from scratch on every run),
+          drop (title, channel) duplicates against everything seen so far
+          (a hash per distinct pair, kept in SQLite next to the parts),
+          feed the normalization statistics and spill the chunk to a
+          temporary directory under data/
+  pass 2  join the channel aggregates, now over the whole dump, onto every
+          spilled chunk and normalize it with the finished statistics (also
+          saved as the usual normalization artifact, see
+          preprocess_artifact.py) and write it to the output table
+
+Fill values are medians estimated from a fixed-size reservoir sample, so
+they (and the rows they fill) match the in-memory stages only while a
+column has fewer than SKETCH_SIZE values; scaler means and standard
+deviations are exact, accumulated with Welford/Chan updates.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+import data_cleaning
+import feature_engineering
+import preprocessing
+from channel_index import ChannelIndex
+from preprocess_artifact import save_artifact
+from storage import DATA_DIR, default_format, find_table, load_table, save_table, table_path
+
+CHUNKSIZE = 100_000
+SKETCH_SIZE = 100_000
+
+SOURCES = {
+    "scraped": (preprocessing.preprocess_scraped, data_cleaning.FINAL_SCRAPED,
+                data_cleaning.NORMALIZATION_SCRAPED, "Scraped"),
+    "api": (preprocessing.preprocess_api, data_cleaning.FINAL_API, data_cleaning.NORMALIZATION_API, "API"),
+}
+
+
+# -------------------------------------------------------
+#  Single-pass statistics
+# -------------------------------------------------------
+class RunningStats:
+    """Count, mean and variance of a stream of values (NaNs ignored)."""
+
+    def __init__(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def merge(self, count, mean, m2):
+        """Chan et al. parallel update with a block of `count` values."""
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.merge(len(values), values.mean(), ((values - values.mean()) ** 2).sum())
+
+    def std(self):
+        """Population standard deviation, as StandardScaler uses."""
+        return float(np.sqrt(self.m2 / self.count)) if self.count else float("nan")
+
+
+class MedianSketch:
+    """Approximate median from a uniform reservoir sample of the stream."""
+
+    def __init__(self, size=SKETCH_SIZE, seed=42):
+        self.sample = np.empty(size, dtype="float64")
+        self.filled = 0
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        size = len(self.sample)
+
+        take = min(size - self.filled, len(values))
+        self.sample[self.filled:self.filled + take] = values[:take]
+        self.filled += take
+        self.seen += take
+
+        # Algorithm R, vectorized: the i-th value overall replaces a random
+        # slot with probability size / i
+        rest = values[take:]
+        if len(rest):
+            slots = self.rng.integers(0, np.arange(self.seen, self.seen + len(rest)) + 1)
+            keep = slots < size
+            self.sample[slots[keep]] = rest[keep]
+            self.seen += len(rest)
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def quantile(self, q):
+        return float(np.quantile(self.sample[:self.filled], q)) if self.filled else float("nan")
+
+
+class NormalizationStats:
+    """Streams feature chunks into the params data_cleaning.fit_normalization returns."""
+
+    def __init__(self):
+        self.medians = {col: MedianSketch() for col in data_cleaning.NUMERIC_COLS}
+        self.scale = {col: RunningStats() for col in data_cleaning.SCALE_COLS}
+        self.missing = {col: 0 for col in data_cleaning.SCALE_COLS}
+        self.columns = set()
+
+    @staticmethod
+    def scale_source(col):
+        """(numeric column, transform) a scaled column is derived from."""
+        if col.startswith("log_"):
+            return col[len("log_"):], np.log1p
+        return col, lambda values: values
+
+    def update(self, df):
+        self.columns.update(df.columns)
+        numeric = {col: pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+                   for col in data_cleaning.NUMERIC_COLS if col in df.columns}
+        for col, values in numeric.items():
+            self.medians[col].update(values)
+        for col in data_cleaning.SCALE_COLS:
+            source, transform = self.scale_source(col)
+            if source in numeric:
+                values = transform(numeric[source])
+                self.scale[col].update(values)
+                self.missing[col] += int(np.isnan(numeric[source]).sum())
+
+    def params(self):
+        fill = {col: sketch.median() for col, sketch in self.medians.items() if col in self.columns}
+        scale = {}
+        for col, stats in self.scale.items():
+            source, transform = self.scale_source(col)
+            if source not in fill:
+                continue
+            # Missing values are filled with the median before scaling, so
+            # they enter the statistics as a constant block
+            if self.missing[col] and not np.isnan(fill[source]):
+                stats.merge(self.missing[col], float(transform(fill[source])), 0.0)
+            std = stats.std()
+            scale[col] = {"mean": stats.mean, "std": std if std > 0 else 1.0}
+        log = [col for col in data_cleaning.LOG_COLS if col in self.columns]
+        return {"fill": fill, "log": log, "scale": scale}
+
+
+class SeenKeys:
+    """Set of 64-bit row hashes in a SQLite file, so memory stays flat however many rows go by."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE seen (key INTEGER PRIMARY KEY)")
+        self.conn.execute("CREATE TEMP TABLE chunk (key INTEGER PRIMARY KEY)")
+
+    def first(self, keys):
+        """Mask of the `keys` neither repeated earlier in `keys` nor seen before; those are added."""
+        keys = np.asarray(keys).view("int64")  # SQLite integers are signed
+        first = ~pd.Series(keys).duplicated().to_numpy()
+        with self.conn:
+            self.conn.execute("DELETE FROM chunk")
+            self.conn.executemany("INSERT INTO chunk VALUES (?)", ((k,) for k in keys[first].tolist()))
+            known = [k for (k,) in self.conn.execute("SELECT key FROM chunk JOIN seen USING (key)")]
+            first &= ~np.isin(keys, np.asarray(known, dtype="int64"))
+            self.conn.executemany("INSERT INTO seen VALUES (?)", ((k,) for k in keys[first].tolist()))
+        return first
+
+    def close(self):
+        self.conn.close()
+
+
+# -------------------------------------------------------
+#  Output
+# -------------------------------------------------------
+def write_parts(parts, parts_dir, name, fmt=None):
+    """Concatenate spilled part tables into table `name`, one part in memory at a time."""
+    fmt = fmt or default_format()
+    path = table_path(name, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if fmt == "csv":
+        for i, part in enumerate(parts):
+            load_table(part, data_dir=parts_dir).to_csv(path, mode="w" if i == 0 else "a",
+                                                        header=i == 0, index=False)
+        return path
+
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    paths = [find_table(part, parts_dir) for part in parts]
+    read = pq.read_table if fmt == "parquet" else feather.read_table
+
+    # Chunks may disagree on dtypes (ints vs floats with NaN, all-missing
+    # columns); settle on one type per column from the part schemas alone
+    schemas = [pq.read_schema(p) if fmt == "parquet" else pa.ipc.open_file(p).schema for p in paths]
+    fields = []
+    for field in schemas[0].remove_metadata():
+        types = {s.field(field.name).type for s in schemas}
+        if len(types) > 1:
+            numeric = all(pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_null(t) for t in types)
+            field = field.with_type(pa.float64() if numeric else pa.string())
+        fields.append(field)
+    schema = pa.schema(fields)
+
+    writer = pq.ParquetWriter(path, schema) if fmt == "parquet" else pa.ipc.new_file(path, schema)
+    with writer:
+        for p in paths:
+            writer.write_table(read(p).select(schema.names).cast(schema))
+    return path
+
+
+# -------------------------------------------------------
+#  Driver
+# -------------------------------------------------------
+def stream_preprocess(source, input_path, output=None, chunksize=CHUNKSIZE):
+    """Run the chunked pipeline for `source` ("api" or "scraped"); returns the rows written."""
+    clean, default_output, artifact, label = SOURCES[source]
+    output = output or default_output
+    reference = feature_engineering.reference_time()
+    stats = NormalizationStats()
+    index = ChannelIndex(output)
+    index.reset()  # only this dump's videos may feed the aggregates
+    parts, rows_in, rows_kept = [], 0, 0
+    start = time.perf_counter()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="stream_", dir=DATA_DIR) as parts_dir, \
+            closing(SeenKeys(os.path.join(parts_dir, "seen.sqlite"))) as seen:
+        # === Pass 1: clean, featurize, dedupe, accumulate statistics ===
+        for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+            rows_in += len(chunk)
+            df = feature_engineering.engineer_features(clean(chunk), reference)
+            index.update(df)
+
+            keys = pd.util.hash_pandas_object(df[["title", "channel"]], index=False).to_numpy()
+            df = df[seen.first(keys)].reset_index(drop=True)
+
+            stats.update(df)
+            part = f"part_{i:05d}"
+            save_table(df, part, data_dir=parts_dir)
+            parts.append(part)
+            rows_kept += len(df)
+            print(f" chunk {i}: {rows_in:,} rows read, {rows_kept:,} kept")
+
+        if not parts:
+            raise ValueError(f"{input_path} has no rows")
+
+        # === Pass 2: normalize with the finished statistics ===
+        params = stats.params()
+        save_artifact(params, artifact)
+        for part in parts:
+            df = data_cleaning.apply_normalization(index.join(load_table(part, data_dir=parts_dir)), params)
+            save_table(df, part, data_dir=parts_dir)
+        path = write_parts(parts, parts_dir, output)
+
+    elapsed = time.perf_counter() - start
+    print(f"{label} streaming preprocessing complete. Rows: {rows_kept:,} of {rows_in:,} "
+          f"in {elapsed:.1f}s ({rows_in / elapsed:,.0f} rows/s) -> {os.path.relpath(path)}")
+    return rows_kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean, featurize and normalize a raw CSV in chunks.")
+    parser.add_argument("source", choices=sorted(SOURCES), help="which collector produced the CSV")
+    parser.add_argument("input", help="raw CSV (e.g. a multi-million-row trending history dump)")
+    parser.add_argument("--output", help="output table name (default: the usual *_ready table)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args()
+    stream_preprocess(args.source, args.input, args.output, args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
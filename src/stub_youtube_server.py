@@ -0,0 +1,150 @@
+"""
+stub_youtube_server.py
+Local stand-in for the YouTube Data API so the collectors can be exercised offline.
+
+    python src/stub_youtube_server.py --port 8765 --latency 0.3
+    YOUTUBE_API_KEY=dummy YOUTUBE_API_BASE_URL=http://127.0.0.1:8765/youtube/v3/videos python src/api_youtube.py
+    YOUTUBE_SEARCH_URL=http://127.0.0.1:8765/results python src/scrape_youtube.py
+
+Serves canned `videos?chart=mostPopular` pages: 50 items per page, six pages per region.
+Search pages (`/results?search_query=...`) are replayed from saved HTML files in
+--html-dir (named after the query, e.g. `music+video.html`), or synthesized when
+no saved page matches.
+"""
+
+import argparse
+import json
+import os
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PAGES_PER_REGION = 6
+
+
+def make_videos_page(region, page, per_page=50, pages=PAGES_PER_REGION):
+    """Build one canned `videos` API response page for a region."""
+    items = []
+    for i in range(per_page):
+        n = page * per_page + i
+        items.append({
+            "id": f"{region}{n:09d}",
+            "snippet": {
+                "title": f"Stub video {n} ({region})",
+                "channelTitle": f"Stub Channel {n % 40}",
+                "categoryId": str(10 + n % 15),
+                "publishedAt": "2025-10-20T06:01:54Z",
+                "tags": ["stub", region.lower()],
+                "description": f"Canned description for video {n}.",
+            },
+            "contentDetails": {"duration": f"PT{n % 59 + 1}M{n % 60}S"},
+            "statistics": {
+                "viewCount": str(1000 + n * 137),
+                "likeCount": str(10 + n * 3),
+                "commentCount": str(n),
+            },
+        })
+    data = {"kind": "youtube#videoListResponse", "items": items}
+    if page + 1 < pages:
+        data["nextPageToken"] = f"{region}-page-{page + 1}"
+    return data
+
+
+def make_search_page(query, count=20):
+    """Build a search results page shaped like youtube.com/results, with ytInitialData inline."""
+    contents = []
+    for i in range(count):
+        vid = f"{zlib.crc32(query.encode()) % 10**6:06d}{i:05d}"
+        contents.append({"videoRenderer": {
+            "videoId": vid,
+            "title": {"runs": [{"text": f"{query} #{i}"}]},
+            "ownerText": {"runs": [{"text": f"Stub Channel {i % 7}"}]},
+            "viewCountText": {"simpleText": f"{(i + 1) * 12345:,} views"},
+            "lengthText": {"simpleText": f"{i % 20 + 1}:{i % 60:02d}"},
+        }})
+    data = {"contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {
+        "sectionListRenderer": {"contents": [{"itemSectionRenderer": {"contents": contents}}]}}}}}
+    return (
+        "<!DOCTYPE html><html><head><title>YouTube</title></head><body>"
+        "<script>var ytcfg = {};</script>"
+        f"<script>var ytInitialData = {json.dumps(data)};</script>"
+        "</body></html>"
+    )
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled sessions reuse connections
+    latency = 0.0
+    html_dir = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        time.sleep(self.latency)
+
+        if parsed.path.endswith("/videos"):
+            region = query.get("regionCode", ["US"])[0]
+            token = query.get("pageToken", [""])[0]
+            page = int(token.rsplit("-", 1)[-1]) if token else 0
+            per_page = int(query.get("maxResults", ["50"])[0])
+            self.send_json(make_videos_page(region, page, per_page))
+        elif parsed.path.endswith("/results"):
+            query = query.get("search_query", [""])[0]
+            self.send_html(self.load_search_page(query))
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def send_json(self, data, status=200):
+        self.send_body(json.dumps(data).encode("utf-8"), "application/json; charset=utf-8", status)
+
+    def send_body(self, body, content_type, status=200):
+        # Content-derived ETag so conditional requests from the response cache get 304s
+        etag = f'"{zlib.crc32(body):08x}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def load_search_page(self, query):
+        if self.html_dir:
+            path = os.path.join(self.html_dir, query.replace(" ", "+") + ".html")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+        return make_search_page(query)
+
+    def send_html(self, html, status=200):
+        self.send_body(html.encode("utf-8"), "text/html; charset=utf-8", status)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=8765, latency=0.0, html_dir=None):
+    StubHandler.latency = latency
+    StubHandler.html_dir = html_dir
+    return ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned YouTube responses locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--html-dir", help="directory of saved search result pages to replay")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.html_dir)
+    print(f"Stub YouTube server listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
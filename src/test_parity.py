@@ -0,0 +1,181 @@
+"""
+test_parity.py
+Checks that the vectorized kernels and the chunked streaming mode still give
+the same numbers as the code they replaced:
+
+  - normalize_counts: pyarrow vs pandas kernel, and the legacy clean_views on
+    plain "1,234 views" strings (incl. data/youtube_scraped_raw.csv if present)
+  - parse_duration vs the legacy convert_duration on durations under an hour
+  - title_features / keyword_counts vs the legacy .apply versions
+  - streaming.py's dedupe keys and normalization statistics vs
+    data_cleaning.py on a table smaller than SKETCH_SIZE
+
+    python src/test_parity.py
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+import data_cleaning
+import feature_engineering as fe
+import preprocessing as pp
+import streaming
+from benchmark_features import (legacy_clean_views, legacy_convert_duration, legacy_keyword_density,
+                                synthetic_durations, synthetic_view_counts)
+
+ROWS = 20_000
+SCRAPED_RAW = os.path.join(os.path.dirname(__file__), "..", "data", "youtube_scraped_raw.csv")
+
+FAILURES = []
+
+
+def check(name, ok, detail=""):
+    print(f" {'PASS' if ok else 'FAIL'}  {name}" + (f" ({detail})" if detail and not ok else ""))
+    if not ok:
+        FAILURES.append(name)
+
+
+def same(a, b):
+    a, b = np.asarray(a, dtype="float64"), np.asarray(b, dtype="float64")
+    return a.shape == b.shape and np.array_equal(a, b, equal_nan=True)
+
+
+def mismatches(a, b):
+    a, b = np.asarray(a, dtype="float64"), np.asarray(b, dtype="float64")
+    return f"{int((~((a == b) | (np.isnan(a) & np.isnan(b)))).sum())} rows differ"
+
+
+# -------------------------------------------------------
+#  Counts
+# -------------------------------------------------------
+def check_counts(rng):
+    strings = list(synthetic_view_counts(ROWS, rng)) + [
+        "", "no views", "1.234.567 Aufrufe", "1,2 Mio. Aufrufe", "12 345 vues", "5 mal", "1.5K",
+    ]
+    try:
+        arrow = pp._parse_counts_arrow(strings)
+    except ImportError:
+        print(" SKIP  counts: pyarrow kernel (pyarrow not installed)")
+    else:
+        pandas = pp._parse_counts_pandas(strings)
+        check("counts: pyarrow kernel == pandas kernel", same(arrow, pandas), mismatches(arrow, pandas))
+
+    # The legacy parser dropped K/M suffixes and decimals, so parity holds for plain grouped counts only
+    plain = pd.Series([f"{c:,} views" for c in rng.lognormal(10, 3, ROWS).astype(np.int64)] + [None])
+    new, old = pp.normalize_counts(plain), plain.apply(legacy_clean_views)
+    check("counts: normalize_counts == legacy clean_views", same(new, old), mismatches(new, old))
+
+    if os.path.exists(SCRAPED_RAW):
+        views = pd.read_csv(SCRAPED_RAW)["views"]
+        new, old = pp.normalize_counts(views), views.apply(legacy_clean_views)
+        check(f"counts: {os.path.basename(SCRAPED_RAW)} unchanged", same(new, old), mismatches(new, old))
+
+
+# -------------------------------------------------------
+#  Durations
+# -------------------------------------------------------
+def check_durations(rng):
+    durations = synthetic_durations(ROWS, rng)
+    # The legacy parser ignored hours; below an hour both must agree
+    short = pd.concat([durations[~durations.str.contains("H") & (durations.str.count(":") < 2)],
+                       pd.Series(["PT0S", "PT45S", "PT3M", "garbage", None])], ignore_index=True)
+    new, old = fe.parse_duration(short), short.apply(legacy_convert_duration)
+    check("durations: parse_duration == legacy convert_duration", same(new, old), mismatches(new, old))
+
+    hours = fe.parse_duration(pd.Series(["PT1H2M3S", "1:02:03", "P1DT1M"]))
+    check("durations: hours and days counted", same(hours, [62.05, 62.05, 1441.0]), str(hours.tolist()))
+
+
+# -------------------------------------------------------
+#  Text
+# -------------------------------------------------------
+def check_text(rng):
+    words = np.array(["official", "Music", "video", "REMIX", "live", "the", "a", "2024", "ft.", "Lyrics"])
+    titles = pd.Series([" ".join(rng.choice(words, rng.integers(0, 12))) for _ in range(ROWS)]
+                       + ["", "   ", "\tMusic\n", "Ünïcode tïtle ♪"])
+
+    length, word_count, music = fe.title_features(titles)
+    text = titles.astype(str)
+    check("text: title_length", same(length, text.apply(len)))
+    check("text: word_count_title", same(word_count, text.apply(lambda x: len(x.split()))))
+    check("text: has_music_keyword",
+          same(music, titles.str.contains("music|official|video|remix", case=False, regex=True).astype(int)))
+
+    descriptions = pd.concat([titles, pd.Series([None, np.nan, 42])], ignore_index=True)
+    old = descriptions.apply(legacy_keyword_density)
+    check("text: keyword_counts == legacy keyword_density",
+          same(fe.keyword_counts(descriptions, workers=1), old))
+    check("text: keyword_counts in a process pool",
+          same(fe.keyword_counts(descriptions, workers=2, chunk_rows=ROWS // 4), old))
+
+
+# -------------------------------------------------------
+#  Streaming vs in-memory
+# -------------------------------------------------------
+def synthetic_features(n, rng):
+    """A feature frame with repeated (title, channel) pairs and missing values."""
+    df = pd.DataFrame({
+        "title": rng.integers(0, n // 2, n).astype(str),
+        "channel": rng.integers(0, 50, n).astype(str),
+        "views": rng.lognormal(10, 3, n).round(),
+        "likes": rng.lognormal(6, 2, n).round(),
+        "comments": rng.lognormal(4, 2, n).round(),
+        "duration_mins": rng.uniform(0, 60, n),
+        "days_since_upload": rng.integers(0, 365, n).astype("float64"),
+        "engagement_rate": rng.uniform(0, 0.2, n),
+    })
+    for col in data_cleaning.NUMERIC_COLS:
+        df.loc[rng.random(n) < 0.05, col] = np.nan
+    return df
+
+
+def check_streaming(rng, chunksize=1_000):
+    df = synthetic_features(ROWS, rng)
+    batch = data_cleaning.drop_duplicate_videos(df)
+    params = data_cleaning.fit_normalization(batch)
+
+    stats, kept = streaming.NormalizationStats(), []
+    with tempfile.TemporaryDirectory() as tmp, closing(streaming.SeenKeys(os.path.join(tmp, "seen.sqlite"))) as seen:
+        for start in range(0, len(df), chunksize):
+            chunk = df.iloc[start:start + chunksize]
+            keys = pd.util.hash_pandas_object(chunk[["title", "channel"]], index=False).to_numpy()
+            chunk = chunk[seen.first(keys)].reset_index(drop=True)
+            stats.update(chunk)
+            kept.append(chunk)
+    streamed = pd.concat(kept, ignore_index=True)
+    streamed_params = stats.params()
+
+    check("streaming: dedupe keeps the same rows", streamed.equals(batch))
+    check("streaming: fill medians", streamed_params["fill"].keys() == params["fill"].keys()
+          and np.allclose(list(streamed_params["fill"].values()), [params["fill"][c] for c in streamed_params["fill"]],
+                          rtol=1e-12, equal_nan=True))
+    check("streaming: log columns", streamed_params["log"] == params["log"])
+    check("streaming: scaler mean/std",
+          streamed_params["scale"].keys() == params["scale"].keys()
+          and all(np.allclose([s["mean"], s["std"]], [params["scale"][c]["mean"], params["scale"][c]["std"]],
+                              rtol=1e-9) for c, s in streamed_params["scale"].items()))
+
+    out_batch = data_cleaning.apply_normalization(batch.copy(), params)
+    out_stream = data_cleaning.apply_normalization(streamed.copy(), streamed_params)
+    numeric = out_batch.select_dtypes("number").columns
+    check("streaming: normalized table",
+          np.allclose(out_stream[numeric], out_batch[numeric], rtol=1e-9, equal_nan=True))
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    print(f"Parity checks on {ROWS:,} synthetic rows...")
+    check_counts(rng)
+    check_durations(rng)
+    check_text(rng)
+    check_streaming(rng)
+
+    if FAILURES:
+        print(f" {len(FAILURES)} parity check(s) failed.")
+        sys.exit(1)
+    print(" Parity checks completed.")
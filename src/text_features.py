@@ -0,0 +1,428 @@
+"""
+text_features.py
+Hashed n-gram features from titles, tags and descriptions, and an XGBoost model trained on them.
+
+    python src/text_features.py api                          # train + register api_xgboost_text
+    python src/text_features.py scraped --workers 4 --svd 64
+    python src/predict.py videos.csv --model api_xgboost_text
+
+Every text column is split into word 1-2-grams that are hashed into a fixed
+number of columns (TEXT_COLUMNS), like sklearn's HashingVectorizer: nothing
+is learned from the corpus, so there is no vocabulary to grow with it and
+any process can hash any chunk on its own. The hashed counts sit next to
+the honest numeric features (feature_registry.model_features) in one
+sparse matrix that goes to XGBoost as-is.
+
+  pass 1  read the feature table CHUNK_ROWS rows at a time (only the columns
+          used), hash the chunks in a process pool with at most 2 chunks per
+          worker in flight and spill each one as a sparse part to a
+          temporary directory under data/
+  pass 2  XGBoost reads the parts through a DataIter, so the full sparse
+          matrix is never assembled; the QuantileDMatrix it builds keeps one
+          byte-sized bin per stored value (--external-memory pages that out
+          to disk as well)
+
+--svd K fits TruncatedSVD on a sample of at most SVD_SAMPLE_ROWS hashed rows
+and replaces the hashed columns with K dense components while pass 2 reads
+the parts.
+
+Targets are filtered like the dataset's training stage does (TARGET_FILTERS:
+the scraped models drop zero views and everything above the 99th
+percentile, here estimated from a reservoir sample in a pass over the
+views column). Rows are then split into train/test by a hash of the video
+key (TEST_PERCENT % test), so repeated snapshots of one video never
+straddle the split; that split is not the training stages' seeded
+train_test_split, so metrics are comparable in protocol but not row for row
+(meta.json records it under "evaluation"). The
+model is registered as <dataset>_xgboost_text: a Pipeline of TextFeatures
+and the XGBRegressor, so predict.py and serve.py can score raw videos
+with it. Its meta.json also holds the same model's metrics on the numeric
+columns alone, for comparison.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import xgboost as xgb
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.pipeline import Pipeline
+from xgboost import XGBRegressor
+
+import feature_engineering
+import model_api
+import model_scraped
+from feature_registry import TARGET, model_features
+from model_registry import ModelRegistry
+from predict import iter_batches
+from storage import DATA_DIR, find_table, table_columns
+from streaming import MedianSketch
+
+# Hashed columns per text field
+TEXT_COLUMNS = {"title": 2 ** 16, "tags": 2 ** 14, "description": 2 ** 16}
+NGRAM_RANGE = (1, 2)
+CHUNK_ROWS = 50_000
+SVD_SAMPLE_ROWS = 100_000
+MIN_DF = 5  # hashed columns stored in fewer training rows than this are dropped
+TEST_PERCENT = 20
+MAX_BIN = 256
+
+# dataset -> target rows kept, as in model_scraped.prepare_data / model_api.prepare_features
+TARGET_FILTERS = {
+    "scraped": {"positive": True, "cap_quantile": 0.99},
+    "api": {"positive": False, "cap_quantile": None},
+}
+
+# dataset -> (feature table, key column, XGBoost the training stage uses)
+DATASETS = {
+    "scraped": (feature_engineering.FE_SCRAPED, "url", lambda: model_scraped.build_models()["XGBoost (Tuned)"]),
+    "api": (feature_engineering.FE_API, "video_id", lambda: model_api.build_models()["XGBoost (API)"]),
+}
+
+
+# -------------------------------------------------------
+#  Hashing
+# -------------------------------------------------------
+class TextFeatures(BaseEstimator, TransformerMixin):
+    """Frame of featurized videos -> sparse [numeric | hashed n-grams per text column] matrix.
+
+    hash() is stateless. transform() also drops the hashed columns that
+    were too rare in training (once fit/select_columns ran) and, if
+    `components` is set, compresses the rest to that many TruncatedSVD
+    components (once fit/fit_svd ran).
+    """
+
+    def __init__(self, numeric=(), columns=None, ngram_range=NGRAM_RANGE, components=None, seed=42):
+        self.numeric = numeric
+        self.columns = columns
+        self.ngram_range = ngram_range
+        self.components = components
+        self.seed = seed
+
+    def _text_columns(self):
+        return TEXT_COLUMNS if self.columns is None else self.columns
+
+    def hash(self, df):
+        """Uncompressed matrix: numeric columns as float32 (NaN = missing), then hashed counts."""
+        numeric = df.reindex(columns=list(self.numeric)).apply(pd.to_numeric, errors="coerce")
+        blocks = [sp.csr_matrix(numeric.to_numpy(dtype="float32"))]
+        for col, width in self._text_columns().items():
+            texts = df[col].astype(object).fillna("") if col in df.columns else pd.Series("", index=df.index)
+            vectorizer = HashingVectorizer(n_features=width, ngram_range=tuple(self.ngram_range),
+                                           alternate_sign=False, norm=None, dtype=np.float32)
+            blocks.append(vectorizer.transform(texts.astype(str)))
+        return sp.hstack(blocks, format="csr", dtype=np.float32)
+
+    def select_columns(self, counts, min_df=MIN_DF):
+        """Keep the hashed columns with at least `min_df` rows in `counts` (stored values per column)."""
+        self.keep_ = np.flatnonzero(np.asarray(counts)[len(self.numeric):] >= min_df)
+        return self
+
+    def _select(self, matrix):
+        n = len(self.numeric)
+        if getattr(self, "keep_", None) is None:
+            return matrix
+        return matrix[:, np.concatenate([np.arange(n), n + self.keep_])]
+
+    def fit_svd(self, hashed):
+        """Fit the TruncatedSVD on the hashed block of an uncompressed sample matrix."""
+        if self.components:
+            self.svd_ = TruncatedSVD(n_components=self.components, random_state=self.seed)
+            self.svd_.fit(self._select(hashed)[:, len(self.numeric):])
+        return self
+
+    def compress(self, matrix):
+        """An uncompressed matrix without the rare hashed columns, and with the rest replaced
+        by the SVD components (if fitted)."""
+        matrix = self._select(matrix)
+        if getattr(self, "svd_", None) is None:
+            return matrix
+        n = len(self.numeric)
+        dense = self.svd_.transform(matrix[:, n:]).astype(np.float32)
+        return sp.hstack([matrix[:, :n], sp.csr_matrix(dense)], format="csr")
+
+    def width(self):
+        """Columns transform() returns."""
+        if getattr(self, "svd_", None) is not None:
+            return len(self.numeric) + self.components
+        if getattr(self, "keep_", None) is not None:
+            return len(self.numeric) + len(self.keep_)
+        return len(self.numeric) + sum(self._text_columns().values())
+
+    def fit(self, X, y=None):
+        hashed = self.hash(X)
+        self.select_columns(np.bincount(hashed.indices, minlength=hashed.shape[1]))
+        return self.fit_svd(hashed)
+
+    def transform(self, X):
+        return self.compress(self.hash(X))
+
+
+def target_and_split(df, key, positive=False, cap=None):
+    """(rows with a usable target, their log1p target, their test-set mask).
+
+    `positive` also drops zero views and `cap` views above it.
+    """
+    views = pd.to_numeric(df[TARGET], errors="coerce")
+    valid = views.notna() & np.isfinite(views) & ((views > 0) if positive else (views >= 0))
+    if cap is not None:
+        valid &= views <= cap
+    df = df[valid.to_numpy()]
+    keys = df[key] if key in df.columns else df["title"]
+    test = (pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy() % 100) < TEST_PERCENT
+    return df, np.log1p(views[valid].to_numpy(dtype="float64")), test
+
+
+# Worker processes hash chunks and write their parts themselves, so only
+# the raw chunk crosses the process boundary
+_STATE = {}
+
+
+def _init_worker(text):
+    _STATE["text"] = text
+
+
+def _hash_part(task):
+    path, chunk, y, test = task
+    X = _STATE["text"].hash(chunk)
+    sp.save_npz(path + ".X.npz", X, compressed=False)
+    np.savez(path + ".y.npz", y=y, test=test)
+    # Training rows per column, for select_columns
+    counts = np.bincount(X[~test].indices, minlength=X.shape[1])
+    return path, X.shape[0], X.nnz, counts
+
+
+def _bounded_map(pool, fn, tasks, limit):
+    """pool.map that submits at most `limit` tasks ahead of the results it has handed out."""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def target_cap(table, quantile, positive=False, chunk_rows=CHUNK_ROWS):
+    """`quantile` of the usable views of `table`, from a reservoir sample of the views column."""
+    sketch = MedianSketch()
+    for chunk in iter_batches(find_table(table), chunk_rows, columns=[TARGET]):
+        views = pd.to_numeric(chunk[TARGET], errors="coerce").to_numpy(dtype="float64")
+        views = views[np.isfinite(views) & ((views > 0) if positive else (views >= 0))]
+        sketch.update(views)
+    return sketch.quantile(quantile)
+
+
+def hash_table(table, columns, key, text, parts_dir, workers=1, chunk_rows=CHUNK_ROWS, positive=False, cap=None):
+    """Pass 1: hash `columns` of `table` into sparse parts (target rows filtered as target_and_split).
+
+    Returns ([part paths], rows, stored values, training rows per column, data hash).
+    """
+    h = hashlib.sha256()
+
+    def tasks():
+        for i, chunk in enumerate(iter_batches(find_table(table), chunk_rows, columns=columns)):
+            chunk, y, test = target_and_split(chunk, key, positive, cap)
+            h.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+            yield os.path.join(parts_dir, f"part_{i:05d}"), chunk, y, test
+
+    parts, rows, nnz, counts = [], 0, 0, 0
+    if workers <= 1:
+        _init_worker(text)
+        results = map(_hash_part, tasks())
+    else:
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(text,))
+        results = _bounded_map(pool, _hash_part, tasks(), 2 * workers)
+    try:
+        for part, n, stored, part_counts in results:
+            parts.append(part)
+            rows, nnz, counts = rows + n, nnz + stored, counts + part_counts
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    return parts, rows, nnz, counts, h.hexdigest()
+
+
+# -------------------------------------------------------
+#  Training (pass 2)
+# -------------------------------------------------------
+def load_part(part, text, test, numeric_only=False):
+    """(X, y) of the train or test rows of a spilled part, compressed by `text`."""
+    X = sp.load_npz(part + ".X.npz")
+    with np.load(part + ".y.npz") as stored:
+        y, rows = stored["y"], stored["test"] == test
+    X = X[:, :len(text.numeric)] if numeric_only else text.compress(X)
+    return X[rows], y[rows]
+
+
+class PartIter(xgb.DataIter):
+    """Feeds the training rows of the parts to XGBoost one part at a time."""
+
+    def __init__(self, parts, text, numeric_only=False, cache_prefix=None):
+        self.parts, self.text, self.numeric_only = parts, text, numeric_only
+        self._i = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._i == len(self.parts):
+            return 0
+        X, y = load_part(self.parts[self._i], self.text, test=False, numeric_only=self.numeric_only)
+        input_data(data=X, label=y)
+        self._i += 1
+        return 1
+
+    def reset(self):
+        self._i = 0
+
+
+def fit_svd(parts, text, rows, seed=42):
+    """text.fit_svd on up to SVD_SAMPLE_ROWS training rows sampled evenly from every part."""
+    rng = np.random.default_rng(seed)
+    share = min(1.0, SVD_SAMPLE_ROWS / max(rows, 1))
+    sample = []
+    for part in parts:
+        X = sp.load_npz(part + ".X.npz")
+        with np.load(part + ".y.npz") as stored:
+            rows_kept = ~stored["test"] & (rng.random(X.shape[0]) < share)
+        sample.append(X[rows_kept])
+    return text.fit_svd(sp.vstack(sample, format="csr"))
+
+
+def train_booster(parts, text, model, numeric_only=False, cache_dir=None):
+    """XGBRegressor with `model`'s hyperparameters, trained on the parts' training rows."""
+    params = {k: v for k, v in model.get_xgb_params().items() if v is not None}
+    params.update(tree_method="hist", max_bin=MAX_BIN)
+    cache_prefix = os.path.join(cache_dir, "numeric" if numeric_only else "text") if cache_dir else None
+    train_iter = PartIter(parts, text, numeric_only=numeric_only, cache_prefix=cache_prefix)
+    dtrain = xgb.DMatrix(train_iter) if cache_prefix else xgb.QuantileDMatrix(train_iter, max_bin=MAX_BIN)
+    booster = xgb.train(params, dtrain, num_boost_round=model.n_estimators)
+    fitted = XGBRegressor(**model.get_params())
+    fitted.load_model(bytearray(booster.save_raw("ubj")))
+    return fitted
+
+
+def evaluate_parts(parts, text, model, numeric_only=False):
+    """(RMSE, R² in views, y_true log, y_pred log) over the parts' test rows, one part at a time."""
+    y_true, y_pred = [], []
+    for part in parts:
+        X, y = load_part(part, text, test=True, numeric_only=numeric_only)
+        if len(y):
+            y_true.append(y)
+            y_pred.append(np.nan_to_num(model.predict(X), nan=0.0, posinf=0.0, neginf=0.0))
+    y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+    views, preds = np.expm1(y_true), np.expm1(y_pred)
+    return float(np.sqrt(mean_squared_error(views, preds))), float(r2_score(views, preds)), y_true, y_pred
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def train_text_model(dataset, workers=1, components=None, chunk_rows=CHUNK_ROWS, external_memory=False,
+                     registry=None):
+    """Hash, train, evaluate and register <dataset>_xgboost_text; returns (version, metrics)."""
+    table, key, make_model = DATASETS[dataset]
+    name = f"{dataset}_xgboost_text"
+    columns = table_columns(table)
+    sample = next(iter_batches(find_table(table), 1000, columns=columns))
+    numeric = list(model_features(sample).columns)
+    text = TextFeatures(numeric, {c: w for c, w in TEXT_COLUMNS.items() if c in columns}, NGRAM_RANGE, components)
+    model = make_model()
+    used = numeric + list(text.columns) + [TARGET] + ([key] if key in columns else [])
+    registry = registry or ModelRegistry()
+
+    # Same target rows as the dataset's training stage
+    target_filter = TARGET_FILTERS[dataset]
+    positive, quantile = target_filter["positive"], target_filter["cap_quantile"]
+    cap = target_cap(table, quantile, positive, chunk_rows) if quantile else None
+    evaluation = {"positive_views": positive, "cap_quantile": quantile, "views_cap": cap,
+                  "split": f"{TEST_PERCENT}% test by a hash of {key if key in columns else 'title'}"}
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="text_", dir=DATA_DIR) as parts_dir:
+        # === Pass 1: hash ===
+        start = time.perf_counter()
+        parts, rows, nnz, counts, data_hash = hash_table(table, used, key, text, parts_dir, workers, chunk_rows,
+                                                     positive, cap)
+        if not rows:
+            raise ValueError(f"Table '{table}' has no rows with a usable '{TARGET}'")
+        seconds = time.perf_counter() - start
+        width = text.width()
+        text.select_columns(counts)
+        print(f" Hashed {rows:,} rows in {len(parts)} part(s) x {width:,} columns ({nnz / rows:.1f} stored values/row, "
+              f"{nnz * 8 / 2 ** 20:,.1f} MB sparse) in {seconds:.1f}s ({rows / seconds:,.0f} rows/s, {workers} worker(s)); "
+              f"{len(text.keep_):,} hashed columns in >= {MIN_DF} training rows kept")
+
+        config = {"columns": text.columns, "ngram_range": list(NGRAM_RANGE), "min_df": MIN_DF,
+                  "components": components, "test_percent": TEST_PERCENT, "external_memory": external_memory}
+        fp = hashlib.sha256(json.dumps([data_hash, numeric, config, evaluation, model.get_params()],
+                                       sort_keys=True, default=str).encode()).hexdigest()[:16]
+        version = registry.find(name, fp)
+        if version:
+            registry.set_current(name, version)
+            metrics = registry.meta(name, version)["metrics"]
+            print(f" {name}: unchanged, reusing {version}  RMSE: {metrics['rmse']:,.0f}, R²: {metrics['r2']:.3f}")
+            return version, metrics
+
+        # === Pass 2: train on the parts ===
+        if components:
+            start = time.perf_counter()
+            fit_svd(parts, text, rows)
+            print(f" TruncatedSVD: {components} components, {text.svd_.explained_variance_ratio_.sum():.1%} "
+                  f"of sampled variance, in {time.perf_counter() - start:.1f}s")
+        cache_dir = parts_dir if external_memory else None
+        results = {}
+        for label, numeric_only in (("numeric only", True), ("numeric + text", False)):
+            start = time.perf_counter()
+            fitted = train_booster(parts, text, model, numeric_only, cache_dir)
+            seconds = time.perf_counter() - start
+            rmse, r2, y_true, y_pred = evaluate_parts(parts, text, fitted, numeric_only)
+            results[label] = {"model": fitted, "rmse": rmse, "r2": r2, "fit_seconds": round(seconds, 2),
+                              "y_true": y_true, "y_pred": y_pred}
+            print(f" {name} ({label}): RMSE: {rmse:,.0f}, R²: {r2:.3f}, fit {seconds:.1f}s, "
+                  f"peak RSS {peak_rss_mb():,.0f} MB")
+
+    best = results["numeric + text"]
+    baseline = {k: v for k, v in results["numeric only"].items() if k in ("rmse", "r2", "fit_seconds")}
+    pipeline = Pipeline([("text", text), ("model", best["model"])])
+    predictions = pd.DataFrame({"y_true": best["y_true"], "y_pred": best["y_pred"]})
+    metrics = {"rmse": best["rmse"], "r2": best["r2"]}
+    version = registry.save(name, pipeline, fp, numeric + list(text.columns), metrics, predictions=predictions,
+                            extra={"source": dataset, "text": config, "evaluation": evaluation, "train_rows": rows - len(best["y_true"]),
+                                   "test_rows": len(best["y_true"]), "numeric_only": baseline})
+    print(f" -> {name}/{version}")
+    return version, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train an XGBoost model on hashed text n-grams + numeric features.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="hashing processes")
+    parser.add_argument("--svd", type=int, default=None, metavar="K",
+                        help="compress the hashed columns to K TruncatedSVD components")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--external-memory", action="store_true",
+                        help="page XGBoost's quantized matrix to disk instead of holding it in memory")
+    args = parser.parse_args()
+    # Through the module, so the pickled TextFeatures refers to text_features rather than __main__
+    import text_features
+    text_features.train_text_model(args.dataset, args.workers, args.svd, args.chunk_rows, args.external_memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+tune.py
+Hyperparameter search for the XGBoost and Random Forest models of both datasets.
+
+    python src/tune.py                                   # 4 models x 27 configurations
+    python src/tune.py --dataset scraped --model xgboost --trials 81 --workers 4
+
+Successive halving: --trials random configurations per model are trained
+with a small budget (boosting rounds for XGBoost, trees for Random Forest)
+and scored on a validation split carved out of the training split; the best
+1/ETA of them continue with ETA times the budget, until one is left. Most of
+the CPU goes to the few configurations that are still competitive instead of
+being spread evenly over a grid.
+
+XGBoost trials
+  - use the native API with early stopping on the validation split: a
+    configuration stops adding rounds once they no longer help, and one
+    that stopped early is not trained again in later rungs
+  - resume from the previous rung's booster instead of starting over
+  - share one QuantileDMatrix per dataset per worker process, so the data is
+    quantized into histogram bins once rather than once per trial
+Random Forest trials grow the previous rung's forest (warm_start) with the
+extra trees only; with a fixed random_state that is the forest a fresh fit
+with the full tree count would give. They run one after another in this
+process with every CPU building trees, so the surviving forests stay in
+memory between rungs. XGBoost trials of a rung run in a process pool
+(threads per trial = CPUs / workers).
+
+The best configuration of each model is refitted on the whole training split,
+scored on the same test split as model_scraped.py / model_api.py and
+registered as <dataset>_<model>_tuned, with the search leaderboard in its
+meta.json (python src/predict.py videos.csv --model scraped_xgboost_tuned).
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+
+import model_api
+import model_scraped
+from model_registry import ModelRegistry, fingerprint
+from preprocess_artifact import fit_artifact, transform
+from storage import load_table
+
+DATASETS = ["scraped", "api"]
+MODELS = ["xgboost", "random_forest"]
+TRIALS = 27
+ETA = 3
+VALID_SIZE = 0.2
+MAX_BIN = 256                 # fixed, so every trial can share one quantized DMatrix
+EARLY_STOPPING_ROUNDS = 30
+# (first rung, cap) of each model's budget: boosting rounds / trees
+BUDGETS = {"xgboost": (50, 2000), "random_forest": (25, 400)}
+FOREST_DEPTHS = [8, 12, 16, 20, 24, None]
+
+
+# -------------------------------------------------------
+#  Search space
+# -------------------------------------------------------
+def log_uniform(rng, low, high):
+    return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+
+
+def sample_params(kind, rng):
+    if kind == "xgboost":
+        return {
+            "max_depth": int(rng.integers(3, 11)),
+            "learning_rate": log_uniform(rng, 0.01, 0.3),
+            "subsample": float(rng.uniform(0.6, 1.0)),
+            "colsample_bytree": float(rng.uniform(0.5, 1.0)),
+            "min_child_weight": log_uniform(rng, 1, 20),
+            "reg_alpha": log_uniform(rng, 1e-3, 5),
+            "reg_lambda": log_uniform(rng, 1e-2, 10),
+        }
+    return {
+        "max_depth": FOREST_DEPTHS[rng.integers(len(FOREST_DEPTHS))],
+        "min_samples_split": int(rng.choice([2, 4, 8, 16])),
+        "min_samples_leaf": int(rng.choice([1, 2, 4, 8])),
+        "max_features": float(rng.choice([0.3, 0.5, 0.7, 1.0])),
+    }
+
+
+# -------------------------------------------------------
+#  Data
+# -------------------------------------------------------
+def load_dataset(dataset):
+    """Train/test split exactly as the training stage makes it, plus a validation split for the search."""
+    if dataset == "scraped":
+        df = load_table(model_scraped.DATA_TABLE, numeric_only=True)
+        X_train, X_test, y_train, y_test = model_scraped.split_data(df)
+        artifact = fit_artifact(X_train)
+        fit_train, fit_test = transform(artifact, X_train), transform(artifact, X_test)
+    else:
+        df = load_table(model_api.DATA_TABLE, numeric_only=True)
+        X_train, X_test, y_train, y_test = model_api.split_data(df)
+        artifact = None
+        # API models are fitted on the raw frame (they keep its column names)
+        fit_train, fit_test = X_train, X_test
+
+    # The transformed training matrix is the search's too (no second copy of it)
+    matrix = fit_train if artifact else X_train.to_numpy(dtype="float64")
+    X_tr, X_va, y_tr, y_va = train_test_split(matrix, np.asarray(y_train, dtype="float64"),
+                                              test_size=VALID_SIZE, random_state=42)
+    return {
+        "X_train": X_train, "y_train": y_train, "y_test": y_test, "artifact": artifact,
+        "fit_train": fit_train, "fit_test": fit_test,
+        "search": (X_tr, y_tr, X_va, y_va),
+    }
+
+
+# -------------------------------------------------------
+#  Trials (run in worker processes)
+# -------------------------------------------------------
+_DATA = {}     # dataset -> (X_tr, y_tr, X_va, y_va) of this process
+_DMATRIX = {}  # dataset -> (dtrain, dvalid), built on first use
+
+
+def _init_worker(data):
+    _DATA.update(data)
+
+
+def _dmatrices(dataset):
+    if dataset not in _DMATRIX:
+        X_tr, y_tr, X_va, y_va = _DATA[dataset]
+        dtrain = xgb.QuantileDMatrix(X_tr, y_tr, max_bin=MAX_BIN)
+        dvalid = xgb.QuantileDMatrix(X_va, y_va, ref=dtrain)
+        _DMATRIX[dataset] = (dtrain, dvalid)
+    return _DMATRIX[dataset]
+
+
+def _xgboost_trial(task):
+    dtrain, dvalid = _dmatrices(task["dataset"])
+    params = {**task["params"], "objective": "reg:squarederror", "eval_metric": "rmse", "tree_method": "hist",
+              "max_bin": MAX_BIN, "nthread": task["threads"], "seed": 42}
+    booster = None
+    if task["booster"] is not None:
+        booster = xgb.Booster()
+        booster.load_model(bytearray(task["booster"]))
+    done = booster.num_boosted_rounds() if booster is not None else 0
+
+    booster = xgb.train(params, dtrain, num_boost_round=task["budget"] - done, evals=[(dvalid, "valid")],
+                        early_stopping_rounds=EARLY_STOPPING_ROUNDS, xgb_model=booster, verbose_eval=False)
+    rounds = booster.num_boosted_rounds()
+    score, best = float(booster.best_score), int(booster.best_iteration)
+    # Early stopping only sees this rung's rounds; an earlier rung may have done better
+    if task["score"] is not None and task["score"] <= score:
+        score, best = task["score"], task["best_iteration"]
+    return {"score": score, "best_iteration": best, "rounds": rounds,
+            "converged": rounds < task["budget"] or rounds >= BUDGETS["xgboost"][1], "booster": bytes(booster.save_raw("ubj"))}
+
+
+def _forest_trial(task):
+    X_tr, y_tr, X_va, y_va = _DATA[task["dataset"]]
+    if task["booster"] is not None:
+        # The previous rung's forest itself: only the trees this rung adds are fitted
+        model = task["booster"]
+        model.set_params(n_estimators=task["budget"], n_jobs=task["threads"])
+    else:
+        model = RandomForestRegressor(**task["params"], n_estimators=task["budget"], n_jobs=task["threads"],
+                                      random_state=42, warm_start=True)
+    model.fit(X_tr, y_tr)
+    score = float(np.sqrt(np.mean((model.predict(X_va) - y_va) ** 2)))
+    return {"score": score, "best_iteration": None, "rounds": task["budget"],
+            "converged": task["budget"] >= BUDGETS["random_forest"][1], "booster": model}
+
+
+def run_trial(task):
+    """Train one configuration up to task["budget"]; scores are validation RMSE of log1p(views)."""
+    start = time.process_time()
+    result = _xgboost_trial(task) if task["kind"] == "xgboost" else _forest_trial(task)
+    result["cpu_seconds"] = time.process_time() - start
+    return result
+
+
+# -------------------------------------------------------
+#  Successive halving
+# -------------------------------------------------------
+def successive_halving(data, models, trials=TRIALS, eta=ETA, workers=1, seed=42):
+    """Search every (dataset, kind) in `models`; returns {(dataset, kind): candidates sorted best first}."""
+    # One generator per model, so a model's configurations don't depend on which others are searched
+    rngs = {(d, k): np.random.default_rng([seed, DATASETS.index(d), MODELS.index(k)]) for d, k in models}
+    candidates = [
+        {"dataset": dataset, "kind": kind, "id": i, "params": sample_params(kind, rngs[dataset, kind]),
+         "rung": 0, "score": None, "best_iteration": None, "rounds": 0, "converged": False, "booster": None,
+         "cpu_seconds": 0.0}
+        for dataset, kind in models for i in range(trials)
+    ]
+    rungs = math.ceil(math.log(trials, eta) - 1e-9) + 1 if trials > 1 else 1
+    cpus = os.cpu_count() or 1
+    threads = max(1, cpus // workers)
+
+    pool = None
+    if workers > 1:
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(data,))
+    else:
+        _init_worker(data)
+
+    alive = candidates
+    try:
+        for rung in range(rungs):
+            pending = [c for c in alive if not c["converged"]]
+            tasks = []
+            for c in pending:
+                low, cap = BUDGETS[c["kind"]]
+                tasks.append({**c, "budget": min(cap, low * eta ** rung), "threads": threads})
+            # Biggest budgets first so the pool doesn't end on one long trial
+            order = sorted(range(len(tasks)), key=lambda i: -tasks[i]["budget"])
+            boosted = [i for i in order if tasks[i]["kind"] == "xgboost"]
+            forests = [i for i in order if tasks[i]["kind"] == "random_forest"]
+            start = time.perf_counter()
+            results = list(zip(boosted, pool.map(run_trial, [tasks[i] for i in boosted]) if pool
+                               else map(run_trial, [tasks[i] for i in boosted])))
+            # Forests stay in this process, so survivors are grown in place
+            # rather than shipped to and from a worker every rung
+            results += [(i, run_trial({**tasks[i], "threads": cpus})) for i in forests]
+            for i, result in results:
+                cpu = pending[i]["cpu_seconds"] + result.pop("cpu_seconds")
+                pending[i].update(result, cpu_seconds=cpu)
+            for c in alive:
+                c["rung"] = rung
+            elapsed = time.perf_counter() - start
+
+            survivors = []
+            for dataset, kind in models:
+                group = sorted((c for c in alive if c["dataset"] == dataset and c["kind"] == kind),
+                               key=lambda c: c["score"])
+                print(f" rung {rung}: {dataset}_{kind}: {len(group)} configs, "
+                      f"best valid RMSE (log) {group[0]['score']:.4f}")
+                survivors += group[:max(1, math.ceil(len(group) / eta))]
+            print(f" rung {rung}: {len(tasks)} trials in {elapsed:.1f}s")
+            if rung < rungs - 1:
+                for c in alive:
+                    if c not in survivors:
+                        c["booster"] = None  # only survivors resume (booster or forest)
+                alive = survivors
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return {(dataset, kind): sorted((c for c in candidates if c["dataset"] == dataset and c["kind"] == kind),
+                                    key=lambda c: (-c["rung"], c["score"]))
+            for dataset, kind in models}
+
+
+# -------------------------------------------------------
+#  Refit + register the winners
+# -------------------------------------------------------
+def build_model(kind, best):
+    if kind == "xgboost":
+        return XGBRegressor(**best["params"], n_estimators=best["best_iteration"] + 1, tree_method="hist",
+                            max_bin=MAX_BIN, random_state=42, n_jobs=-1)
+    return RandomForestRegressor(**best["params"], n_estimators=best["rounds"], random_state=42, n_jobs=-1)
+
+
+def register_best(dataset, kind, ranked, bundle, registry, eta):
+    best = ranked[0]
+    name = f"{dataset}_{kind}_tuned"
+    model = build_model(kind, best)
+    fp = fingerprint(bundle["X_train"], bundle["y_train"], model, bundle["artifact"])
+    version = registry.find(name, fp)
+    if version:
+        registry.set_current(name, version)
+        metrics = registry.meta(name, version)["metrics"]
+        print(f" {name}: unchanged, reusing {version}  RMSE: {metrics['rmse']:,.0f}, R²: {metrics['r2']:.3f}")
+        return name, version, metrics
+
+    rmse, r2, preds_log = model_scraped.evaluate(model, name, bundle["fit_train"], bundle["fit_test"],
+                                                 bundle["y_train"], bundle["y_test"])
+    leaderboard = [{"params": c["params"], "valid_rmse_log": c["score"], "rounds": c["rounds"],
+                    "best_iteration": c["best_iteration"]} for c in ranked[:5]]
+    search = {"method": "successive_halving", "trials": len(ranked), "eta": eta,
+              "cpu_seconds": round(sum(c["cpu_seconds"] for c in ranked), 2),
+              "valid_rmse_log": best["score"], "leaderboard": leaderboard}
+    predictions = pd.DataFrame({"y_true": np.asarray(bundle["y_test"]), "y_pred": preds_log})
+    version = registry.save(name, model, fp, bundle["X_train"].columns, {"rmse": rmse, "r2": r2},
+                            predictions=predictions, artifact=bundle["artifact"],
+                            extra={"train_rows": len(bundle["X_train"]), "test_rows": len(bundle["y_test"]),
+                                   "search": search})
+    return name, version, {"rmse": rmse, "r2": r2}
+
+
+def baseline_metrics(registry, dataset, kind):
+    """Metrics of the hand-tuned model the training stage registered, if any."""
+    try:
+        return registry.meta(f"{dataset}_{kind}")["metrics"]
+    except (FileNotFoundError, KeyError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search for the view models.")
+    parser.add_argument("--dataset", choices=DATASETS + ["all"], default="all")
+    parser.add_argument("--model", choices=MODELS + ["all"], default="all")
+    parser.add_argument("--trials", type=int, default=TRIALS, help="configurations per model")
+    parser.add_argument("--eta", type=int, default=ETA, help="keep the best 1/eta at every rung")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="trial processes")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    datasets = DATASETS if args.dataset == "all" else [args.dataset]
+    kinds = MODELS if args.model == "all" else [args.model]
+    bundles = {dataset: load_dataset(dataset) for dataset in datasets}
+    models = [(dataset, kind) for dataset in datasets for kind in kinds]
+
+    start = time.perf_counter()
+    print(f"\n Searching {len(models)} model(s) x {args.trials} configs (eta={args.eta}, {args.workers} workers)...\n")
+    ranked = successive_halving({d: b["search"] for d, b in bundles.items()}, models,
+                                args.trials, args.eta, args.workers, args.seed)
+    print(f"\n Search finished in {time.perf_counter() - start:.1f}s\n")
+
+    registry = ModelRegistry()
+    for dataset, kind in models:
+        best = ranked[(dataset, kind)][0]
+        cpu = sum(c["cpu_seconds"] for c in ranked[(dataset, kind)])
+        print(f" {dataset}_{kind}: best {best['params']} ({best['rounds']} rounds/trees), "
+              f"valid RMSE (log) {best['score']:.4f}, search CPU {cpu:.1f}s")
+        name, version, metrics = register_best(dataset, kind, ranked[(dataset, kind)], bundles[dataset],
+                                               registry, args.eta)
+        baseline = baseline_metrics(registry, dataset, kind)
+        vs = f" (hand-set {dataset}_{kind}: RMSE {baseline['rmse']:,.0f}, R² {baseline['r2']:.3f})" if baseline else ""
+        print(f" -> {name}/{version}: test RMSE {metrics['rmse']:,.0f}, R² {metrics['r2']:.3f}{vs}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+video_store.py
+Local SQLite store of every video the collectors have seen (data/videos.sqlite).
+
+    store = VideoStore()
+    store.upsert(rows, "api")                               # collector rows, upserted on video_id
+    df = store.query("api", regions=["US"], since="2024-01-01")
+    history = store.snapshots(["dQw4w9WgXcQ"])              # views/likes/comments over time
+
+Tables:
+
+    videos     one row per video_id: title, channel, upload date, ... (the
+               latest non-empty value of each field wins)
+    regions    (region, video_id) for every region a video trended in
+    snapshots  (video_id, source, captured) -> views, likes, comments; one
+               row per collection run, so counts are kept over time
+
+with indexes on channel, upload date and region, so query() reads only the
+slice it is asked for. Scraped rows have no video_id column; it is taken
+from their watch URL. query() returns the collector's raw CSV layout with
+the latest snapshot's counts, ready for preprocessing.py.
+
+Both collectors write into the store as they go; the CSVs already in data/
+and old_data/ can be brought in once with
+
+    python src/video_store.py import scraped data/youtube_scraped_3000.csv old_data/*scraped*.csv
+    python src/video_store.py import api data/youtube_api_raw.csv
+    python src/video_store.py export api youtube_api_raw --region US --since 2024-01-01
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+import numpy as np
+import pandas as pd
+
+import feature_engineering as fe
+from preprocessing import normalize_counts
+from storage import DATA_DIR, save_table
+
+STORE_PATH = os.path.join(DATA_DIR, "videos.sqlite")
+
+# Raw CSV layout of each collector (see api_youtube.py and yt_initial_data.py)
+SOURCE_COLUMNS = {
+    "api": ["region", "video_id", "title", "channel", "category_id", "views", "likes", "comments",
+            "upload_date", "duration", "tags", "description"],
+    "scraped": ["url", "title", "channel", "views", "duration"],
+}
+META_COLUMNS = ["url", "title", "channel", "category_id", "upload_date", "duration", "tags", "description"]
+COUNT_COLUMNS = ["views", "likes", "comments"]
+VIDEO_ID_PATTERN = r"(?:[?&]v=|youtu\.be/|/shorts/)([\w-]{11})"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    {", ".join(f"{c} TEXT" for c in META_COLUMNS)},
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_channel ON videos (channel);
+CREATE INDEX IF NOT EXISTS videos_upload_date ON videos (upload_date);
+CREATE TABLE IF NOT EXISTS regions (
+    region TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (region, video_id)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    video_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    captured TEXT NOT NULL,
+    views REAL, likes REAL, comments REAL,
+    PRIMARY KEY (video_id, source, captured)
+);
+"""
+
+
+def video_ids(df):
+    """video_id of every row: the column if present, else parsed from the watch URL (None if neither)."""
+    ids = pd.Series(None, index=df.index, dtype=object)
+    if "video_id" in df.columns:
+        ids = df["video_id"].astype(object).where(df["video_id"].notna(), None)
+    if "url" in df.columns:
+        from_url = df["url"].astype(str).str.extract(VIDEO_ID_PATTERN)[0]
+        ids = ids.where(ids.notna(), from_url)
+    return ids.where(ids.notna() & (ids.astype(str).str.strip() != ""), None)
+
+
+def _text(series):
+    """Series as stripped strings with missing/empty values as None."""
+    text = series.astype(object).where(series.notna(), None)
+    return text.map(lambda v: None if v is None or str(v).strip() in ("", "nan") else str(v).strip())
+
+
+def _sql_rows(frame):
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+class VideoStore:
+    """Upserts collector rows and serves indexed slices of them."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @contextmanager
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")  # readers are not blocked while a collector writes
+        conn.executescript(SCHEMA)
+        with closing(conn), conn:
+            yield conn
+
+    # -------------------------------------------------------
+    #  Writing
+    # -------------------------------------------------------
+    def upsert(self, rows, source, captured=None):
+        """Upsert collector rows (dicts or a frame) and record one snapshot of their counts.
+
+        `captured` (ISO timestamp, default now UTC) stamps the snapshot; rows
+        without a usable video_id are skipped. Returns the videos written.
+        """
+        if source not in SOURCE_COLUMNS:
+            raise ValueError(f"Unknown source '{source}', expected one of {sorted(SOURCE_COLUMNS)}")
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return 0
+        df.columns = df.columns.str.strip().str.lower()
+        captured = captured or time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+        videos = pd.DataFrame({"video_id": video_ids(df)}, index=df.index)
+        for col in META_COLUMNS:
+            videos[col] = _text(df[col]) if col in df.columns else None
+        if "upload_date" in df.columns:
+            uploaded = fe.parse_upload_dates(df["upload_date"])
+            videos["upload_date"] = uploaded.dt.strftime("%Y-%m-%dT%H:%M:%S").where(uploaded.notna(), None)
+        counts = pd.DataFrame({col: normalize_counts(df[col]) if col in df.columns else np.nan
+                               for col in COUNT_COLUMNS}, index=df.index)
+        region = _text(df["region"]) if "region" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        keep = videos["video_id"].notna().to_numpy()
+        videos, counts, region = videos[keep], counts[keep], region[keep]
+        if videos.empty:
+            return 0
+
+        latest = ~videos["video_id"].duplicated(keep="last").to_numpy()
+        updates = ", ".join(f"{c} = COALESCE(excluded.{c}, videos.{c})" for c in META_COLUMNS)
+        with self.connect() as conn:
+            conn.executemany(
+                f"INSERT INTO videos (video_id, {', '.join(META_COLUMNS)}, first_seen, last_seen) "
+                f"VALUES ({', '.join('?' * (len(META_COLUMNS) + 3))}) "
+                f"ON CONFLICT (video_id) DO UPDATE SET {updates}, last_seen = excluded.last_seen",
+                _sql_rows(videos[latest].assign(first_seen=captured, last_seen=captured)))
+            regions = pd.DataFrame({"region": region, "video_id": videos["video_id"]})
+            regions = regions[regions["region"].notna()].drop_duplicates()
+            conn.executemany("INSERT OR REPLACE INTO regions VALUES (?, ?, ?)",
+                             _sql_rows(regions.assign(last_seen=captured)))
+            snapshots = pd.concat([videos[["video_id"]], counts], axis=1)[latest]
+            conn.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                             _sql_rows(snapshots.assign(source=source, captured=captured)
+                                       [["video_id", "source", "captured"] + COUNT_COLUMNS]))
+        return int(latest.sum())
+
+    def import_csv(self, path, source, chunksize=50_000):
+        """Upsert a raw collector CSV chunk by chunk; its snapshot is stamped with the file's mtime."""
+        captured = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(os.path.getmtime(path)))
+        total = 0
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str):
+            total += self.upsert(chunk, source, captured)
+        return total
+
+    # -------------------------------------------------------
+    #  Reading
+    # -------------------------------------------------------
+    def query(self, source, regions=None, channels=None, since=None, until=None, columns=None):
+        """Videos `source` collected, in its raw CSV layout with their latest counts.
+
+        Like the API collector's CSV, a video that trended in several regions
+        gets one row per region (per matching region when `regions` is given).
+        Filters (all optional, combined with AND) use the store's indexes:
+        `regions`/`channels` are lists, `since`/`until` bound the upload date
+        (ISO strings, inclusive; a date-only `until` includes that whole day).
+        `columns` projects the output.
+        """
+        layout = columns or SOURCE_COLUMNS[source]
+        region_join, join_params = "", []
+        if regions:
+            region_join = f"JOIN regions r ON r.video_id = v.video_id AND r.region IN ({', '.join('?' * len(regions))})"
+            join_params = list(regions)
+        elif "region" in layout:
+            # Videos without a recorded region (scraped ones) keep a single row
+            region_join = "LEFT JOIN regions r ON r.video_id = v.video_id"
+
+        where, params = ["s.source = ?"], [source]
+        if channels:
+            where.append(f"v.channel IN ({', '.join('?' * len(channels))})")
+            params += list(channels)
+        if since:
+            where.append("v.upload_date >= ?")
+            params.append(pd.Timestamp(since).strftime("%Y-%m-%dT%H:%M:%S"))
+        if until:
+            until_ts = pd.Timestamp(until)
+            if ":" in str(until):
+                where.append("v.upload_date <= ?")
+            else:
+                # A bare date covers that whole day
+                where.append("v.upload_date < ?")
+                until_ts = until_ts.normalize() + pd.Timedelta(days=1)
+            params.append(until_ts.strftime("%Y-%m-%dT%H:%M:%S"))
+
+        def column(c):
+            if c == "region":
+                return "r.region" if region_join else "NULL AS region"
+            return f"s.{c}" if c in COUNT_COLUMNS else f"v.{c}"
+
+        selected = ", ".join(column(c) for c in layout if c in COUNT_COLUMNS + META_COLUMNS + ["video_id", "region"])
+        sql = (f"SELECT {selected} FROM videos v {region_join} "
+               "JOIN snapshots s ON s.video_id = v.video_id AND s.captured = "
+               "(SELECT MAX(captured) FROM snapshots WHERE video_id = v.video_id AND source = s.source) "
+               f"WHERE {' AND '.join(where)} ORDER BY v.first_seen, v.video_id"
+               + (", r.region" if region_join else ""))
+        params = join_params + params
+        if not self.exists():
+            return pd.DataFrame(columns=layout)
+        with self.connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def snapshots(self, video_ids=None, source=None):
+        """Every recorded (video_id, source, captured, views, likes, comments), oldest first."""
+        where, params = [], []
+        if video_ids is not None:
+            where.append(f"video_id IN ({', '.join('?' * len(video_ids))})")
+            params += list(video_ids)
+        if source:
+            where.append("source = ?")
+            params.append(source)
+        sql = "SELECT * FROM snapshots" + (f" WHERE {' AND '.join(where)}" if where else "") + \
+              " ORDER BY video_id, captured"
+        with self.connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def count(self, source=None):
+        """Distinct videos in the store (that `source` collected, if given)."""
+        if not self.exists():
+            return 0
+        with self.connect() as conn:
+            if source:
+                return conn.execute("SELECT COUNT(DISTINCT video_id) FROM snapshots WHERE source = ?",
+                                    (source,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import collector CSVs into the video store or export a slice.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    importer = sub.add_parser("import", help="upsert raw collector CSVs")
+    importer.add_argument("source", choices=sorted(SOURCE_COLUMNS))
+    importer.add_argument("paths", nargs="+")
+    exporter = sub.add_parser("export", help="save a slice as a table in data/")
+    exporter.add_argument("source", choices=sorted(SOURCE_COLUMNS))
+    exporter.add_argument("table", help="output table name (e.g. youtube_api_raw)")
+    exporter.add_argument("--region", action="append", help="repeatable")
+    exporter.add_argument("--channel", action="append", help="repeatable")
+    exporter.add_argument("--since", help="earliest upload date")
+    exporter.add_argument("--until", help="latest upload date")
+    args = parser.parse_args()
+
+    store = VideoStore()
+    if args.command == "import":
+        for path in args.paths:
+            print(f" {path}: {store.import_csv(path, args.source):,} videos upserted")
+        print(f"Video store: {store.count(args.source):,} {args.source} videos, {store.count():,} in total")
+    else:
+        df = store.query(args.source, args.region, args.channel, args.since, args.until)
+        path = save_table(df, args.table)
+        print(f"Exported {len(df):,} {args.source} videos to {os.path.relpath(path)}")
+
+
+if __name__ == "__main__":
+    main()
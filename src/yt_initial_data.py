@@ -0,0 +1,68 @@
+import json
+import re
+
+# -------------------------------
+# ytInitialData extraction shared by the scrapers
+# -------------------------------
+# Matches `var ytInitialData = `, `window["ytInitialData"] = ` and `"ytInitialData": `
+ASSIGNMENT_RE = re.compile(r"ytInitialData[\"'\]]*\s*[:=]\s*")
+DECODER = json.JSONDecoder()
+
+
+def extract_initial_data(html):
+    """Return the ytInitialData object embedded in a YouTube page, or None.
+
+    Jumps straight to the assignment and decodes exactly one JSON object from
+    that offset with `raw_decode`, so the rest of the page is never parsed.
+    """
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+
+    for match in ASSIGNMENT_RE.finditer(html):
+        start = match.end()
+        if html[start:start + 1] != "{":
+            continue
+        try:
+            data, _ = DECODER.raw_decode(html, start)
+            return data
+        except ValueError:
+            continue
+    return None
+
+
+def parse_search_results(data):
+    """Flatten the videoRenderer entries of a search results ytInitialData object."""
+    videos = []
+    sections = (
+        data.get("contents", {})
+            .get("twoColumnSearchResultsRenderer", {})
+            .get("primaryContents", {})
+            .get("sectionListRenderer", {})
+            .get("contents", [])
+    )
+
+    for section in sections:
+        contents = section.get("itemSectionRenderer", {}).get("contents", [])
+        for item in contents:
+            video = item.get("videoRenderer")
+            if not video:
+                continue
+
+            vid = video.get("videoId")
+            if not vid:
+                continue
+
+            title = video.get("title", {}).get("runs", [{}])[0].get("text", "")
+            channel = video.get("ownerText", {}).get("runs", [{}])[0].get("text", "")
+            views = video.get("viewCountText", {}).get("simpleText", "N/A")
+            duration = video.get("lengthText", {}).get("simpleText", "N/A")
+
+            videos.append({
+                "url": f"https://www.youtube.com/watch?v={vid}",
+                "title": title,
+                "channel": channel,
+                "views": views,
+                "duration": duration
+            })
+
+    return videos